@@ -1,39 +1,15 @@
-from copy import deepcopy
-from collections import deque
 import cProfile
+import os
 import pstats
+import time
 from benchmarks_utils import print_nested_profile
 
 from topcap.agents.random_ai import RandomAI
-from topcap.core.common import Board, Color, Player
+from topcap.agents.utils.census import census
+from topcap.core.common import Player
 from topcap.core.game.arena import Arena
 
 
-def bfs(max_depth : int, initial_board: Board):
-    first_time_found: dict[int, int] = {}
-    queue: deque[int] = deque()
-    initial_board_hash = initial_board.to_hash()
-    queue.append(initial_board_hash)
-    first_time_found[initial_board_hash] = 0
-    player = Color.WHITE
-    while queue:
-        hash = queue.popleft()
-        depth = first_time_found[hash]
-        if depth == max_depth:
-            continue
-        board = Board()
-        board.from_hash(hash)
-        for move in board.get_all_valid_moves(player):
-            new_board = board.__copy__()  # Use optimized copy instead of deepcopy
-            new_board.move(move)
-            new_board_hash = new_board.to_hash()
-            if new_board_hash not in first_time_found:
-                queue.append(new_board_hash)
-                first_time_found[new_board_hash] = depth + 1
-        player = player.opposite()
-    return first_time_found.keys()
-
-
 PERCENTAGE_THRESHOLD = 5 
 MAX_INDENT = 5
 def analyze_run_games(player1: Player, player2: Player, num_games: int = 100):
@@ -65,33 +41,29 @@ def analyze_run_games(player1: Player, player2: Player, num_games: int = 100):
     print()
 
 
-DEPTHS = [ 4, 5, 6 ]
-FIRST_X = 5
-def analyze_dfs(depth: int):
-    profiler = cProfile.Profile()
-    profiler.enable()
-    print(f'Beginning benchmarking DFS {depth} performance')
+CENSUS_DEPTH = 9
+CENSUS_WORKERS = os.cpu_count() or 1
+def analyze_census(max_depth: int, workers: int):
+    print(f'Beginning benchmarking CENSUS {max_depth} performance ({workers} workers)')
     ######################
-    visited = bfs(depth, Board())
+    start = time.perf_counter()
+    levels = census(max_depth, workers=workers, verbose=False)
+    elapsed = time.perf_counter() - start
     ######################
-    profiler.disable()
-    stats = pstats.Stats(profiler)
-    stats.sort_stats('cumtime')
-
-    print(f" ---- DEPTH = {depth} ----")
-    print()
-    print(f"- States per second: {len(visited)/stats.total_tt:.1f} /s")
-    print(f"- Time to complete : {stats.total_tt:.3f} s")
-    print(f"- Number of states : {len(visited)}")
+    states = sum(level.new for level in levels)
+    print(f" ---- DEPTH = {max_depth} ----")
     print()
-    print_nested_profile(stats, PERCENTAGE_THRESHOLD, max_indent=MAX_INDENT)
+    for level in levels:
+        print(f"- Depth {level.depth:2}: {level.new:>10} new, {level.terminal:>8} terminal ({level.base_reached} base reached, {level.no_moves} without moves) in {level.elapsed:.2f}s")
+    print(f"- States per second: {states/elapsed:.1f} /s")
+    print(f"- Time to complete : {elapsed:.3f} s")
+    print(f"- Number of states : {states}")
     print()
 
 
 NUM_GAMES = 250
 def main():
-    for depth in DEPTHS:
-        analyze_dfs(depth)
+    analyze_census(CENSUS_DEPTH, CENSUS_WORKERS)
     player1 = RandomAI("Randi")
     player2 = RandomAI("Rando")
     analyze_run_games(player1, player2, NUM_GAMES)
@@ -0,0 +1,189 @@
+"""Memory footprint of the structures that grow during long Arena.train runs, in bytes per stored position:
+
+- value table: LeoAgentV1.params, one entry per position
+- snapshot: the deepcopy of an agent Arena.train keeps as an opponent
+- graph: the networkx graph of GraphAI after one search, one node per position
+- game: Game.board_states and board_state_counts of finished games, one Board per ply
+
+Every structure is built twice: once with tracemalloc (bytes python allocated for it, exact) and once while a thread
+samples the RSS (what the OS sees, includes allocator slack and freed memory it did not get back, coarse).
+
+    python memory.py
+    python memory.py --structures value_table snapshot --output memory.json
+"""
+from contextlib import redirect_stdout
+from copy import deepcopy
+from dataclasses import dataclass, asdict
+import argparse
+import gc
+import io
+import json
+import os
+import random
+import resource
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from topcap.agents import RandomAI, GraphAI
+from topcap.agents.leo_agent_v1 import LeoAgentV1
+from topcap.agents.utils.heuristic import SimpleHeuristic
+from topcap.core.common import Board, Color
+from topcap.core.game import Game
+
+SCALES: dict[str, list[int]] = {
+    "value_table": [10_000, 100_000, 1_000_000], # entries
+    "snapshot": [10_000, 100_000, 1_000_000], # entries of the copied agent
+    "graph": [100, 300, 1000], # search nodes of one move
+    "game": [10, 100, 1000], # games kept
+}
+
+
+@dataclass
+class MemoryResult:
+    structure: str
+    scale: int
+    positions: int
+    traced_bytes: int
+    rss_bytes: int
+
+    @property
+    def traced_per_position(self) -> float:
+        return self.traced_bytes / self.positions if self.positions else 0.0
+
+    @property
+    def rss_per_position(self) -> float:
+        return self.rss_bytes / self.positions if self.positions else 0.0
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes, the peak when /proc is not available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler:
+    """Peak RSS while the with block runs, sampled every interval seconds"""
+    def __init__(self, interval: float = 0.005):
+        self.interval: float = interval
+        self.start: int = 0
+        self.peak: int = 0
+        self._stop: threading.Event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self) -> 'RssSampler':
+        self.start = self.peak = current_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.peak = max(self.peak, current_rss())
+        self._stop.set()
+        assert self._thread is not None
+        self._thread.join()
+
+    @property
+    def growth(self) -> int:
+        return self.peak - self.start
+
+
+def measure(structure: str, scale: int, build: Callable[[], Any], positions: Callable[[Any], int]) -> MemoryResult:
+    """Memory of what build() returns (kept alive while measuring), positions counts the positions in it"""
+    gc.collect()
+    with RssSampler() as sampler, redirect_stdout(io.StringIO()):
+        built = build()
+    rss = sampler.growth
+    del built
+    gc.collect()
+    tracemalloc.start()
+    with redirect_stdout(io.StringIO()):
+        built = build()
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return MemoryResult(structure, scale, positions(built), traced, rss)
+
+
+def _random_keys(count: int) -> list[int]:
+    """to_hash() sized keys (48 bits) of as many positions, the values tables store python ints of that size"""
+    rng = random.Random(0)
+    return [rng.getrandbits(48) for _ in range(count)]
+
+
+def _agent_with_values(count: int) -> LeoAgentV1:
+    agent = LeoAgentV1("Memory", verbose=False)
+    rng = random.Random(1)
+    agent.params = {key: rng.uniform(-10, 10) for key in _random_keys(count)}
+    return agent
+
+
+def measure_value_table(scale: int) -> MemoryResult:
+    keys = _random_keys(scale)
+    rng = random.Random(1)
+    return measure("value_table", scale, lambda: {key: rng.uniform(-10, 10) for key in keys}, len)
+
+
+def measure_snapshot(scale: int) -> MemoryResult:
+    agent = _agent_with_values(scale)
+    return measure("snapshot", scale, lambda: deepcopy(agent), lambda snapshot: len(snapshot.params))
+
+
+def measure_graph(scale: int) -> MemoryResult:
+    def build() -> GraphAI:
+        agent = GraphAI(SimpleHeuristic(), max_thinking_time=600, max_nodes_per_move=scale, verbose=False)
+        agent.set_color(Color.WHITE)
+        agent.get_move(Board())
+        return agent
+    return measure("graph", scale, build, lambda agent: agent.graph.number_of_nodes())
+
+
+def measure_games(scale: int) -> MemoryResult:
+    def build() -> list[Game]:
+        random.seed(0)
+        randi, rando = RandomAI("Randi", verbose=False), RandomAI("Rando", verbose=False)
+        games = []
+        for _ in range(scale):
+            game = Game(verbose=False)
+            game.run_game(randi, rando)
+            games.append(game)
+        return games
+    return measure("game", scale, build, lambda games: sum(len(game.board_states) for game in games))
+
+
+MEASURES: dict[str, Callable[[int], MemoryResult]] = {
+    "value_table": measure_value_table,
+    "snapshot": measure_snapshot,
+    "graph": measure_graph,
+    "game": measure_games,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per stored position of the value tables, snapshots, search graphs and games")
+    parser.add_argument("--structures", nargs="+", default=list(MEASURES), choices=list(MEASURES))
+    parser.add_argument("--output", default=None, help="write the results to this json file")
+    args = parser.parse_args()
+    print(f"{'structure':>12} {'scale':>9} {'positions':>10} {'traced (MB)':>12} {'B/position':>11} {'rss (MB)':>9} {'B/position':>11}")
+    results: list[MemoryResult] = []
+    for structure in args.structures:
+        for scale in SCALES[structure]:
+            start = time.perf_counter()
+            result = MEASURES[structure](scale)
+            results.append(result)
+            print(f"{structure:>12} {scale:>9} {result.positions:>10} {result.traced_bytes / 1e6:>12.2f} {result.traced_per_position:>11.0f} "
+                  f"{result.rss_bytes / 1e6:>9.2f} {result.rss_per_position:>11.0f}   ({time.perf_counter() - start:.1f}s)")
+    if args.output is not None:
+        json.dump([asdict(result) | {"traced_per_position": result.traced_per_position, "rss_per_position": result.rss_per_position} for result in results],
+                  open(args.output, "w"), indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import os
+
+from topcap.agents.alpha_beta_ai import measure_smp_scaling
+from topcap.agents.utils.heuristic import SimpleHeuristic
+from topcap.core.common import Board
+
+DEPTH = 6
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def main():
+    worker_counts = [workers for workers in WORKER_COUNTS if workers <= (os.cpu_count() or 1)] or [1]
+    print(f"Beginning benchmarking LAZY SMP alpha-beta to depth {DEPTH} ({os.cpu_count()} cpus)")
+    print()
+    print(f"{'workers':>8} {'time (s)':>10} {'nodes':>10} {'nodes/s':>10} {'speedup':>8}")
+    for row in measure_smp_scaling(SimpleHeuristic(), Board(), DEPTH, worker_counts):
+        print(f"{row['workers']:>8} {row['time']:>10.2f} {row['nodes']:>10.0f} {row['nodes_per_second']:>10.0f} {row['speedup']:>8.2f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
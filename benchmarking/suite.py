@@ -0,0 +1,337 @@
+"""Benchmark suite with stored baselines.
+
+    python suite.py                                  # run everything and compare with baseline.json
+    python suite.py --groups micro --repeats 10      # only the micro benchmarks
+    python suite.py --threshold 0.2 --threshold-for micro.copy=0.3
+    python suite.py --save-baseline                  # store this run as the new baseline
+    python suite.py --output results.json            # keep the results
+
+Every benchmark runs warmup times untimed, then repeats times. Speed benchmarks report the median rate (operations
+per second), memory benchmarks the median tracemalloc peak. A benchmark regresses when it is worse than the baseline
+by more than its threshold, then the exit code is 1. Compare runs of the same machine only, the metadata says which.
+"""
+from contextlib import redirect_stdout
+from dataclasses import dataclass, asdict
+from datetime import datetime
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+import matplotlib
+matplotlib.use("Agg") # Arena.train plots at the end
+import numpy as np
+
+from topcap.agents import RandomAI, GraphAI
+from topcap.agents.leo_agent_v1 import LeoAgentV1
+from topcap.agents.utils.heuristic import SimpleHeuristic
+from topcap.agents.utils.perft import random_positions
+from topcap.core.common import Board, Color
+from topcap.core.game.arena import Arena
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.10
+
+
+@dataclass
+class Benchmark:
+    name: str
+    group: str # micro, macro, memory or import
+    unit: str # what run() counts, or bytes for memory
+    # called before every run, untimed. Returns the run, which returns the number of operations it did
+    setup: Callable[[], Callable[[], int]]
+
+
+@dataclass
+class Result:
+    name: str
+    group: str
+    unit: str
+    values: list[float] # operations per second, or peak bytes for memory
+    median: float
+    mean: float
+    stdev: float
+    minimum: float
+    maximum: float
+
+    @property
+    def higher_is_better(self) -> bool:
+        return self.group != "memory"
+
+
+# ---- micro ----
+
+POSITIONS = random_positions(64, seed=0)
+MICRO_LOOPS = 50
+
+
+def _positions() -> list[Board]:
+    return [board.__copy__() for board in POSITIONS]
+
+
+def _move_generation() -> Callable[[], int]:
+    boards = _positions()
+    def run() -> int:
+        for _ in range(MICRO_LOOPS):
+            for board in boards:
+                board.get_all_valid_moves(board.current_player)
+        return MICRO_LOOPS * len(boards)
+    return run
+
+
+def _make_unmake() -> Callable[[], int]:
+    boards = [(board, board.get_all_valid_moves(board.current_player)) for board in _positions()]
+    def run() -> int:
+        count = 0
+        for _ in range(MICRO_LOOPS // 10):
+            for board, moves in boards:
+                for move in moves:
+                    board.move(move)
+                    board.unmake(move)
+                count += len(moves)
+        return count
+    return run
+
+
+def _to_hash() -> Callable[[], int]:
+    boards = _positions()
+    def run() -> int:
+        for _ in range(MICRO_LOOPS):
+            for board in boards:
+                board.to_hash()
+        return MICRO_LOOPS * len(boards)
+    return run
+
+
+def _from_hash() -> Callable[[], int]:
+    hashes = [board.to_hash() for board in POSITIONS]
+    board = Board()
+    def run() -> int:
+        for _ in range(MICRO_LOOPS // 5):
+            for hash in hashes:
+                board.from_hash(hash)
+        return MICRO_LOOPS // 5 * len(hashes)
+    return run
+
+
+def _copy() -> Callable[[], int]:
+    boards = _positions()
+    def run() -> int:
+        for _ in range(MICRO_LOOPS):
+            for board in boards:
+                board.__copy__()
+        return MICRO_LOOPS * len(boards)
+    return run
+
+
+def _evaluate() -> Callable[[], int]:
+    boards = _positions()
+    heuristic = SimpleHeuristic()
+    def run() -> int:
+        for _ in range(MICRO_LOOPS // 5):
+            for board in boards:
+                heuristic.evaluate(board)
+        return MICRO_LOOPS // 5 * len(boards)
+    return run
+
+
+# ---- macro ----
+
+GAMES = 50
+TRAIN_GAMES = 50
+GRAPH_NODES = 300
+
+
+def _random_games(keep_games: bool = False) -> Callable[[], int]:
+    random.seed(0)
+    arena = Arena()
+    randi, rando = RandomAI("Randi", verbose=False), RandomAI("Rando", verbose=False)
+    def run() -> int:
+        states = 0
+        games = []
+        for i in range(GAMES):
+            white, black = (randi, rando) if i % 2 == 0 else (rando, randi)
+            _, _, game = arena._run_single_game(white, black)
+            states += game.current_step
+            if keep_games:
+                games.append(game)
+        return states
+    return run
+
+
+def _train_iteration() -> Callable[[], int]:
+    """TRAIN_GAMES games of Arena training (one snapshot every TRAIN_GAMES games) and the save at the end,
+    the agent saves into a temporary directory"""
+    random.seed(0)
+    directory = tempfile.mkdtemp(prefix="topcap_suite_")
+    agent = LeoAgentV1("Suite", verbose=False)
+    opponent = RandomAI("Randi", verbose=False)
+    def run() -> int:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            Arena()._train_agent(agent, opponent, save_frequency=TRAIN_GAMES, num_games=TRAIN_GAMES, verbose=False)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(directory, ignore_errors=True)
+        return TRAIN_GAMES
+    return run
+
+
+def _graph_search() -> Callable[[], int]:
+    agent = GraphAI(SimpleHeuristic(), max_thinking_time=600, max_nodes_per_move=GRAPH_NODES, verbose=False)
+    agent.set_color(Color.WHITE)
+    def run() -> int:
+        agent.get_move(Board())
+        assert agent.last_report is not None
+        return agent.last_report.nodes
+    return run
+
+
+# ---- import ----
+
+def _import(code: str) -> Callable[[], Callable[[], int]]:
+    """A fresh interpreter running code, what every worker process of a pool pays before playing"""
+    def setup() -> Callable[[], int]:
+        def run() -> int:
+            subprocess.run([sys.executable, "-c", code], check=True)
+            return 1
+        return run
+    return setup
+
+
+BENCHMARKS: list[Benchmark] = [
+    Benchmark("micro.move_generation", "micro", "positions", _move_generation),
+    Benchmark("micro.make_unmake", "micro", "moves", _make_unmake),
+    Benchmark("micro.to_hash", "micro", "positions", _to_hash),
+    Benchmark("micro.from_hash", "micro", "positions", _from_hash),
+    Benchmark("micro.copy", "micro", "positions", _copy),
+    Benchmark("micro.evaluate", "micro", "positions", _evaluate),
+    Benchmark("macro.random_games", "macro", "states", _random_games),
+    Benchmark("macro.train_iteration", "macro", "games", _train_iteration),
+    Benchmark("macro.graph_search", "macro", "nodes", _graph_search),
+    Benchmark("memory.random_games", "memory", "bytes", lambda: _random_games(keep_games=True)),
+    Benchmark("memory.graph_search", "memory", "bytes", _graph_search),
+    Benchmark("import.game", "import", "imports", _import("import topcap.core.game.arena")),
+    Benchmark("import.agents", "import", "imports", _import("from topcap.agents import RandomAI, HeuristicAI, AlphaBetaAI")),
+]
+
+
+def run_benchmark(benchmark: Benchmark, warmup: int, repeats: int) -> Result:
+    values: list[float] = []
+    for i in range(warmup + repeats):
+        run = benchmark.setup()
+        with redirect_stdout(io.StringIO()): # games and training print every game
+            if benchmark.group == "memory":
+                tracemalloc.start()
+                run()
+                value = float(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            else:
+                start = time.perf_counter()
+                operations = run()
+                value = operations / (time.perf_counter() - start)
+        if i >= warmup:
+            values.append(value)
+    return Result(benchmark.name, benchmark.group, benchmark.unit, values, statistics.median(values), statistics.mean(values),
+                  statistics.stdev(values) if len(values) > 1 else 0.0, min(values), max(values))
+
+
+def metadata() -> dict[str, str | int | None]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(__file__) or ".").stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "node": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def format_value(result: Result) -> str:
+    if result.group == "memory":
+        return f"{result.median / 1e6:10.2f} MB"
+    return f"{result.median:12,.0f} {result.unit}/s"
+
+
+def compare(results: list[Result], baseline: dict, threshold: float, thresholds: dict[str, float]) -> list[str]:
+    """Names of the results that regressed against the baseline, prints a line per result"""
+    baseline_results = {entry["name"]: entry for entry in baseline["results"]}
+    regressions = []
+    for result in results:
+        if result.name not in baseline_results:
+            print(f"{result.name:<24} no baseline")
+            continue
+        before = baseline_results[result.name]["median"]
+        change = (result.median - before) / before if before else 0.0
+        limit = thresholds.get(result.name, thresholds.get(result.group, threshold))
+        regressed = change < -limit if result.higher_is_better else change > limit
+        if regressed:
+            regressions.append(result.name)
+        print(f"{result.name:<24} {change:+7.1%} (threshold {limit:.0%}) {'REGRESSION' if regressed else 'ok'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare it with the stored baseline")
+    parser.add_argument("--groups", nargs="+", default=["micro", "macro", "memory", "import"], choices=["micro", "macro", "memory", "import"])
+    parser.add_argument("--filter", default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default=None, help="write the results to this json file")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative regression")
+    parser.add_argument("--threshold-for", action="append", default=[], metavar="NAME=VALUE", help="threshold of one benchmark or group")
+    args = parser.parse_args()
+    thresholds = {name: float(value) for name, value in (entry.split("=") for entry in args.threshold_for)}
+
+    benchmarks = [benchmark for benchmark in BENCHMARKS if benchmark.group in args.groups and (args.filter is None or args.filter in benchmark.name)]
+    print(f"Running {len(benchmarks)} benchmarks, {args.warmup} warmup and {args.repeats} timed runs each")
+    results = []
+    for benchmark in benchmarks:
+        result = run_benchmark(benchmark, args.warmup, args.repeats)
+        results.append(result)
+        print(f"{result.name:<24} {format_value(result)} (±{result.stdev / result.median:.1%})")
+    report = {"metadata": metadata(), "results": [asdict(result) for result in results]}
+
+    if args.output is not None:
+        json.dump(report, open(args.output, "w"), indent=1)
+    if args.save_baseline:
+        json.dump(report, open(args.baseline, "w"), indent=1)
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, store one with --save-baseline")
+        return
+    baseline = json.load(open(args.baseline))
+    print()
+    print(f"Compared with the baseline of {baseline['metadata']['timestamp']} (commit {baseline['metadata']['commit']})")
+    for key in ("machine", "processor", "cpu_count", "python"):
+        if baseline["metadata"][key] != report["metadata"][key]:
+            print(f"WARNING: baseline {key} is {baseline['metadata'][key]}, this run {report['metadata'][key]}")
+    regressions = compare(results, baseline, args.threshold, thresholds)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 #ifndef BITBOARD_H
 #define BITBOARD_H
 
+#include "tables.h"
 #include "types.h"
 
 namespace bitboard {
@@ -8,6 +9,7 @@ namespace bitboard {
 using Bitboard = types::Bitboard;
 using Coordinates = types::Coordinates;
 using Move = types::Move;
+using MoveList = types::MoveList;
 
 // bitboard operations
 int getBit(Bitboard bitboard, int position);
@@ -27,9 +29,25 @@ std::vector<int> getPositions(Bitboard bitboard);
 // ^ only checks bounds and if is not blocked
 bool isMoveFeasible(Bitboard bitboard, Move move, int N);
 bool isPathBlocked(Bitboard bitboard, Move move, int N);
-std::vector<Move> possibleMovesFrom(Bitboard bitboard, Coordinates coords,
-                                    Coordinates forbiddenCoords, int N);
+MoveList possibleMovesFrom(Bitboard bitboard, Coordinates coords,
+                           Coordinates forbiddenCoords, int N);
 // ^ forbiddenPosition is the own base (white can't move into white base!)
+
+// adds the moves of the piece on square, the move generator of the board
+// functions with the board size as template parameter
+template <int N>
+inline void addMovesFrom(MoveList &moves, Bitboard occupied, int square,
+                         int forbiddenSquare) {
+  const tables::MoveTables<N> &table = tables::TABLES<N>;
+  int distance = __builtin_popcountll(occupied & table.neighbours[square]);
+  for (int direction = 0; direction < 4; direction++) {
+    int target = table.target[square][direction][distance];
+    if (target >= 0 && target != forbiddenSquare &&
+        !(occupied & table.path[square][direction][distance])) {
+      moves.push_back({table.coords[square], table.coords[target]});
+    }
+  }
+}
 Bitboard makeMove(Bitboard bitboard, Move move, int N);
 
 } // namespace bitboard
@@ -12,6 +12,7 @@ namespace board {
 using Bitboard = types::Bitboard;
 using Coordinates = types::Coordinates;
 using Move = types::Move;
+using MoveList = types::MoveList;
 using Board = types::Board;
 
 const int STRING_SPACE_LENGTH = 6;
@@ -21,7 +22,9 @@ std::string boardToString(const Board &board);
 std::string mStringHeader(int N);
 
 int neighbourCount(const Board &board, Coordinates coords);
-std::vector<Move> possibleMoves(const Board &board);
+MoveList possibleMoves(const Board &board);
+// number of moves of a color, whoever is to play (python Board.mobility)
+int mobility(const Board &board, bool white);
 bool isMoveLegal(
     const Board &board,
     Move move); // TODO: can i use shorts (1 byte) or smth for coords?
@@ -29,6 +32,9 @@ Board makeMove(Board board, Move move);
 Board makeMoveInPlace(Board &board, Move move);
 std::pair<bool, bool>
 terminalState(const Board &board); // (isTerminal, isWinnerWhite)
+// same encoding as the python Board.to_hash(): the squares of the white then
+// the black pieces in increasing order, 6 bits each. Ignores the player to move
+uint64_t positionHash(const Board &board);
 
 inline Coordinates colorBaseCoords(const Board &board, bool white) {
   return white ? Coordinates{0, 0} : Coordinates{board.N - 1, board.N - 1};
@@ -0,0 +1,55 @@
+#ifndef CAPI_H
+#define CAPI_H
+
+// C interface of the engine for topcap/core/common/native.py (ctypes), built
+// as build/libtopcap.so with `make lib`. Boards are passed as the white and
+// black bitboards (bit y * 6 + x) and a white to play flag, N is always 6.
+// Moves are ints from * 36 + to of the same squares, like Move.to_int() in
+// python. End reasons are the values of game::EndReason.
+
+#include <cstdint>
+
+extern "C" {
+
+// writes the legal moves to out (room for 4 moves per piece) and returns
+// their count
+int topcap_moves(uint64_t white, uint64_t black, int whiteToPlay, int *out);
+int topcap_is_legal(uint64_t white, uint64_t black, int whiteToPlay, int move);
+// the move has to be legal
+void topcap_make_move(uint64_t white, uint64_t black, int whiteToPlay, int move,
+                      uint64_t *whiteOut, uint64_t *blackOut);
+// end reason of the position, the winner is 1 for white and -1 for black
+int topcap_terminal(uint64_t white, uint64_t black, int whiteToPlay,
+                    int *winner);
+uint64_t topcap_hash(uint64_t white, uint64_t black);
+uint64_t topcap_perft(uint64_t white, uint64_t black, int whiteToPlay,
+                      int depth);
+// plays the moves from the initial board until the game ends, with the
+// threefold repetition rule. Returns the end reason (0 if the moves ran out)
+int topcap_play_game(const int *moves, int count, int *winner, int *steps);
+// appends games self-play episodes to filename (selfplay::Record), valued with
+// the sorted valueKeys (positionHash) and values. Returns the number of
+// records written or -1 if the file can't be opened
+int64_t topcap_selfplay(const char *filename, int games, double epsilon,
+                        const uint64_t *valueKeys, const float *values,
+                        int64_t valueCount, uint64_t seed);
+
+// native search (search::Searcher with a SimpleEvaluation), the handle keeps
+// its transposition table of 2^tableBits entries between searches
+void *topcap_search_new(int tableBits, double initiativeFactor,
+                        double distanceFactor, double availableMovesFactor);
+void topcap_search_free(void *searcher);
+void topcap_search_clear(void *searcher);
+// returns the best move or -1 without moves. repeated are the positionHash of
+// the positions the game already saw twice
+int topcap_search(void *searcher, uint64_t white, uint64_t black,
+                  int whiteToPlay, double maxTime, int maxDepth,
+                  const uint64_t *repeated, int repeatedCount, double *score,
+                  int *depth, uint64_t *nodes, double *elapsed);
+// SimpleEvaluation of the position, from white's point of view
+double topcap_evaluate(uint64_t white, uint64_t black, int whiteToPlay,
+                       double initiativeFactor, double distanceFactor,
+                       double availableMovesFactor);
+}
+
+#endif // !CAPI_H
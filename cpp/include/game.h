@@ -4,7 +4,9 @@
 #include "bitboard.h"
 #include "player/player.h"
 #include "types.h"
+#include <cstdint>
 #include <string>
+#include <unordered_map>
 #include <vector>
 
 namespace game {
@@ -15,7 +17,32 @@ using Move = types::Move;
 using Board = types::Board;
 using Player = player::Player;
 
-// TODO: return useful stuff
+// same values as the C API and the order of the python WinReason
+enum class EndReason {
+  NONE = 0,
+  BASE_REACHED = 1,
+  NO_MOVES_LEFT = 2,
+  INVALID_MOVE = 3,
+  THREEFOLD_REPETITION = 4,
+};
+
+struct GameState {
+  Board board;
+  // positions seen so far (positionHash, the side to move is ignored like in
+  // the python Game), the third occurrence is a draw
+  std::unordered_map<uint64_t, int> positionCounts;
+  int step;
+  EndReason reason;
+  int winner; // 1 white, -1 black, 0 while running or for a draw
+};
+
+GameState newGame(int N);
+// plays move for the player to move and updates the end of game state
+EndReason playMove(GameState &state, Move move);
+
+// plays a game to its end and returns the final state
+GameState playGame(int N, Player *white, Player *black, bool verbose);
+// returns the number of moves played
 int runGame(int N, Player *white, Player *black, bool verbose);
 
 } // namespace game
@@ -0,0 +1,17 @@
+#ifndef PERFT_H
+#define PERFT_H
+
+#include "types.h"
+#include <cstdint>
+
+namespace perft {
+
+using Board = types::Board;
+
+// number of move sequences of exactly depth plies, games that ended (a base
+// was reached or no moves left) before are not continued
+uint64_t perft(const Board &board, int depth);
+
+} // namespace perft
+
+#endif // !PERFT_H
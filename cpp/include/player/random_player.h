@@ -2,14 +2,21 @@
 #define RANDOM_PLAYER_H
 
 #include "player.h"
+#include <cstdint>
+#include <random>
 
 namespace player {
 
 class RandomAI : public Player {
 public:
-    RandomAI(const std::string& name) : Player(name) {}
+    // every instance has its own generator, so instances can play in parallel
+    RandomAI(const std::string& name, uint64_t seed = std::random_device{}())
+        : Player(name), gen_(seed) {}
     
     types::Move getMove(const types::Board& board) override;
+
+private:
+    std::mt19937_64 gen_;
 };
 
 } // namespace player
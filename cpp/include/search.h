@@ -0,0 +1,97 @@
+#ifndef SEARCH_H
+#define SEARCH_H
+
+#include "types.h"
+#include <chrono>
+#include <cstdint>
+#include <memory>
+#include <vector>
+
+// Iterative deepening alpha-beta (negamax) with a transposition table, the
+// native version of topcap/agents/utils/negamax.py. Scores are from the point
+// of view of the player to move
+namespace search {
+
+using Bitboard = types::Bitboard;
+using Board = types::Board;
+using Move = types::Move;
+
+// minus the number of plies to the win, so faster wins score higher
+const double WIN_SCORE = 1'000'000.0;
+const double MAX_EVALUATION = WIN_SCORE / 2; // evaluations are clipped to this
+
+// evaluations are from white's point of view, like the python heuristics
+class Evaluation {
+public:
+  virtual ~Evaluation() = default;
+  virtual double evaluate(const Board &board) const = 0;
+};
+
+// same terms as SimpleHeuristic in topcap/agents/utils/heuristic.py
+class SimpleEvaluation : public Evaluation {
+public:
+  SimpleEvaluation(double initiativeFactor, double distanceFactor,
+                   double availableMovesFactor)
+      : initiativeFactor(initiativeFactor), distanceFactor(distanceFactor),
+        availableMovesFactor(availableMovesFactor) {}
+  double evaluate(const Board &board) const override;
+
+private:
+  double initiativeFactor;
+  double distanceFactor;
+  double availableMovesFactor;
+};
+
+// Zobrist hash of the pieces and the player to move
+uint64_t zobristHash(const Board &board);
+
+enum Bound : uint8_t { EXACT = 1, LOWER = 2, UPPER = 3 };
+
+struct TableEntry {
+  uint64_t key; // 0 for an empty slot
+  double score;
+  int16_t depth;
+  int16_t move; // from * N * N + to, -1 if none
+  Bound bound;
+};
+
+struct Result {
+  Move move;
+  bool hasMove;
+  double score;
+  int depth; // deepest completed iteration
+  uint64_t nodes;
+  double elapsed; // seconds
+};
+
+class Searcher {
+public:
+  // the table has 2^tableBits entries and is kept between searches
+  Searcher(std::unique_ptr<Evaluation> evaluator, int tableBits);
+
+  // repeated: positionHash of the positions the game already saw twice, a
+  // third time is a draw. Positions repeated on the search path are draws too
+  Result iterativeDeepening(const Board &board, double maxTime, int maxDepth,
+                            const std::vector<uint64_t> &repeated);
+  void clearTable();
+
+private:
+  double negamax(const Board &board, uint64_t key, int depth, double alpha,
+                 double beta, int ply);
+  bool timeUp();
+
+  std::unique_ptr<Evaluation> evaluator;
+  std::vector<TableEntry> table;
+  uint64_t tableMask;
+  std::vector<uint64_t> repeated;
+  std::vector<uint64_t> path; // positionHash of the positions on the path
+  std::chrono::steady_clock::time_point deadline;
+  uint64_t nodes;
+  bool stopped;
+  Move rootBest;
+  bool hasRootBest;
+};
+
+} // namespace search
+
+#endif // !SEARCH_H
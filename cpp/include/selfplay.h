@@ -0,0 +1,48 @@
+#ifndef SELFPLAY_H
+#define SELFPLAY_H
+
+#include "types.h"
+#include <cstdint>
+#include <cstdio>
+#include <random>
+
+namespace selfplay {
+
+using Board = types::Board;
+using Move = types::Move;
+
+// One record per move, read in python with np.memmap and
+// topcap/agents/utils/selfplay.py EPISODE_DTYPE. Episodes are stored one after
+// the other, ply 1 starts a new one
+struct Record {
+  uint64_t key;   // position after the move, (positionHash << 1) | black to move
+  uint16_t move;  // from * 36 + to, squares y * N + x
+  uint16_t ply;   // 1 for the first move of the game
+  int8_t outcome; // final result: 1 white wins, -1 black wins, 0 draw
+  uint8_t reason; // game::EndReason of the game
+  uint16_t padding;
+};
+static_assert(sizeof(Record) == 16, "Record must match EPISODE_DTYPE");
+
+// positionHash -> value from white's point of view, keys sorted. Missing
+// positions are worth 0
+struct ValueTable {
+  const uint64_t *keys;
+  const float *values;
+  int64_t count;
+
+  float get(uint64_t hash) const;
+};
+
+// a random move with probability epsilon (always without values), otherwise
+// the move to the best valued position: white maximizes, black minimizes
+Move chooseMove(const Board &board, double epsilon, const ValueTable &values,
+                std::mt19937_64 &rng);
+// plays games with chooseMove for both sides and writes their records to
+// file, returns the number of records
+int64_t generate(std::FILE *file, int games, double epsilon,
+                 const ValueTable &values, uint64_t seed);
+
+} // namespace selfplay
+
+#endif // !SELFPLAY_H
@@ -0,0 +1,86 @@
+#ifndef TABLES_H
+#define TABLES_H
+
+#include "types.h"
+#include <cstdint>
+#include <type_traits>
+
+// Move generation lookup tables, computed at compile time for every board
+// size. Squares are positions x + y * N like in bitboard.h
+namespace tables {
+
+using Bitboard = types::Bitboard;
+using Coordinates = types::Coordinates;
+
+const int MIN_N = 4;
+const int MAX_N = 8;
+const int MAX_DISTANCE = 8; // a piece has at most 8 neighbours
+// same order as the moves have always been generated in
+constexpr Coordinates DIRECTIONS[4] = {{-1, 0}, {0, 1}, {1, 0}, {0, -1}};
+
+template <int N> struct MoveTables {
+  Coordinates coords[N * N];
+  Bitboard neighbours[N * N];
+  // square reached from a square in a direction and distance, -1 if off the
+  // board, and the squares passed on the way (target included)
+  int8_t target[N * N][4][MAX_DISTANCE + 1];
+  Bitboard path[N * N][4][MAX_DISTANCE + 1];
+};
+
+template <int N> constexpr MoveTables<N> makeTables() {
+  MoveTables<N> tables{};
+  for (int square = 0; square < N * N; square++) {
+    int x = square % N, y = square / N;
+    tables.coords[square] = {x, y};
+    for (int dy = -1; dy <= 1; dy++) {
+      for (int dx = -1; dx <= 1; dx++) {
+        if ((dx != 0 || dy != 0) && x + dx >= 0 && x + dx < N && y + dy >= 0 &&
+            y + dy < N) {
+          tables.neighbours[square] |= 1ULL << ((x + dx) + (y + dy) * N);
+        }
+      }
+    }
+    for (int direction = 0; direction < 4; direction++) {
+      Bitboard path = 0;
+      bool onBoard = true;
+      for (int distance = 0; distance <= MAX_DISTANCE; distance++) {
+        int toX = x + DIRECTIONS[direction].x * distance;
+        int toY = y + DIRECTIONS[direction].y * distance;
+        onBoard = onBoard && toX >= 0 && toX < N && toY >= 0 && toY < N;
+        // distance 0 is not a move
+        if (!onBoard || distance == 0) {
+          tables.target[square][direction][distance] = -1;
+          continue;
+        }
+        path |= 1ULL << (toX + toY * N);
+        tables.target[square][direction][distance] =
+            static_cast<int8_t>(toX + toY * N);
+        tables.path[square][direction][distance] = path;
+      }
+    }
+  }
+  return tables;
+}
+
+template <int N> inline constexpr MoveTables<N> TABLES = makeTables<N>();
+
+// calls f with std::integral_constant<int, N>, the board size is then a
+// compile time constant inside f
+template <typename F> inline decltype(auto) withN(int N, F &&f) {
+  switch (N) {
+  case 4:
+    return f(std::integral_constant<int, 4>{});
+  case 5:
+    return f(std::integral_constant<int, 5>{});
+  case 6:
+    return f(std::integral_constant<int, 6>{});
+  case 7:
+    return f(std::integral_constant<int, 7>{});
+  default:
+    return f(std::integral_constant<int, 8>{});
+  }
+}
+
+} // namespace tables
+
+#endif // !TABLES_H
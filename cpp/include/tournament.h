@@ -0,0 +1,58 @@
+#ifndef TOURNAMENT_H
+#define TOURNAMENT_H
+
+#include "game.h"
+#include "player/player.h"
+#include <array>
+#include <cstdint>
+#include <functional>
+#include <memory>
+#include <string>
+#include <vector>
+
+// Runs many games on a pool of threads. Games are split into chunks, every
+// chunk gets fresh players seeded from (seed, pairing, chunk), so the results
+// are the same for any number of threads
+namespace tournament {
+
+using Player = player::Player;
+// creates a player with its own random stream
+using PlayerFactory = std::function<std::unique_ptr<Player>(uint64_t seed)>;
+
+struct Pairing {
+  std::string name;
+  PlayerFactory white;
+  PlayerFactory black;
+  int games;
+};
+
+struct Stats {
+  int games = 0;
+  int whiteWins = 0;
+  int blackWins = 0;
+  int draws = 0;
+  uint64_t steps = 0;
+  std::array<int, 5> reasons{}; // games per game::EndReason
+
+  void add(const game::GameState &state);
+  void merge(const Stats &other);
+};
+
+struct Report {
+  std::vector<Stats> pairings; // same order as the pairings
+  int threads;
+  double seconds;
+
+  Stats total() const;
+  double gamesPerSecond() const;
+  double stepsPerSecond() const;
+};
+
+const int CHUNK_SIZE = 256;
+
+Report run(const std::vector<Pairing> &pairings, int threads, uint64_t seed,
+           int N = 6);
+
+} // namespace tournament
+
+#endif // !TOURNAMENT_H
@@ -20,11 +20,29 @@ struct Move {
   Coordinates to;
 };
 
+// at most N - 2 = 6 pieces with 4 moves each
+const int MAX_MOVES = 24;
+
+// fixed capacity list of moves, no allocation
+struct MoveList {
+  Move moves[MAX_MOVES];
+  int count = 0;
+
+  void push_back(const Move &move) { moves[count++] = move; }
+  int size() const { return count; }
+  bool empty() const { return count == 0; }
+  const Move &operator[](int i) const { return moves[i]; }
+  Move *begin() { return moves; }
+  Move *end() { return moves + count; }
+  const Move *begin() const { return moves; }
+  const Move *end() const { return moves + count; }
+};
+
 struct Board {
   Bitboard bitboards[2];
   int N;
   bool whiteToPlay;
-  mutable std::vector<Move> possibleMovesCache;
+  mutable MoveList possibleMovesCache;
   mutable bool possibleMovesValid;
 
   Board(Bitboard w, Bitboard b, int n, bool wtp)
@@ -79,6 +97,10 @@ inline bool sameSet(const std::vector<Move> &lhs,
   return lshSorted == rshSorted;
 }
 
+inline bool sameSet(const MoveList &lhs, const std::vector<Move> &rhs) {
+  return sameSet(std::vector<Move>(lhs.begin(), lhs.end()), rhs);
+}
+
 inline Bitboard getColorBitboard(const Board &board, bool white) {
   return board.bitboards[!white];
 }
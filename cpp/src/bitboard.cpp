@@ -1,4 +1,5 @@
 #include "../include/bitboard.h"
+#include "../include/tables.h"
 #include <cassert>
 #include <cstdlib>
 #include <vector>
@@ -52,17 +53,10 @@ Coordinates positionToCoords(int position, int N) {
 }
 
 int neighbourCount(Bitboard bitboard, Coordinates coords, int N) {
-  int count = 0;
-  int x = coords.x, y = coords.y;
-  count += (x < N - 1) && getBit(bitboard, {x + 1, y}, N);
-  count += (x > 0) && getBit(bitboard, {x - 1, y}, N);
-  count += (y < N - 1) && getBit(bitboard, {x, y + 1}, N);
-  count += (y > 0) && getBit(bitboard, {x, y - 1}, N);
-  count += (x < N - 1 && y < N - 1) && getBit(bitboard, {x + 1, y + 1}, N);
-  count += (x > 0 && y < N - 1) && getBit(bitboard, {x - 1, y + 1}, N);
-  count += (x > 0 && y > 0) && getBit(bitboard, {x - 1, y - 1}, N);
-  count += (x < N - 1 && y > 0) && getBit(bitboard, {x + 1, y - 1}, N);
-  return count;
+  return tables::withN(N, [&](auto n) {
+    return __builtin_popcountll(
+        bitboard & tables::TABLES<n>.neighbours[coordsToPosition(coords, n)]);
+  });
 }
 
 std::vector<int> getPositions(Bitboard bitboard) {
@@ -78,18 +72,15 @@ std::vector<int> getPositions(Bitboard bitboard) {
 }
 
 bool isPathBlocked(Bitboard bitboard, Move move, int N) {
-  // TODO: optimize by using bit masks
-  int dx = (move.to.x - move.from.x) /
-           std::max(1, std::abs(move.to.x - move.from.x));
-  int dy = (move.to.y - move.from.y) /
-           std::max(1, std::abs(move.to.y - move.from.y));
-  for (int x = move.from.x + dx, y = move.from.y + dy;
-       x - dx != move.to.x || y - dy != move.to.y; x += dx, y += dy) {
-    if (getBit(bitboard, {x, y}, N)) {
-      return true;
-    }
-  }
-  return false;
+  // move has to be straight, the path includes the target
+  int dx = move.to.x - move.from.x, dy = move.to.y - move.from.y;
+  assert((dx == 0) != (dy == 0));
+  int direction = dx < 0 ? 0 : dy > 0 ? 1 : dx > 0 ? 2 : 3;
+  int distance = std::abs(dx) + std::abs(dy);
+  return tables::withN(N, [&](auto n) {
+    return (bitboard & tables::TABLES<n>.path[coordsToPosition(move.from, n)]
+                                            [direction][distance]) != 0;
+  });
 }
 
 bool isMoveFeasible(Bitboard bitboard, Move move, int N) {
@@ -115,19 +106,16 @@ bool isMoveFeasible(Bitboard bitboard, Move move, int N) {
   return !isPathBlocked(bitboard, move, N);
 }
 
-std::vector<Move> possibleMovesFrom(Bitboard bitboard, Coordinates coords,
-                                    Coordinates forbiddenCoords, int N) {
-  std::vector<Move> moves;
-  moves.reserve(4);
-  int moveDistance = neighbourCount(bitboard, coords, N);
-  const Coordinates DIRECTIONS[] = {{-1, 0}, {0, 1}, {1, 0}, {0, -1}};
-  for (const Coordinates &direction : DIRECTIONS) {
-    Coordinates toCoords = coords + (direction * moveDistance);
-    Move move = {coords, toCoords};
-    if (!(toCoords == forbiddenCoords) && isMoveFeasible(bitboard, move, N)) {
-      moves.push_back(move);
-    }
+MoveList possibleMovesFrom(Bitboard bitboard, Coordinates coords,
+                           Coordinates forbiddenCoords, int N) {
+  MoveList moves;
+  if (!getBit(bitboard, coords, N)) {
+    return moves;
   }
+  tables::withN(N, [&](auto n) {
+    addMovesFrom<n>(moves, bitboard, coordsToPosition(coords, n),
+                    coordsToPosition(forbiddenCoords, n));
+  });
   return moves;
 }
 
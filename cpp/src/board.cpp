@@ -58,24 +58,47 @@ int neighbourCount(const Board &board, Coordinates coords) {
   return bitboard::neighbourCount(getTotalBitboard(board), coords, board.N);
 }
 
-std::vector<Move> possibleMoves(const Board &board) {
+MoveList possibleMoves(const Board &board) {
   if (board.possibleMovesValid) {
     return board.possibleMovesCache;
   }
-  std::vector<Move> moves;
-  std::vector<int> positions =
-      bitboard::getPositions(getCurrentColorBitboard(board));
-  for (const int &position : positions) {
-    std::vector<Move> pieceMoves = bitboard::possibleMovesFrom(
-        getTotalBitboard(board), bitboard::positionToCoords(position, board.N),
-        forbiddenCoords(board), board.N);
-    moves.insert(moves.end(), pieceMoves.begin(), pieceMoves.end());
-  }
-  board.possibleMovesCache = moves;
+  MoveList &moves = board.possibleMovesCache;
+  moves.count = 0;
+  tables::withN(board.N, [&](auto n) {
+    Bitboard occupied = getTotalBitboard(board);
+    Coordinates forbidden = forbiddenCoords(board);
+    int forbiddenSquare = forbidden.x + forbidden.y * n;
+    for (Bitboard pieces = getCurrentColorBitboard(board); pieces;
+         pieces &= pieces - 1) {
+      bitboard::addMovesFrom<n>(moves, occupied, __builtin_ctzll(pieces),
+                                forbiddenSquare);
+    }
+  });
   board.possibleMovesValid = true;
   return moves;
 }
 
+int mobility(const Board &board, bool white) {
+  return tables::withN(board.N, [&](auto n) {
+    const tables::MoveTables<n> &table = tables::TABLES<n>;
+    Bitboard occupied = getTotalBitboard(board);
+    Coordinates base = colorBaseCoords(board, white);
+    int baseSquare = base.x + base.y * n;
+    int count = 0;
+    for (Bitboard pieces = getColorBitboard(board, white); pieces;
+         pieces &= pieces - 1) {
+      int square = __builtin_ctzll(pieces);
+      int distance = __builtin_popcountll(occupied & table.neighbours[square]);
+      for (int direction = 0; direction < 4; direction++) {
+        int target = table.target[square][direction][distance];
+        count += target >= 0 && target != baseSquare &&
+                 !(occupied & table.path[square][direction][distance]);
+      }
+    }
+    return count;
+  });
+}
+
 bool isMoveLegal(const Board &board, Move move) {
   // TODO: here also create an Optim version
   if (!bitboard::isMoveFeasible(getTotalBitboard(board), move, board.N)) {
@@ -119,4 +142,17 @@ std::pair<bool, bool> terminalState(const Board &board) {
   return {false, false};
 }
 
+uint64_t positionHash(const Board &board) {
+  uint64_t hash = 0;
+  int shift = 0;
+  for (bool white : {true, false}) {
+    for (Bitboard pieces = getColorBitboard(board, white); pieces;
+         pieces &= pieces - 1) {
+      hash |= static_cast<uint64_t>(__builtin_ctzll(pieces)) << shift;
+      shift += 6;
+    }
+  }
+  return hash;
+}
+
 } // namespace board
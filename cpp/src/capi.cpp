@@ -0,0 +1,144 @@
+#include "../include/capi.h"
+#include "../include/board.h"
+#include "../include/game.h"
+#include "../include/perft.h"
+#include "../include/search.h"
+#include "../include/selfplay.h"
+#include <cstdio>
+
+using namespace types;
+
+namespace {
+
+const int N = 6;
+
+Coordinates squareCoords(int square) { return {square % N, square / N}; }
+
+int coordsSquare(Coordinates coords) { return coords.y * N + coords.x; }
+
+Move fromInt(int move) {
+  return {squareCoords(move / (N * N)), squareCoords(move % (N * N))};
+}
+
+int toInt(const Move &move) {
+  return coordsSquare(move.from) * N * N + coordsSquare(move.to);
+}
+
+} // namespace
+
+extern "C" {
+
+int topcap_moves(uint64_t white, uint64_t black, int whiteToPlay, int *out) {
+  MoveList moves =
+      board::possibleMoves(Board(white, black, N, whiteToPlay != 0));
+  for (int i = 0; i < moves.size(); i++) {
+    out[i] = toInt(moves[i]);
+  }
+  return moves.size();
+}
+
+int topcap_is_legal(uint64_t white, uint64_t black, int whiteToPlay,
+                    int move) {
+  return board::isMoveLegal(Board(white, black, N, whiteToPlay != 0),
+                            fromInt(move));
+}
+
+void topcap_make_move(uint64_t white, uint64_t black, int whiteToPlay, int move,
+                      uint64_t *whiteOut, uint64_t *blackOut) {
+  Board board =
+      board::makeMove(Board(white, black, N, whiteToPlay != 0), fromInt(move));
+  *whiteOut = board.bitboards[0];
+  *blackOut = board.bitboards[1];
+}
+
+int topcap_terminal(uint64_t white, uint64_t black, int whiteToPlay,
+                    int *winner) {
+  Board board(white, black, N, whiteToPlay != 0);
+  int mover = board.whiteToPlay ? 1 : -1;
+  *winner = 0;
+  // either side on the other base, like Board.get_win_reason() in python
+  for (bool color : {true, false}) {
+    if (bitboard::getBit(getColorBitboard(board, color),
+                         board::colorBaseCoords(board, !color), N)) {
+      *winner = color ? 1 : -1;
+      return static_cast<int>(game::EndReason::BASE_REACHED);
+    }
+  }
+  if (board::possibleMoves(board).empty()) {
+    *winner = -mover;
+    return static_cast<int>(game::EndReason::NO_MOVES_LEFT);
+  }
+  return static_cast<int>(game::EndReason::NONE);
+}
+
+uint64_t topcap_hash(uint64_t white, uint64_t black) {
+  return board::positionHash(Board(white, black, N, true));
+}
+
+uint64_t topcap_perft(uint64_t white, uint64_t black, int whiteToPlay,
+                      int depth) {
+  return perft::perft(Board(white, black, N, whiteToPlay != 0), depth);
+}
+
+int topcap_play_game(const int *moves, int count, int *winner, int *steps) {
+  game::GameState state = game::newGame(N);
+  for (int i = 0; i < count && state.reason == game::EndReason::NONE; i++) {
+    game::playMove(state, fromInt(moves[i]));
+  }
+  *winner = state.winner;
+  *steps = state.step;
+  return static_cast<int>(state.reason);
+}
+
+int64_t topcap_selfplay(const char *filename, int games, double epsilon,
+                        const uint64_t *valueKeys, const float *values,
+                        int64_t valueCount, uint64_t seed) {
+  std::FILE *file = std::fopen(filename, "ab");
+  if (file == nullptr) {
+    return -1;
+  }
+  selfplay::ValueTable table{valueKeys, values, valueCount};
+  int64_t written = selfplay::generate(file, games, epsilon, table, seed);
+  std::fclose(file);
+  return written;
+}
+
+void *topcap_search_new(int tableBits, double initiativeFactor,
+                        double distanceFactor, double availableMovesFactor) {
+  return new search::Searcher(std::make_unique<search::SimpleEvaluation>(
+                                  initiativeFactor, distanceFactor,
+                                  availableMovesFactor),
+                              tableBits);
+}
+
+void topcap_search_free(void *searcher) {
+  delete static_cast<search::Searcher *>(searcher);
+}
+
+void topcap_search_clear(void *searcher) {
+  static_cast<search::Searcher *>(searcher)->clearTable();
+}
+
+int topcap_search(void *searcher, uint64_t white, uint64_t black,
+                  int whiteToPlay, double maxTime, int maxDepth,
+                  const uint64_t *repeated, int repeatedCount, double *score,
+                  int *depth, uint64_t *nodes, double *elapsed) {
+  search::Result result =
+      static_cast<search::Searcher *>(searcher)->iterativeDeepening(
+          Board(white, black, N, whiteToPlay != 0), maxTime, maxDepth,
+          std::vector<uint64_t>(repeated, repeated + repeatedCount));
+  *score = result.score;
+  *depth = result.depth;
+  *nodes = result.nodes;
+  *elapsed = result.elapsed;
+  return result.hasMove ? toInt(result.move) : -1;
+}
+
+double topcap_evaluate(uint64_t white, uint64_t black, int whiteToPlay,
+                       double initiativeFactor, double distanceFactor,
+                       double availableMovesFactor) {
+  return search::SimpleEvaluation(initiativeFactor, distanceFactor,
+                                  availableMovesFactor)
+      .evaluate(Board(white, black, N, whiteToPlay != 0));
+}
+}
@@ -7,8 +7,38 @@ using namespace types;
 
 namespace game {
 
-int runGame(int N, Player *white, Player *black, bool verbose) {
-  Board board = board::initialBoard(N);
+GameState newGame(int N) {
+  GameState state{board::initialBoard(N), {}, 0, EndReason::NONE, 0};
+  state.positionCounts[board::positionHash(state.board)] = 1;
+  return state;
+}
+
+EndReason playMove(GameState &state, Move move) {
+  int mover = state.board.whiteToPlay ? 1 : -1;
+  if (!board::isMoveLegal(state.board, move)) {
+    state.reason = EndReason::INVALID_MOVE;
+    state.winner = -mover;
+    return state.reason;
+  }
+  state.board = board::makeMove(state.board, move);
+  state.step++;
+  // a win ends the game before repetitions are counted
+  if (bitboard::getBit(getNextColorBitboard(state.board),
+                       board::forbiddenCoords(state.board), state.board.N)) {
+    state.reason = EndReason::BASE_REACHED;
+    state.winner = mover;
+  } else if (board::possibleMoves(state.board).empty()) {
+    state.reason = EndReason::NO_MOVES_LEFT;
+    state.winner = mover;
+  } else if (++state.positionCounts[board::positionHash(state.board)] >= 3) {
+    state.reason = EndReason::THREEFOLD_REPETITION;
+    state.winner = 0;
+  }
+  return state.reason;
+}
+
+GameState playGame(int N, Player *white, Player *black, bool verbose) {
+  GameState state = newGame(N);
   white->setIsWhite(true);
   black->setIsWhite(false);
 
@@ -17,19 +47,16 @@ int runGame(int N, Player *white, Player *black, bool verbose) {
     std::cout << white->getName() << " vs " << black->getName() << std::endl;
   }
 
-  int step = 0;
-  bool gameOver = false;
-
-  while (!gameOver) {
-    Player *currentPlayer = (step % 2 == 0) ? white : black;
+  while (state.reason == EndReason::NONE) {
+    Player *currentPlayer = (state.step % 2 == 0) ? white : black;
 
     if (verbose) {
-      std::cout << "\n\nGame round: " << (step / 2 + 1) << ", "
+      std::cout << "\n\nGame round: " << (state.step / 2 + 1) << ", "
                 << currentPlayer->getName() << "'s turn" << std::endl;
-      std::cout << board::boardToString(board) << std::endl;
+      std::cout << board::boardToString(state.board) << std::endl;
     }
 
-    Move move = currentPlayer->getMove(board);
+    Move move = currentPlayer->getMove(state.board);
 
     if (verbose) {
       std::string fromTile = utils::coordsToTile(move.from);
@@ -38,22 +65,24 @@ int runGame(int N, Player *white, Player *black, bool verbose) {
                 << " to " << toTile << std::endl;
     }
 
-    board = board::makeMove(board, move);
-    step++;
-
-    auto terminal = board::terminalState(board);
-    gameOver = terminal.first;
+    playMove(state, move);
+  }
 
-    if (gameOver && verbose) {
-      std::cout << board::boardToString(board) << std::endl;
-      if (terminal.second) {
-        std::cout << white->getName() << " wins!" << std::endl;
-      } else {
-        std::cout << black->getName() << " wins!" << std::endl;
-      }
+  if (verbose) {
+    std::cout << board::boardToString(state.board) << std::endl;
+    if (state.winner == 1) {
+      std::cout << white->getName() << " wins!" << std::endl;
+    } else if (state.winner == -1) {
+      std::cout << black->getName() << " wins!" << std::endl;
+    } else {
+      std::cout << "Draw by threefold repetition!" << std::endl;
     }
   }
-  return step;
+  return state;
+}
+
+int runGame(int N, Player *white, Player *black, bool verbose) {
+  return playGame(N, white, black, verbose).step;
 }
 
 } // namespace game
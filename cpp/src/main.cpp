@@ -1,46 +1,53 @@
 #include "../include/game.h"
-#include "../include/player/human_player.h"
 #include "../include/player/random_player.h"
-#include <chrono>
+#include "../include/tournament.h"
+#include <cstdlib>
+#include <iomanip>
 #include <iostream>
+#include <thread>
 
-int main() {
+// usage: game [games] [max threads]
+// plays one game on the terminal, then times RandomAI games on 1, 2, 4, ...
+// threads up to max threads (all cores by default)
+int main(int argc, char **argv) {
   int N = 6;
-  int games = 50000;
+  int games = argc > 1 ? std::atoi(argv[1]) : 50000;
+  int maxThreads = argc > 2 ? std::atoi(argv[2])
+                            : std::max(1u, std::thread::hardware_concurrency());
 
-  // std::cout << "Enter your board size (N) [4-8]: ";
-  // std::cin >> N;
-
-  player::Human human("Human");
   player::RandomAI randi("Randi");
   player::RandomAI rando("Rando");
-
-  // Start profiling
-  auto start = std::chrono::high_resolution_clock::now();
-
   game::runGame(N, &randi, &rando, true);
-  int steps = 0;
-  for (int i = 0; i < games; i++) {
-    if ((i + 1) % 100 == 0) {
-      std::cout << "Running game " << i + 1 << std::endl;
-    }
-    steps += game::runGame(N, &randi, &rando, false);
-  }
 
-  // End profiling
-  auto end = std::chrono::high_resolution_clock::now();
-  auto duration =
-      std::chrono::duration_cast<std::chrono::milliseconds>(end - start);
+  auto randomAI = [](uint64_t seed) -> std::unique_ptr<player::Player> {
+    return std::make_unique<player::RandomAI>("Random", seed);
+  };
+  std::vector<tournament::Pairing> pairings = {
+      {"RandomAI vs RandomAI", randomAI, randomAI, games}};
 
   std::cout << "\n=== Profiling Results ===" << std::endl;
   std::cout << "Total games: " << games << std::endl;
-  std::cout << "Total time: " << duration.count() << " ms" << std::endl;
-  std::cout << "Average time per game: " << (double)duration.count() / games
-            << " ms" << std::endl;
-  std::cout << "Games per second: " << int(games / ((double)duration.count()))
-            << "k /s" << std::endl;
-  std::cout << "Steps per second: " << int(steps / ((double)duration.count()))
-            << "k /s" << std::endl;
+  std::cout << "threads    time (ms)    games/s    steps/s    speedup"
+            << std::endl;
+  double baseline = 0.0;
+  tournament::Report report{};
+  for (int threads = 1;; threads = std::min(threads * 2, maxThreads)) {
+    report = tournament::run(pairings, threads, 42, N);
+    baseline = threads == 1 ? report.seconds : baseline;
+    std::cout << std::setw(7) << threads << std::setw(13) << std::fixed
+              << std::setprecision(0) << report.seconds * 1000 << std::setw(10)
+              << int(report.gamesPerSecond() / 1000) << "k"
+              << std::setw(10) << int(report.stepsPerSecond() / 1000) << "k"
+              << std::setw(11) << std::setprecision(2)
+              << baseline / report.seconds << std::endl;
+    if (threads >= maxThreads) {
+      break;
+    }
+  }
 
+  tournament::Stats total = report.total();
+  std::cout << "White wins: " << total.whiteWins
+            << ", black wins: " << total.blackWins
+            << ", draws: " << total.draws << std::endl;
   return 0;
 }
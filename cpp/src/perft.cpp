@@ -0,0 +1,29 @@
+#include "../include/perft.h"
+#include "../include/board.h"
+#include <vector>
+
+using namespace types;
+
+namespace perft {
+
+uint64_t perft(const Board &board, int depth) {
+  if (depth == 0) {
+    return 1;
+  }
+  // the player who just moved reached our base
+  if (bitboard::getBit(getNextColorBitboard(board), board::forbiddenCoords(board),
+                       board.N)) {
+    return 0;
+  }
+  MoveList moves = board::possibleMoves(board);
+  if (depth == 1) {
+    return moves.size();
+  }
+  uint64_t count = 0;
+  for (const Move &move : moves) {
+    count += perft(board::makeMove(board, move), depth - 1);
+  }
+  return count;
+}
+
+} // namespace perft
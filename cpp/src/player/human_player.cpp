@@ -22,7 +22,7 @@ Move Human::getMove(const Board &board) {
     std::cout << "Please try again." << std::endl;
     auto moves = board::possibleMoves(board);
     std::cout << "Available moves (" << moves.size() << "): ";
-    for (size_t i = 0; i < moves.size(); i++) {
+    for (int i = 0; i < moves.size(); i++) {
       std::string fromTile = utils::coordsToTile(moves[i].from);
       std::string toTile = utils::coordsToTile(moves[i].to);
       std::cout << fromTile << "-" << toTile;
@@ -0,0 +1,225 @@
+#include "../include/search.h"
+#include "../include/board.h"
+#include <algorithm>
+#include <cmath>
+#include <cstdlib>
+#include <limits>
+
+using namespace types;
+
+namespace search {
+
+namespace {
+
+struct ZobristKeys {
+  uint64_t pieces[2][64];
+  uint64_t blackToMove;
+};
+
+constexpr uint64_t splitmix64(uint64_t &state) {
+  uint64_t z = (state += 0x9e3779b97f4a7c15ULL);
+  z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ULL;
+  z = (z ^ (z >> 27)) * 0x94d049bb133111ebULL;
+  return z ^ (z >> 31);
+}
+
+constexpr ZobristKeys makeZobristKeys() {
+  ZobristKeys keys{};
+  uint64_t state = 0x70bca9;
+  for (int color = 0; color < 2; color++) {
+    for (int square = 0; square < 64; square++) {
+      keys.pieces[color][square] = splitmix64(state);
+    }
+  }
+  keys.blackToMove = splitmix64(state);
+  return keys;
+}
+
+constexpr ZobristKeys ZOBRIST = makeZobristKeys();
+
+int squareOf(Coordinates coords, int N) { return coords.x + coords.y * N; }
+
+int16_t moveCode(const Move &move, int N) {
+  return static_cast<int16_t>(squareOf(move.from, N) * N * N +
+                              squareOf(move.to, N));
+}
+
+} // namespace
+
+double SimpleEvaluation::evaluate(const Board &board) const {
+  double evaluation = 0.0;
+  for (bool white : {true, false}) {
+    Coordinates base = board::colorBaseCoords(board, !white);
+    double initiative =
+        white == board.whiteToPlay ? 1.0 / initiativeFactor : 1.0;
+    int distanceSum = 0;
+    for (Bitboard pieces = getColorBitboard(board, white); pieces;
+         pieces &= pieces - 1) {
+      Coordinates coords =
+          bitboard::positionToCoords(__builtin_ctzll(pieces), board.N);
+      distanceSum += std::abs(coords.x - base.x) + std::abs(coords.y - base.y);
+    }
+    evaluation -= (white ? 1 : -1) * initiative * distanceFactor * distanceSum;
+  }
+  evaluation += availableMovesFactor *
+                (board::mobility(board, true) - board::mobility(board, false));
+  return evaluation;
+}
+
+uint64_t zobristHash(const Board &board) {
+  uint64_t key = board.whiteToPlay ? 0 : ZOBRIST.blackToMove;
+  for (int color = 0; color < 2; color++) {
+    for (Bitboard pieces = board.bitboards[color]; pieces;
+         pieces &= pieces - 1) {
+      key ^= ZOBRIST.pieces[color][__builtin_ctzll(pieces)];
+    }
+  }
+  return key;
+}
+
+Searcher::Searcher(std::unique_ptr<Evaluation> evaluator, int tableBits)
+    : evaluator(std::move(evaluator)), table(1ULL << tableBits),
+      tableMask((1ULL << tableBits) - 1), nodes(0), stopped(false),
+      rootBest{{0, 0}, {0, 0}}, hasRootBest(false) {
+  clearTable();
+}
+
+void Searcher::clearTable() {
+  std::fill(table.begin(), table.end(), TableEntry{0, 0.0, 0, -1, EXACT});
+}
+
+bool Searcher::timeUp() {
+  // looking at the clock is slow, only do it every 1024 nodes
+  if (!stopped && (nodes & 1023) == 0 &&
+      std::chrono::steady_clock::now() >= deadline) {
+    stopped = true;
+  }
+  return stopped;
+}
+
+Result Searcher::iterativeDeepening(const Board &board, double maxTime,
+                                    int maxDepth,
+                                    const std::vector<uint64_t> &repeated) {
+  auto start = std::chrono::steady_clock::now();
+  deadline = start + std::chrono::duration_cast<std::chrono::nanoseconds>(
+                         std::chrono::duration<double>(maxTime));
+  this->repeated = repeated;
+  std::sort(this->repeated.begin(), this->repeated.end());
+  path.clear();
+  nodes = 0;
+  stopped = false;
+  hasRootBest = false;
+  Result result{{{0, 0}, {0, 0}}, false, 0.0, 0, 0, 0.0};
+  uint64_t key = zobristHash(board);
+  for (int depth = 1; depth <= maxDepth; depth++) {
+    double score = negamax(board, key, depth,
+                           -std::numeric_limits<double>::infinity(),
+                           std::numeric_limits<double>::infinity(), 0);
+    if (stopped) {
+      break;
+    }
+    result = {rootBest, hasRootBest, score, depth, 0, 0.0};
+    if (std::abs(score) >= MAX_EVALUATION) {
+      break; // the game is decided, deeper searches won't change it
+    }
+  }
+  if (!result.hasMove) {
+    // not even depth 1 finished, fall back to the first move searched
+    MoveList moves = board::possibleMoves(board);
+    result.hasMove = hasRootBest || !moves.empty();
+    result.move = hasRootBest ? rootBest : (moves.empty() ? Move{} : moves[0]);
+  }
+  result.nodes = nodes;
+  result.elapsed = std::chrono::duration<double>(
+                       std::chrono::steady_clock::now() - start)
+                       .count();
+  return result;
+}
+
+double Searcher::negamax(const Board &board, uint64_t key, int depth,
+                         double alpha, double beta, int ply) {
+  nodes++;
+  if (timeUp()) {
+    return 0.0;
+  }
+  // a piece on the base of the other color wins, like Board.get_win_reason()
+  for (bool white : {true, false}) {
+    if (bitboard::getBit(getColorBitboard(board, white),
+                         board::colorBaseCoords(board, !white), board.N)) {
+      return white == board.whiteToPlay ? WIN_SCORE - ply : -(WIN_SCORE - ply);
+    }
+  }
+  MoveList moves = board::possibleMoves(board);
+  if (moves.empty()) {
+    return -(WIN_SCORE - ply);
+  }
+  uint64_t position = board::positionHash(board);
+  if (ply > 0 &&
+      (std::find(path.begin(), path.end(), position) != path.end() ||
+       std::binary_search(repeated.begin(), repeated.end(), position))) {
+    return 0.0;
+  }
+  if (depth == 0) {
+    double evaluation = evaluator->evaluate(board);
+    evaluation = board.whiteToPlay ? evaluation : -evaluation;
+    if (std::isnan(evaluation)) {
+      return 0.0;
+    }
+    return std::clamp(evaluation, -MAX_EVALUATION, MAX_EVALUATION);
+  }
+
+  double originalAlpha = alpha;
+  TableEntry &entry = table[key & tableMask];
+  int16_t tableMove = -1;
+  if (entry.key == key) {
+    tableMove = entry.move;
+    if (ply > 0 && entry.depth >= depth &&
+        (entry.bound == EXACT || (entry.bound == LOWER && entry.score >= beta) ||
+         (entry.bound == UPPER && entry.score <= alpha))) {
+      return entry.score;
+    }
+  }
+
+  // winning moves and the table move first
+  Coordinates opponentBase = board::colorBaseCoords(board, !board.whiteToPlay);
+  std::stable_partition(moves.begin(), moves.end(), [&](const Move &move) {
+    return move.to == opponentBase || moveCode(move, board.N) == tableMove;
+  });
+
+  int color = board.whiteToPlay ? 0 : 1;
+  double bestScore = -std::numeric_limits<double>::infinity();
+  int16_t bestMove = -1;
+  path.push_back(position);
+  for (const Move &move : moves) {
+    uint64_t childKey = key ^ ZOBRIST.pieces[color][squareOf(move.from, board.N)] ^
+                        ZOBRIST.pieces[color][squareOf(move.to, board.N)] ^
+                        ZOBRIST.blackToMove;
+    double score = -negamax(board::makeMove(board, move), childKey, depth - 1,
+                            -beta, -alpha, ply + 1);
+    if (stopped) {
+      path.pop_back();
+      return 0.0;
+    }
+    if (score > bestScore) {
+      bestScore = score;
+      bestMove = moveCode(move, board.N);
+      if (ply == 0) {
+        rootBest = move;
+        hasRootBest = true;
+      }
+    }
+    alpha = std::max(alpha, score);
+    if (alpha >= beta) {
+      break;
+    }
+  }
+  path.pop_back();
+  Bound bound = bestScore <= originalAlpha ? UPPER
+                : bestScore >= beta        ? LOWER
+                                           : EXACT;
+  table[key & tableMask] = {key, bestScore, static_cast<int16_t>(depth),
+                            bestMove, bound};
+  return bestScore;
+}
+
+} // namespace search
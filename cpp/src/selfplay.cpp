@@ -0,0 +1,66 @@
+#include "../include/selfplay.h"
+#include "../include/board.h"
+#include "../include/game.h"
+#include <algorithm>
+#include <vector>
+
+using namespace types;
+
+namespace selfplay {
+
+float ValueTable::get(uint64_t hash) const {
+  const uint64_t *end = keys + count;
+  const uint64_t *found = std::lower_bound(keys, end, hash);
+  return (found != end && *found == hash) ? values[found - keys] : 0.0f;
+}
+
+Move chooseMove(const Board &board, double epsilon, const ValueTable &values,
+                std::mt19937_64 &rng) {
+  MoveList moves = board::possibleMoves(board);
+  std::uniform_real_distribution<double> explore(0.0, 1.0);
+  if (values.count == 0 || explore(rng) < epsilon) {
+    std::uniform_int_distribution<int> pick(0, moves.size() - 1);
+    return moves[pick(rng)];
+  }
+  float sign = board.whiteToPlay ? 1.0f : -1.0f;
+  Move best = moves[0];
+  float bestValue = 0.0f;
+  for (int i = 0; i < moves.size(); i++) {
+    float value =
+        sign * values.get(board::positionHash(board::makeMove(board, moves[i])));
+    if (i == 0 || value > bestValue) {
+      best = moves[i];
+      bestValue = value;
+    }
+  }
+  return best;
+}
+
+int64_t generate(std::FILE *file, int games, double epsilon,
+                 const ValueTable &values, uint64_t seed) {
+  std::mt19937_64 rng(seed);
+  std::vector<Record> episode;
+  int64_t written = 0;
+  for (int i = 0; i < games; i++) {
+    game::GameState state = game::newGame(6);
+    episode.clear();
+    while (state.reason == game::EndReason::NONE) {
+      Move move = chooseMove(state.board, epsilon, values, rng);
+      game::playMove(state, move);
+      int N = state.board.N;
+      uint16_t code = static_cast<uint16_t>(
+          (move.from.y * N + move.from.x) * N * N + move.to.y * N + move.to.x);
+      uint64_t key = (board::positionHash(state.board) << 1) |
+                     static_cast<uint64_t>(!state.board.whiteToPlay);
+      episode.push_back({key, code, static_cast<uint16_t>(state.step), 0, 0, 0});
+    }
+    for (Record &record : episode) {
+      record.outcome = static_cast<int8_t>(state.winner);
+      record.reason = static_cast<uint8_t>(state.reason);
+    }
+    written += std::fwrite(episode.data(), sizeof(Record), episode.size(), file);
+  }
+  return written;
+}
+
+} // namespace selfplay
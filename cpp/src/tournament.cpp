@@ -0,0 +1,107 @@
+#include "../include/tournament.h"
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <thread>
+
+namespace tournament {
+
+namespace {
+
+uint64_t mix(uint64_t value) {
+  value += 0x9e3779b97f4a7c15ULL;
+  value = (value ^ (value >> 30)) * 0xbf58476d1ce4e5b9ULL;
+  value = (value ^ (value >> 27)) * 0x94d049bb133111ebULL;
+  return value ^ (value >> 31);
+}
+
+struct Chunk {
+  int pairing;
+  int start;
+  int stop;
+};
+
+} // namespace
+
+void Stats::add(const game::GameState &state) {
+  games++;
+  whiteWins += state.winner == 1;
+  blackWins += state.winner == -1;
+  draws += state.winner == 0;
+  steps += state.step;
+  reasons[static_cast<int>(state.reason)]++;
+}
+
+void Stats::merge(const Stats &other) {
+  games += other.games;
+  whiteWins += other.whiteWins;
+  blackWins += other.blackWins;
+  draws += other.draws;
+  steps += other.steps;
+  for (size_t i = 0; i < reasons.size(); i++) {
+    reasons[i] += other.reasons[i];
+  }
+}
+
+Stats Report::total() const {
+  Stats total;
+  for (const Stats &stats : pairings) {
+    total.merge(stats);
+  }
+  return total;
+}
+
+double Report::gamesPerSecond() const { return total().games / seconds; }
+
+double Report::stepsPerSecond() const { return total().steps / seconds; }
+
+Report run(const std::vector<Pairing> &pairings, int threads, uint64_t seed,
+           int N) {
+  std::vector<Chunk> chunks;
+  for (int p = 0; p < static_cast<int>(pairings.size()); p++) {
+    for (int start = 0; start < pairings[p].games; start += CHUNK_SIZE) {
+      chunks.push_back({p, start, std::min(start + CHUNK_SIZE, pairings[p].games)});
+    }
+  }
+  std::atomic<size_t> next(0);
+  // every thread keeps its own statistics, merged after the join
+  std::vector<std::vector<Stats>> threadStats(
+      threads, std::vector<Stats>(pairings.size()));
+
+  auto worker = [&](int thread) {
+    for (size_t i = next++; i < chunks.size(); i = next++) {
+      const Chunk &chunk = chunks[i];
+      const Pairing &pairing = pairings[chunk.pairing];
+      uint64_t chunkSeed = mix(seed ^ mix(chunk.pairing) ^ mix(mix(chunk.start)));
+      std::unique_ptr<Player> white = pairing.white(mix(chunkSeed));
+      std::unique_ptr<Player> black = pairing.black(mix(chunkSeed + 1));
+      for (int game = chunk.start; game < chunk.stop; game++) {
+        threadStats[thread][chunk.pairing].add(
+            game::playGame(N, white.get(), black.get(), false));
+      }
+    }
+  };
+
+  auto start = std::chrono::steady_clock::now();
+  std::vector<std::thread> pool;
+  for (int thread = 1; thread < threads; thread++) {
+    pool.emplace_back(worker, thread);
+  }
+  worker(0);
+  for (std::thread &thread : pool) {
+    thread.join();
+  }
+  double seconds = std::chrono::duration<double>(
+                       std::chrono::steady_clock::now() - start)
+                       .count();
+
+  Report report{std::vector<Stats>(pairings.size()), threads, seconds};
+  for (const std::vector<Stats> &stats : threadStats) {
+    for (size_t p = 0; p < pairings.size(); p++) {
+      report.pairings[p].merge(stats[p]);
+    }
+  }
+  return report;
+}
+
+} // namespace tournament
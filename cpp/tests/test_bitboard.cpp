@@ -176,3 +176,37 @@ TEST_CASE("bitboard::makeMove works", "[bitboard]") {
   REQUIRE(makeMove(bitboardA, {{1, 3}, {1, 1}}, N) == 0b0001'0000'0011'0010);
   REQUIRE(makeMove(bitboardA, {{1, 3}, {2, 3}}, N) == 0b0101'0000'0001'0010);
 }
+
+template <int N> void checkTables() {
+  const tables::MoveTables<N> &table = tables::TABLES<N>;
+  for (int square = 0; square < N * N; square++) {
+    Coordinates from = positionToCoords(square, N);
+    REQUIRE(__builtin_popcountll(table.neighbours[square]) ==
+            neighbourCount(~0ULL >> (64 - N * N), from, N));
+    for (int direction = 0; direction < 4; direction++) {
+      for (int distance = 1; distance <= tables::MAX_DISTANCE; distance++) {
+        Coordinates to = from + tables::DIRECTIONS[direction] * distance;
+        bool onBoard = to.x >= 0 && to.x < N && to.y >= 0 && to.y < N;
+        REQUIRE(table.target[square][direction][distance] ==
+                (onBoard ? coordsToPosition(to, N) : -1));
+        if (onBoard) {
+          // every square of the path blocks the move
+          for (int step = 1; step <= distance; step++) {
+            Coordinates blocker = from + tables::DIRECTIONS[direction] * step;
+            REQUIRE(getBit(table.path[square][direction][distance], blocker, N));
+          }
+          REQUIRE(__builtin_popcountll(table.path[square][direction][distance]) ==
+                  distance);
+        }
+      }
+    }
+  }
+}
+
+TEST_CASE("move tables match the board geometry", "[bitboard]") {
+  checkTables<4>();
+  checkTables<5>();
+  checkTables<6>();
+  checkTables<7>();
+  checkTables<8>();
+}
@@ -0,0 +1,46 @@
+#include "../include/board.h"
+#include "../include/search.h"
+#include "catch.hpp"
+#include <memory>
+
+using namespace types;
+
+namespace {
+search::Searcher makeSearcher() {
+  return search::Searcher(
+      std::make_unique<search::SimpleEvaluation>(1.0, 1.0, 1.0), 16);
+}
+} // namespace
+
+TEST_CASE("search takes a win in one", "[search]") {
+  Board board = board::initialBoard(6);
+  // white piece from d1 to e6, next to the black base f6
+  board.bitboards[0] =
+      bitboard::setBit(bitboard::clearBit(board.bitboards[0], {3, 0}, 6),
+                       {4, 5}, 6);
+  search::Searcher searcher = makeSearcher();
+  search::Result result = searcher.iterativeDeepening(board, 1.0, 10, {});
+  REQUIRE(result.hasMove);
+  REQUIRE(result.move == Move{{4, 5}, {5, 5}});
+  REQUIRE(result.score == search::WIN_SCORE - 1);
+  REQUIRE(result.depth == 1);
+}
+
+TEST_CASE("search finds a legal move within its time", "[search]") {
+  Board board = board::initialBoard(6);
+  search::Searcher searcher = makeSearcher();
+  search::Result result = searcher.iterativeDeepening(board, 0.05, 64, {});
+  REQUIRE(result.hasMove);
+  REQUIRE(board::isMoveLegal(board, result.move));
+  REQUIRE(result.depth >= 1);
+  REQUIRE(result.elapsed < 1.0);
+}
+
+TEST_CASE("zobristHash tells positions and players apart", "[search]") {
+  Board board = board::initialBoard(6);
+  Board other = board;
+  other.whiteToPlay = false;
+  REQUIRE(search::zobristHash(board) != search::zobristHash(other));
+  Board moved = board::makeMove(board, board::possibleMoves(board)[0]);
+  REQUIRE(search::zobristHash(moved) != search::zobristHash(other));
+}
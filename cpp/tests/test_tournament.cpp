@@ -0,0 +1,51 @@
+#include "../include/player/random_player.h"
+#include "../include/tournament.h"
+#include "catch.hpp"
+#include <memory>
+
+namespace {
+std::vector<tournament::Pairing> randomPairings(int games) {
+  auto randomAI = [](uint64_t seed) -> std::unique_ptr<player::Player> {
+    return std::make_unique<player::RandomAI>("Random", seed);
+  };
+  return {{"first", randomAI, randomAI, games},
+          {"second", randomAI, randomAI, games / 2}};
+}
+
+void requireSameStats(const tournament::Stats &a, const tournament::Stats &b) {
+  REQUIRE(a.games == b.games);
+  REQUIRE(a.whiteWins == b.whiteWins);
+  REQUIRE(a.blackWins == b.blackWins);
+  REQUIRE(a.draws == b.draws);
+  REQUIRE(a.steps == b.steps);
+  REQUIRE(a.reasons == b.reasons);
+}
+} // namespace
+
+TEST_CASE("tournament stats add up per pairing", "[tournament]") {
+  tournament::Report report = tournament::run(randomPairings(1000), 2, 7);
+  REQUIRE(report.pairings.size() == 2);
+  REQUIRE(report.pairings[0].games == 1000);
+  REQUIRE(report.pairings[1].games == 500);
+  for (const tournament::Stats &stats : report.pairings) {
+    REQUIRE(stats.whiteWins + stats.blackWins + stats.draws == stats.games);
+    REQUIRE(stats.reasons[static_cast<int>(game::EndReason::NONE)] == 0);
+    REQUIRE(stats.steps > static_cast<uint64_t>(stats.games));
+  }
+  REQUIRE(report.total().games == 1500);
+}
+
+TEST_CASE("tournament results do not depend on the thread count",
+          "[tournament]") {
+  std::vector<tournament::Pairing> pairings = randomPairings(1000);
+  tournament::Report single = tournament::run(pairings, 1, 3);
+  for (int threads : {2, 3, 8}) {
+    tournament::Report parallel = tournament::run(pairings, threads, 3);
+    REQUIRE(parallel.threads == threads);
+    for (size_t p = 0; p < pairings.size(); p++) {
+      requireSameStats(single.pairings[p], parallel.pairings[p]);
+    }
+  }
+  // another seed plays other games
+  REQUIRE(tournament::run(pairings, 1, 4).total().steps != single.total().steps);
+}
@@ -0,0 +1,119 @@
+// Engine for the line protocol of topcap/core/common/protocol.py, so the C++
+// search can play python agents in Game and Arena (N = 6):
+//   topcap                                -> id <name>, ready
+//   newgame <white|black>                 -> ready
+//   opponent <move>
+//   go <hash> <white|black> <move count> <seconds>  -> move <move>
+//   quit
+// usage: engine [search|random] [table bits]
+#include "../include/board.h"
+#include "../include/player/random_player.h"
+#include "../include/search.h"
+#include <iostream>
+#include <memory>
+#include <sstream>
+#include <string>
+#include <unordered_map>
+
+using namespace types;
+
+namespace {
+
+const int N = 6;
+
+// Board.to_hash(): sorted white then black squares, 6 bits each
+Board fromHash(uint64_t hash, bool whiteToPlay) {
+  Bitboard pieces[2] = {0, 0};
+  for (int i = 0; i < 8; i++) {
+    pieces[i / 4] |= Bitboard(1) << ((hash >> (6 * i)) & 63);
+  }
+  return Board(pieces[0], pieces[1], N, whiteToPlay);
+}
+
+// Move.to_code(), "(a1 b1)"
+std::string toCode(const Move &move) {
+  std::string code = "(";
+  code += char('a' + move.from.x);
+  code += char('1' + move.from.y);
+  code += ' ';
+  code += char('a' + move.to.x);
+  code += char('1' + move.to.y);
+  return code + ")";
+}
+
+} // namespace
+
+int main(int argc, char **argv) {
+  std::string mode = argc > 1 ? argv[1] : "search";
+  int tableBits = argc > 2 ? std::stoi(argv[2]) : 20;
+  if (mode != "search" && mode != "random") {
+    std::cerr << "unknown mode " << mode << ", use search or random" << std::endl;
+    return 1;
+  }
+  std::unique_ptr<search::Searcher> searcher;
+  if (mode == "search") {
+    searcher = std::make_unique<search::Searcher>(
+        std::make_unique<search::SimpleEvaluation>(1.0, 1.0, 1.0), tableBits);
+  }
+  player::RandomAI randomAI("Random");
+  // positions of the current game, for threefold repetition
+  std::unordered_map<uint64_t, int> history;
+
+  std::string line;
+  while (std::getline(std::cin, line)) {
+    std::istringstream input(line);
+    std::string command;
+    input >> command;
+    if (command == "topcap") {
+      std::cout << "id Native " << mode << "\nready" << std::endl;
+    } else if (command == "newgame") {
+      history.clear();
+      if (searcher) {
+        searcher->clearTable();
+      }
+      std::cout << "ready" << std::endl;
+    } else if (command == "opponent") {
+      // the position comes with the next go
+    } else if (command == "go") {
+      uint64_t hash;
+      std::string side;
+      int moveCount;
+      double seconds;
+      if (!(input >> hash >> side >> moveCount >> seconds)) {
+        std::cout << "error cannot parse " << line << std::endl;
+        continue;
+      }
+      Board board = fromHash(hash, side == "white");
+      history[hash]++;
+      Move move;
+      if (mode == "random") {
+        if (board::possibleMoves(board).empty()) {
+          std::cout << "error no moves" << std::endl;
+          continue;
+        }
+        move = randomAI.getMove(board);
+      } else {
+        std::vector<uint64_t> repeated;
+        for (const auto &[position, count] : history) {
+          if (count >= 2) {
+            repeated.push_back(position);
+          }
+        }
+        search::Result result =
+            searcher->iterativeDeepening(board, seconds, 64, repeated);
+        if (!result.hasMove) {
+          std::cout << "error no moves" << std::endl;
+          continue;
+        }
+        move = result.move;
+      }
+      history[board::positionHash(board::makeMove(board, move))]++;
+      std::cout << "move " << toCode(move) << std::endl;
+    } else if (command == "quit") {
+      break;
+    } else if (!command.empty()) {
+      std::cout << "error unknown command " << command << std::endl;
+    }
+  }
+  return 0;
+}
@@ -0,0 +1,22 @@
+// Perft driver for topcap/agents/utils/perft.py
+// reads "<white bitboard> <black bitboard> <white to play 0/1> <depth>" lines
+// from stdin and prints "<count> <nanoseconds>" for each of them (N = 6)
+#include "../include/perft.h"
+#include <chrono>
+#include <iostream>
+
+int main() {
+  types::Bitboard white, black;
+  int whiteToPlay, depth;
+  while (std::cin >> white >> black >> whiteToPlay >> depth) {
+    types::Board board(white, black, 6, whiteToPlay != 0);
+    auto start = std::chrono::high_resolution_clock::now();
+    uint64_t count = perft::perft(board, depth);
+    auto end = std::chrono::high_resolution_clock::now();
+    std::cout << count << " "
+              << std::chrono::duration_cast<std::chrono::nanoseconds>(end - start)
+                     .count()
+              << std::endl;
+  }
+  return 0;
+}
@@ -1,10 +1,44 @@
-from .human import Human
-from .random_ai import RandomAI
-from .heuristic_ai import HeuristicAI
-from .graph_ai import GraphAI
-from .graph_ai_copilot import GraphAICopilot
-from .jan_mvp_ai import JanMVP
-from .qdicter import QDicter
-from .deterministic_ai import DeterministicAI
-
-__all__ = ["Human", "RandomAI", "HeuristicAI", "GraphAI", "GraphAICopilot", "QDicter", "JanMVP", "DeterministicAI"]
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# Agents are imported on first use: GraphAI pulls in networkx and the search agents multiprocessing, none of which
+# a game between two random agents needs. `from topcap.agents import GraphAI` works as before.
+_AGENT_MODULES: dict[str, str] = {
+    "Human": ".human",
+    "RandomAI": ".random_ai",
+    "HeuristicAI": ".heuristic_ai",
+    "GraphAI": ".graph_ai",
+    "GraphAICopilot": ".graph_ai_copilot",
+    "JanMVP": ".jan_mvp_ai",
+    "QDicter": ".qdicter",
+    "DeterministicAI": ".deterministic_ai",
+    "AlphaBetaAI": ".alpha_beta_ai",
+    "NativeSearchAI": ".native_search_ai",
+}
+
+if TYPE_CHECKING:
+    from .human import Human
+    from .random_ai import RandomAI
+    from .heuristic_ai import HeuristicAI
+    from .graph_ai import GraphAI
+    from .graph_ai_copilot import GraphAICopilot
+    from .jan_mvp_ai import JanMVP
+    from .qdicter import QDicter
+    from .deterministic_ai import DeterministicAI
+    from .alpha_beta_ai import AlphaBetaAI
+    from .native_search_ai import NativeSearchAI
+
+
+def __getattr__(name: str):
+    if name not in _AGENT_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    agent = getattr(import_module(_AGENT_MODULES[name], __name__), name)
+    globals()[name] = agent # next lookups skip __getattr__
+    return agent
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + __all__)
+
+
+__all__ = ["Human", "RandomAI", "HeuristicAI", "GraphAI", "GraphAICopilot", "QDicter", "JanMVP", "DeterministicAI", "AlphaBetaAI", "NativeSearchAI"]
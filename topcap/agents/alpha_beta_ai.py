@@ -0,0 +1,152 @@
+from collections import Counter
+from typing import override
+import multiprocessing as mp
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from multiprocessing.synchronize import Event
+import queue
+import time
+import weakref
+
+from topcap.core.common import Player, Board, Move
+from topcap.utils.instrumentation import timed
+from .utils.heuristic import Heuristic
+from .utils.opening_book import OpeningBook
+from .utils.negamax import NegamaxSearch, DepthResult, smp_worker
+from .utils.transposition import TranspositionTable
+
+
+class AlphaBetaAI(Player):
+    """Depth-first iterative deepening alpha-beta agent.
+    With workers > 1 it runs a Lazy SMP search: helper processes search the same root with
+    staggered start depths, sharing one lock-free transposition table in shared memory.
+    Call close() (or let the agent be garbage collected) to stop the helpers."""
+    HELPER_TIMEOUT = 10 # seconds to wait for the helpers after the main search stopped them
+    def __init__(self, heuristic: Heuristic, name: str = "Alpha Beta AI", max_thinking_time: float = 5, max_depth: int = 64, workers: int = 1, table_size: int = 1 << 20, verbose: bool = True, book: OpeningBook | None = None):
+        super().__init__(name, verbose)
+        self.heuristic: Heuristic = heuristic
+        self.max_thinking_time: float = max_thinking_time
+        self.max_depth: int = max_depth
+        self.workers: int = workers
+        self.table: TranspositionTable = TranspositionTable(table_size, shared=workers > 1)
+        self.book: OpeningBook | None = book
+        self.history: Counter[int] = Counter() # positions of the current game, for threefold repetition
+        self.last_move_count: int = -1
+        self.last_result: DepthResult | None = None
+        self.worker_results: list[DepthResult] = []
+        self._processes: list[BaseProcess] = []
+        self._tasks: list[Queue] = []
+        self._results: Queue | None = None
+        self._stop: Event | None = None
+        self._finalizer: weakref.finalize | None = None
+        self._search_id: int = 0
+
+    @override
+    @timed("agent.alpha_beta.get_move")
+    def get_move(self, board: Board) -> Move:
+        if board.move_count < self.last_move_count: # new game
+            self.history.clear()
+        self.last_move_count = board.move_count
+        self.history[board.to_hash()] += 1
+        book_move = self.book.book_move(board, self.history) if self.book is not None else None
+        if book_move is not None:
+            result = DepthResult(book_move)
+        else:
+            result = self.search(board, self.max_thinking_time)
+        if result.move is None:
+            raise ValueError("No available moves! Cannot call get_move() in a lost state")
+        after = board.__copy__()
+        after.move(result.move)
+        self.history[after.to_hash()] += 1
+        if self.verbose and book_move is not None:
+            print(f"\n{self.name} plays book move {book_move}")
+        elif self.verbose:
+            nodes = result.nodes + sum(worker.nodes for worker in self.worker_results)
+            print(f"\n{self.name} chose move {result.move} with score {result.score:.1f} at depth {result.depth} ({nodes} nodes in {result.elapsed:.2f}s, {nodes / max(result.elapsed, 1e-9):.0f} nodes/s, {self.workers} workers)")
+        return result.move
+
+    def search(self, board: Board, max_time: float, max_depth: int | None = None) -> DepthResult:
+        """Searches board and returns the deepest completed iteration of all workers"""
+        max_depth = max_depth if max_depth is not None else self.max_depth
+        self.worker_results = []
+        if self.workers > 1:
+            self._start_workers()
+            assert self._stop is not None and self._results is not None
+            self._stop.clear()
+            self._search_id += 1
+            for i, tasks in enumerate(self._tasks):
+                # stagger the start depths, so the helpers fill the table ahead of the main search
+                tasks.put((self._search_id, board, self.history, max_time, max_depth, 2 + i % 2))
+        searcher = NegamaxSearch(self.heuristic, self.table, self.history, self._stop)
+        result = searcher.iterative_deepening(board, max_time, max_depth)
+        if self.workers > 1:
+            assert self._stop is not None and self._results is not None
+            self._stop.set()
+            deadline = time.perf_counter() + self.HELPER_TIMEOUT
+            while len(self.worker_results) < len(self._tasks):
+                try:
+                    search_id, worker_result = self._results.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if search_id == self._search_id: # a helper that was slow to start may still answer an old search
+                    self.worker_results.append(worker_result)
+            # a helper may have finished a deeper iteration than the main search
+            for worker_result in self.worker_results:
+                if worker_result.depth > result.depth and worker_result.move is not None:
+                    result = DepthResult(worker_result.move, worker_result.score, worker_result.depth, result.nodes, result.elapsed)
+        self.last_result = result
+        return result
+
+    def _start_workers(self):
+        if self._processes:
+            return
+        assert self.table.name is not None
+        context = mp.get_context("spawn")
+        self._results = context.Queue()
+        self._stop = context.Event()
+        for i in range(self.workers - 1):
+            tasks = context.Queue()
+            process = context.Process(target=smp_worker, args=(self.table.name, self.table.size, self.heuristic, tasks, self._results, self._stop), name=f"{self.name} helper {i + 1}", daemon=True)
+            process.start()
+            self._tasks.append(tasks)
+            self._processes.append(process)
+        self._finalizer = weakref.finalize(self, AlphaBetaAI._shutdown, self._processes, self._tasks, self.table)
+
+    @staticmethod
+    def _shutdown(processes: list[BaseProcess], tasks: list[Queue], table: TranspositionTable):
+        for task_queue in tasks:
+            task_queue.put(None)
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        processes.clear()
+        tasks.clear()
+        table.close(unlink=True)
+
+    def close(self):
+        """Stops the helper processes and frees the shared table"""
+        if self._finalizer is not None:
+            self._finalizer()
+        elif self.table.shm is not None:
+            self.table.close(unlink=True)
+
+
+def measure_smp_scaling(heuristic: Heuristic, board: Board, depth: int, worker_counts: list[int], table_size: int = 1 << 20) -> list[dict[str, float]]:
+    """Time to reach depth and nodes/s of the main search for every worker count, speedup relative to the first count"""
+    rows: list[dict[str, float]] = []
+    for workers in worker_counts:
+        agent = AlphaBetaAI(heuristic, max_depth=depth, workers=workers, table_size=table_size, verbose=False)
+        try:
+            if workers > 1:
+                agent._start_workers()
+                agent.search(board, max_time=0.01, max_depth=1) # let the helpers import everything before timing
+                agent.table.clear()
+            start = time.perf_counter()
+            result = agent.search(board, max_time=1e9, max_depth=depth)
+            elapsed = time.perf_counter() - start
+            nodes = result.nodes + sum(worker.nodes for worker in agent.worker_results)
+        finally:
+            agent.close()
+        rows.append({"workers": workers, "depth": result.depth, "time": elapsed, "nodes": nodes, "nodes_per_second": nodes / elapsed, "speedup": rows[0]["time"] / elapsed if rows else 1.0})
+    return rows
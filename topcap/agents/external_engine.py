@@ -0,0 +1,114 @@
+from queue import Queue, Empty
+import subprocess
+import threading
+from typing import override
+
+from topcap.core.common import Player, Board, Color, Move
+from topcap.core.common.protocol import color_name, go_command
+
+
+class ExternalEngine(Player):
+    """Plays an engine process over the line protocol of topcap.core.common.protocol, e.g.
+    ["cpp/build/engine"] or [sys.executable, "-m", "topcap.agents.serve", "random"].
+    A move that takes longer than move_timeout kills the process and raises TimeoutError, so Game ends
+    it as a crash, and the next game starts a new process."""
+    def __init__(self, command: list[str], name: str | None = None, move_time: float = 1.0, move_timeout: float | None = None, startup_timeout: float = 30.0, verbose: bool = True):
+        super().__init__(name if name is not None else command[0], verbose)
+        self.command: list[str] = command
+        self.move_time: float = move_time # thinking time sent with every go
+        self.move_timeout: float = move_timeout if move_timeout is not None else move_time + 2.0
+        self.startup_timeout: float = startup_timeout
+        self.process: subprocess.Popen[str] | None = None
+        self.lines: Queue[str | None] = Queue()
+        self._start()
+        if name is None:
+            self.name = self.engine_name
+
+    def _start(self):
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+        self.lines = Queue()
+        # a reader thread, so reads can time out
+        threading.Thread(target=self._read_lines, args=(self.process, self.lines), daemon=True).start()
+        self._send("topcap")
+        self.engine_name: str = self._expect("id", self.startup_timeout)
+        self._expect("ready", self.startup_timeout)
+
+    @staticmethod
+    def _read_lines(process: subprocess.Popen[str], lines: Queue[str | None]):
+        assert process.stdout is not None
+        for line in process.stdout:
+            lines.put(line.strip())
+        lines.put(None)
+
+    def _send(self, line: str):
+        """Raises RuntimeError if the engine exited, so Game charges it to this engine"""
+        if self.process is None or self.process.poll() is not None:
+            self.close()
+            raise RuntimeError(f"{self.name} exited")
+        assert self.process.stdin is not None
+        try:
+            self.process.stdin.write(line + "\n")
+            self.process.stdin.flush()
+        except OSError as error: # exited after the poll
+            self.close()
+            raise RuntimeError(f"{self.name} exited") from error
+
+    def _expect(self, reply: str, timeout: float) -> str:
+        """Waits for the reply and returns its arguments"""
+        try:
+            line = self.lines.get(timeout=timeout)
+        except Empty:
+            assert self.process is not None
+            self.process.kill()
+            self.close()
+            raise TimeoutError(f"{self.name} did not answer within {timeout:g}s")
+        if line is None:
+            self.close()
+            raise RuntimeError(f"{self.name} exited")
+        command, _, args = line.partition(" ")
+        if command == "error":
+            raise RuntimeError(f"{self.name}: {args}")
+        if command != reply:
+            raise RuntimeError(f"{self.name} answered {line!r}, expected {reply}")
+        return args
+
+    @override
+    def set_color(self, color: Color):
+        # called by Game at the start of every game
+        super().set_color(color)
+        if self.process is None or self.process.poll() is not None:
+            self._start()
+        self._send(f"newgame {color_name(color)}")
+        self._expect("ready", self.startup_timeout)
+
+    @override
+    def get_move(self, board: Board) -> Move:
+        self._send(go_command(board, self.move_time))
+        return Move.from_code(self._expect("move", self.move_timeout))
+
+    @override
+    def opponent_move_callback(self, move: Move, board: Board):
+        # an engine that died while the opponent was thinking crashes here, Game charges it to us
+        self._send(f"opponent {move.to_code()}")
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            if self.process.poll() is None:
+                assert self.process.stdin is not None
+                self.process.stdin.write("quit\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=1.0)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+    def __enter__(self) -> 'ExternalEngine':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
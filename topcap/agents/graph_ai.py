@@ -1,15 +1,21 @@
+from collections import Counter
 from copy import deepcopy
 from typing import override
+import math
+import threading
 import networkx as nx
-import time
-import matplotlib.pyplot as plt
 
 from topcap.core.common import Player, Board, Color, Move
+from topcap.utils.instrumentation import timed
 from topcap.utils.topcap_utils import WinReason, pointpointpoint
 from .utils.heuristic import Heuristic
+from .utils.search import AnytimeSearch, ProgressReporter, SearchReport
+from .utils.tactics import forced_result
+from .utils.proof_number import EndgameOracle, Outcome
+from .utils.opening_book import OpeningBook
 
 class GraphAI(Player):
-    def __init__(self, heuristic: Heuristic, name: str = "Graph AI Lite", max_thinking_time: float = 5, verbose: bool = True, vv: bool = False, vvv: bool = False):
+    def __init__(self, heuristic: Heuristic, name: str = "Graph AI Lite", max_thinking_time: float = 5, verbose: bool = True, vv: bool = False, vvv: bool = False, max_graph_nodes: int | None = None, max_nodes_per_move: int | None = None, ponder: bool = False, max_ponder_time: float = 60, oracle: EndgameOracle | None = None, book: OpeningBook | None = None):
         super().__init__(name, verbose)
         self.heuristic: Heuristic = heuristic
         self.vv: bool = vv
@@ -20,19 +26,41 @@ class GraphAI(Player):
         self.graph.add_node(self.current_position, evaluation = 0.0, best_child = None, parent = None, children = [], explored = False)
         self.max_thinking_time : float = max_thinking_time
         self.current_level: list[Board]
+        self.current_depth: int = 0
+        self.max_nodes_per_move: int | None = max_nodes_per_move
+        self.last_report: SearchReport | None = None
+        self.start_positions: int = 0
+        # memory budget of the search graph, None means unbounded
+        self.max_graph_nodes: int | None = max_graph_nodes
+        self.nodes_retained: int = 0
+        self.nodes_freed: int = 0
+        # pondering: keep searching the predicted reply while the opponent thinks
+        self.ponder: bool = ponder
+        self.max_ponder_time: float = max_ponder_time
+        self.ponder_position: Board | None = None
+        self.ponder_hits: int = 0
+        self.ponder_misses: int = 0
+        self.ponder_report: SearchReport | None = None
+        self._ponder_thread: threading.Thread | None = None
+        self._stop_pondering: threading.Event = threading.Event()
+        # optional proof-number solver, consulted before searching
+        self.oracle: EndgameOracle | None = oracle
+        # optional opening book, its moves are played without searching
+        self.book: OpeningBook | None = book
+        self.history: list[Board] = [] # positions of the current game, for threefold repetition
+        self.last_move_count: int = -1
 
-    def _add_move(self, from_board : Board, move : Move):
-        new_board = deepcopy(from_board)
-        new_board.move(move)
+    def _add_move(self, from_board : Board, move : Move, new_board: Board, new_evaluation: float):
         from_evaluation: float = self.graph.nodes[from_board]["evaluation"]
-        new_evaluation: float = self.heuristic.evaluate(new_board)
         evaluation_delta: float = (new_evaluation - from_evaluation) * from_board.current_player.value
         if self.vv:
             print(f"Adding move {move} to board {new_board} and evaluation delta {evaluation_delta:.1f} (from {from_evaluation:.1f} to {new_evaluation:.1f})")
         is_victory_move = new_board.get_win_reason()[1] != WinReason.NONE
         if new_board.move_count != from_board.move_count + 1:
             raise ValueError(f"Move count is not correct: from {from_board.move_count} to {new_board.move_count}")
-        self.graph.add_node(new_board, evaluation=new_evaluation, best_child = None, parent=from_board, children = [], explored = is_victory_move)
+        if not self.graph.has_node(new_board):
+            self.graph.add_node(new_board, evaluation=new_evaluation, best_child = None, parent=from_board, children = [], explored = is_victory_move)
+        # else: transposition, keep the existing node and its subtree instead of orphaning it
         self.graph.add_edge(from_board, new_board, move=move)
         self.graph.nodes[from_board]["children"].append(new_board)
 
@@ -69,7 +97,7 @@ class GraphAI(Player):
             print(f"Best continuation for {from_board} is {best_child} with evaluation {best_eval:.1f}")
         return best_child, best_eval
     
-    def _next_node(self) -> Board:
+    def _next_node(self) -> Board | None:
         for node in self.current_level:
             if not self.graph.nodes[node]["explored"]:
                 return node
@@ -77,60 +105,268 @@ class GraphAI(Player):
         for node in self.current_level:
             for child in self.graph.nodes[node]["children"]:
                 next_level.append(child)
+        if not next_level: # everything below the current position is explored
+            return None
         self.current_level = next_level
+        self.current_depth += 1
         return self._next_node()
 
     def _reset_level(self):
         self.current_level = [self.current_position]
         self.next_level = []
+        self.current_depth = 0
 
-    def _explore_next_node(self):
+    def _explore_next_node(self) -> bool:
         node = self._next_node()
+        if node is None:
+            return False
         if self.vv:
             print(f"Exploring next node {node} with evaluation {self.graph.nodes[node]['evaluation']:.1f}")
         available_moves = node.get_all_valid_moves(node.current_player)
+        new_boards: list[Board] = []
         for move in available_moves:
-            self._add_move(node, move)
+            new_board = deepcopy(node)
+            new_board.move(move)
+            new_boards.append(new_board)
+        # score all children in one call, so vectorised heuristics pay the overhead once per node
+        evaluations = self.heuristic.evaluate_batch(new_boards)
+        for move, new_board, evaluation in zip(available_moves, new_boards, evaluations):
+            self._add_move(node, move, new_board, float(evaluation))
         self.graph.nodes[node]["explored"] = True
         self._update_evaluation(node)
         if self.vv:
             print(f"Explored node {node} with evaluation {self.graph.nodes[node]['evaluation']:.1f}")
+        return True
+
+    def _reachable_nodes(self) -> dict[Board, int]:
+        """Returns every node reachable from the current position with its depth.
+        Parents are re-attached along the BFS tree, so they never point to a dropped line (and never form a cycle)."""
+        depths: dict[Board, int] = {self.current_position: 0}
+        level: list[Board] = [self.current_position]
+        while level:
+            next_level: list[Board] = []
+            for node in level:
+                for child in self.graph.nodes[node]["children"]:
+                    if child in depths:
+                        continue
+                    depths[child] = depths[node] + 1
+                    self.graph.nodes[child]["parent"] = node
+                    next_level.append(child)
+            level = next_level
+        return depths
+
+    def _prune_unreachable(self) -> int:
+        """Drops the subtrees of lines that can no longer occur after the last real move"""
+        reachable = self._reachable_nodes()
+        unreachable = [node for node in self.graph.nodes if node not in reachable]
+        self.graph.remove_nodes_from(unreachable)
+        return len(unreachable)
+
+    def _collapse(self, node: Board) -> int:
+        """Turns an explored node back into a leaf, keeping its backed up evaluation"""
+        freed = 0
+        for child in self.graph.nodes[node]["children"]:
+            if self.graph.degree(child) == 1:
+                self.graph.remove_node(child)
+                freed += 1
+            else: # transposition, the child is still referenced by another parent
+                self.graph.remove_edge(node, child)
+                if self.graph.nodes[child]["parent"] == node:
+                    self.graph.nodes[child]["parent"] = next(iter(self.graph.neighbors(child)))
+        self.graph.nodes[node]["children"] = []
+        self.graph.nodes[node]["best_child"] = None
+        self.graph.nodes[node]["explored"] = False
+        return freed
+
+    def _regret(self, node: Board) -> float:
+        """How much worse this node is than the best alternative of its parent (0 for the best line)"""
+        parent = self.graph.nodes[node]["parent"]
+        if parent is None:
+            return 0.0
+        regret = abs(self.graph.nodes[parent]["evaluation"] - self.graph.nodes[node]["evaluation"])
+        return 0.0 if math.isnan(regret) else regret
+
+    def _evict_leaves(self, target_size: int) -> int:
+        """Collapses the least useful frontier nodes (worst for the player choosing them, deepest first) until the graph fits target_size.
+        Nodes on the principal variation, the children of the current position and the nodes of the level being searched
+        that are not explored yet are never evicted. Collapsed nodes of that level leave it, so this search does not expand them again."""
+        principal_variation: set[Board] = set()
+        node: Board | None = self.current_position
+        while node is not None and node not in principal_variation:
+            principal_variation.add(node)
+            node = self.graph.nodes[node]["best_child"]
+        protected = set(self.graph.nodes[self.current_position]["children"])
+        protected.update(node for node in self.current_level if not self.graph.nodes[node]["explored"])
+        depths = self._reachable_nodes()
+        candidates: list[Board] = []
+        for node, data in self.graph.nodes(data=True):
+            if node in principal_variation or node in protected or not data["children"]:
+                continue
+            if all(not self.graph.nodes[child]["children"] and child not in protected for child in data["children"]):
+                candidates.append(node)
+        candidates.sort(key=lambda node: (self._regret(node), depths.get(node, 0)), reverse=True)
+        freed = 0
+        collapsed: set[Board] = set()
+        for node in candidates:
+            if len(self.graph.nodes) <= target_size:
+                break
+            freed += self._collapse(node)
+            collapsed.add(node)
+        self.current_level = [node for node in self.current_level if node not in collapsed]
+        return freed
+
+    def _enforce_memory_budget(self) -> bool:
+        """Evicts leaves once the graph exceeds its budget. Returns False if nothing could be freed"""
+        if self.max_graph_nodes is None or len(self.graph.nodes) <= self.max_graph_nodes:
+            return True
+        # evict a bit more than necessary so we do not collapse on every single expansion
+        freed = self._evict_leaves(int(self.max_graph_nodes * 0.9))
+        self.nodes_freed += freed
+        if self.vv:
+            print(f"Memory budget of {self.max_graph_nodes} nodes exceeded, evicted {freed} leaves")
+        return freed > 0
 
     def explore_graph(self, current_position : Board):
-        self.current_position = current_position
+        # copy the position, the game keeps mutating the board it hands us and nodes must keep their hash
+        self.current_position = current_position.__copy__()
         self._reset_level()
         if not self.graph.has_node(current_position):
-            self.graph.add_node(current_position, evaluation = 0.0, best_child = None, parent = None, children = [], explored = False)
+            self.graph.add_node(self.current_position, evaluation = 0.0, best_child = None, parent = None, children = [], explored = False)
         self.graph.nodes[self.current_position]["parent"] = None
+        freed = self._prune_unreachable()
+        self.nodes_freed = freed
+        self.nodes_retained = len(self.graph.nodes)
         if self.verbose:
-            print(f"{self.name} is exploring the graph from current position {self.current_position}, current size: {len(self.graph.nodes)}")
-        start_time = time.time()
-        nodes_explored = 0
-        start_positions_explored = len(self.graph.nodes)
-        while time.time() - start_time < self.max_thinking_time:
-            self._explore_next_node()
-            nodes_explored += 1
-            elapsed_time = time.time() - start_time
-            nodes_per_second = nodes_explored / elapsed_time if elapsed_time > 0 else 0
-            positions_per_second = (len(self.graph.nodes) - start_positions_explored )/ elapsed_time if elapsed_time > 0 else 0
-            if self.verbose and not self.vv or self.vvv: # TODO: make vv and vvv
-                best_continuation, best_eval = self._best_continuation(self.current_position)
-                if not best_continuation:
-                    raise ValueError("No best continuation found! Either choose random or make sure this cannot happen!")
-                best_move = self.graph.edges[self.current_position, best_continuation]["move"]
-                print(f"\rExploring graph{pointpointpoint()} ({nodes_per_second:.0f} nodes/s, {positions_per_second:.0f} positions/s, #{self.graph.size()}) - Current: {self.current_level[0]} - Current best move: {best_move} (evaluation: {best_eval:.1f}){pointpointpoint()}", end="", flush=True)
+            print(f"{self.name} is exploring the graph from current position {self.current_position}, current size: {len(self.graph.nodes)} (retained {self.nodes_retained} nodes, freed {freed} unreachable nodes)")
+        self.start_positions = len(self.graph.nodes)
+        search = AnytimeSearch(self.max_thinking_time, max_nodes=self.max_nodes_per_move, reporter=ProgressReporter(enabled=self.verbose and not self.vv or self.vvv))
+        self.last_report = search.run(self._search_step, best_move=self._current_best_move, depth=lambda: self.current_depth, describe=self._describe_progress)
         if self.verbose:
-            print(f"\n{self.name} is done exploring the graph, new size: {len(self.graph.nodes)} (explored {nodes_explored} nodes)")
+            print(f"{self.name} is done exploring the graph, new size: {len(self.graph.nodes)} (explored {self.last_report.nodes} nodes, freed {self.nodes_freed} nodes)")
+            print(f"Search report: {self.last_report.summary()}")
+
+    def _search_step(self) -> bool:
+        if not self._explore_next_node():
+            return False
+        if not self._enforce_memory_budget():
+            if self.verbose:
+                print(f"\n{self.name} ran out of memory budget ({self.max_graph_nodes} nodes), stopping exploration")
+            return False
+        return True
+
+    def _current_best_move(self) -> tuple[Move | None, float]:
+        best_continuation, best_eval = self._best_continuation(self.current_position)
+        if best_continuation is None:
+            return None, best_eval
+        return self.graph.edges[self.current_position, best_continuation]["move"], best_eval
+
+    def _describe_progress(self, report: SearchReport) -> str:
+        positions_per_second = (len(self.graph.nodes) - self.start_positions) / report.elapsed if report.elapsed > 0 else 0
+        best_move, best_eval = self._current_best_move()
+        return f"Exploring graph{pointpointpoint()} ({report.nodes_per_second:.0f} nodes/s, {positions_per_second:.0f} positions/s, #{self.graph.size()}) - Current: {self.current_level[0]} (depth {self.current_depth}) - Current best move: {best_move} (evaluation: {best_eval:.1f}){pointpointpoint()}"
 
     @override
+    @timed("agent.graph.get_move")
     def get_move(self, board: Board) -> Move:
+        self._stop_ponder() # in case the game did not notify us of the opponent's move
+        if board.move_count < self.last_move_count: # new game
+            self.history.clear()
+        self.last_move_count = board.move_count
+        self.history.append(board.__copy__())
+        move = self._choose_move(board)
+        after = board.__copy__()
+        after.move(move)
+        self.history.append(after)
+        return move
+
+    def _choose_move(self, board: Board) -> Move:
+        counts = Counter(position.to_hash() for position in self.history)
+        if self.book is not None:
+            book_move = self.book.book_move(board, counts)
+            if book_move is not None:
+                if self.verbose:
+                    print(f"\n{self.name} plays book move {book_move}")
+                return book_move
+        winner, forced_move = forced_result(board, history=counts)
+        if winner == board.current_player and forced_move is not None:
+            if self.verbose:
+                print(f"\n{self.name} found a forced win, playing {forced_move} without searching")
+            return forced_move
+        if self.oracle is not None:
+            result = self.oracle.probe(board, self.history)
+            if result.outcome == Outcome.WIN and result.best_move is not None:
+                if self.verbose:
+                    print(f"\n{self.name}'s endgame oracle proved a win in {len(result.line)} plies, playing {result.best_move}")
+                return result.best_move
         self.explore_graph(current_position=board)
         best_continuation, best_eval = self._best_continuation(self.current_position)
         if not best_continuation:
             raise ValueError("No best continuation found! Either choose random or make sure this cannot happen!")
         best_move : Move = self.graph.edges[self.current_position, best_continuation]["move"]
         print(f"\nChose move {best_move} with evaluation {best_eval:.1f}")
+        if self.ponder:
+            self._start_ponder(best_continuation)
         return best_move
 
+    def _start_ponder(self, position_after_move: Board):
+        """Predicts the opponent's reply and keeps searching from it in a background thread"""
+        node = self.graph.nodes[position_after_move]
+        if not node["explored"]:
+            self.current_position = position_after_move
+            self._reset_level()
+            self._explore_next_node()
+        predicted_reply = self.graph.nodes[position_after_move]["best_child"]
+        if predicted_reply is None: # our move ends the game
+            return
+        self.ponder_position = predicted_reply
+        self.current_position = predicted_reply
+        self._reset_level()
+        self._stop_pondering.clear()
+        self._ponder_thread = threading.Thread(target=self._ponder, name=f"{self.name} ponder", daemon=True)
+        self._ponder_thread.start()
+
+    def _ponder(self):
+        search = AnytimeSearch(self.max_ponder_time)
+        search.start(depth=lambda: self.current_depth)
+        while not self._stop_pondering.is_set() and self._search_step():
+            if search.tick():
+                break
+        self.ponder_report = search.finish()
+
+    def _stop_ponder(self):
+        if self._ponder_thread is None:
+            return
+        self._stop_pondering.set()
+        self._ponder_thread.join()
+        self._ponder_thread = None
+
+    @override
+    def set_color(self, color: Color):
+        self._stop_ponder() # a new game, whatever we were pondering is gone
+        self.ponder_position = None
+        super().set_color(color)
+
+    @override
+    def game_over_callback(self, win: bool):
+        self._stop_ponder()
+        self.ponder_position = None
+
+    @override
+    def opponent_move_callback(self, move: Move, board: Board):
+        if self._ponder_thread is None:
+            return
+        self._stop_ponder()
+        if self.ponder_position is not None and self.ponder_position == board:
+            # the tree below the predicted position is reused by the next search
+            self.ponder_hits += 1
+            outcome = "hit"
+        else:
+            # the pondered subtree is unreachable now and gets pruned by the next search
+            self.ponder_misses += 1
+            outcome = "miss"
+        if self.verbose and self.ponder_report is not None:
+            print(f"{self.name} ponder {outcome} on {move}: {self.ponder_report.summary()}")
+        self.ponder_position = None
+
 
 
@@ -1,11 +1,13 @@
+from collections import Counter
 from copy import deepcopy
 from typing import override
 import networkx as nx
-import time
 
 from topcap.core.common import Player, Board, Color, Move
 from topcap.utils.topcap_utils import WinReason, pointpointpoint
 from .utils.heuristic import Heuristic
+from .utils.search import AnytimeSearch, ProgressReporter, SearchReport
+from .utils.opening_book import OpeningBook
 
 
 class GraphAICopilot(Player):
@@ -16,7 +18,8 @@ class GraphAICopilot(Player):
     
     def __init__(self, heuristic: Heuristic, name: str = "Graph AI Copilot", 
                  max_thinking_time: float = 5, verbose: bool = True, 
-                 vv: bool = False, vvv: bool = False):
+                 vv: bool = False, vvv: bool = False, max_nodes_per_move: int | None = None,
+                 book: OpeningBook | None = None):
         super().__init__(name, verbose)
         self.heuristic: Heuristic = heuristic
         self.vv: bool = vv
@@ -25,43 +28,39 @@ class GraphAICopilot(Player):
         self.current_position: Board = Board()
         self.max_thinking_time: float = max_thinking_time
         self.current_level: list[Board] = []  # Fixed: Initialize properly
+        self.current_depth: int = 0
+        self.max_nodes_per_move: int | None = max_nodes_per_move
+        self.last_report: SearchReport | None = None
+        self.start_positions: int = 0
+        self.book: OpeningBook | None = book  # book moves are played without searching
+        self.history: Counter[int] = Counter()  # positions of the current game, for threefold repetition
+        self.last_move_count: int = -1
         
     def _is_terminal_state(self, board: Board) -> bool:
         """Check if a board state is terminal (game over)."""
         _, win_reason = board.get_win_reason() 
         return win_reason != WinReason.NONE
     
-    def _is_move_repeated_thrice(self, move_history: list[Move]) -> bool:
+    def _is_on_path(self, from_board: Board, board: Board) -> bool:
         """
-        Check if the same move has been made three times consecutively.
-        Returns True if the last three moves are identical.
+        Check if board is from_board or one of its ancestors in the search tree.
+        Nodes are keyed by position, so only positions already in the graph can be on the path,
+        new positions are answered in O(1) and only transpositions walk up the parent links.
         """
-        if len(move_history) < 3:
+        if not self.graph.has_node(board):
             return False
-        
-        last_three = move_history[-3:]
-        # Check if all three moves are the same
-        first_move = last_three[0]
-        return all(
-            move.from_tile == first_move.from_tile and 
-            move.to_tile == first_move.to_tile 
-            for move in last_three
-        )
-    
-    def _get_terminal_evaluation(self, board: Board, is_repetition_loss: bool = False, 
-                                  losing_player: Color | None = None) -> float:
+        node: Board | None = from_board
+        while node is not None:
+            if node == board:
+                return True
+            node = self.graph.nodes[node]["parent"]
+        return False
+
+    def _get_terminal_evaluation(self, board: Board) -> float:
         """
         Get the evaluation for a terminal state.
         Returns +inf for white win, -inf for black win.
-        If is_repetition_loss is True, returns loss evaluation for losing_player.
         """
-        # Handle repetition loss (three same moves)
-        if is_repetition_loss and losing_player is not None:
-            if losing_player == Color.WHITE:
-                return float("-inf")  # White loses
-            else:
-                return float("inf")   # Black loses
-        
         # Handle normal victory conditions
         victory_state, _ = board.get_win_reason()
         if victory_state == Color.WHITE:
@@ -76,38 +75,37 @@ class GraphAICopilot(Player):
         """
         Add a new board state to the graph after applying a move.
         Fixed: Properly handles terminal states with correct evaluation.
-        Now also detects and penalizes three consecutive identical moves.
+        A position reached for the third time (game history and search path, like Game counts it) is a draw.
         """
         new_board = deepcopy(from_board)
         new_board.move(move)
         
-        # Get move history from parent
-        parent_history = self.graph.nodes[from_board].get("move_history", [])
-        move_history = parent_history + [move]
+        if self._is_on_path(from_board, new_board):
+            # The line went back to one of its own positions: either side can keep repeating it, so it is a draw
+            # (like NegamaxSearch scores it). The node is an ancestor, only the edge knows about the draw
+            if self.vv:
+                print(f"Adding move {move} to board {new_board} (repetition of a position on the path, draw)")
+            self.graph.add_edge(from_board, new_board, move=move, draw=True)
+            self.graph.nodes[from_board]["children"].append(new_board)
+            return
         
-        # Check for three consecutive identical moves
-        is_repetition_loss = self._is_move_repeated_thrice(move_history)
-        losing_player = None
-        if is_repetition_loss:
-            # The player who made the third repetition loses
-            losing_player = from_board.current_player
+        # Not on the path, so this is the position's first occurrence in the line after the game history
+        is_repetition_draw = self.history[new_board.to_hash()] + 1 >= 3
         
         # Fixed: Check if this is a terminal state BEFORE evaluating
-        is_terminal = self._is_terminal_state(new_board) or is_repetition_loss
+        is_terminal = self._is_terminal_state(new_board) or is_repetition_draw
         
         # Fixed: Use terminal evaluation for terminal states, heuristic otherwise
-        if is_terminal:
-            new_evaluation = self._get_terminal_evaluation(
-                new_board, 
-                is_repetition_loss=is_repetition_loss,
-                losing_player=losing_player
-            )
+        if is_repetition_draw:
+            new_evaluation = 0.0
+        elif is_terminal:
+            new_evaluation = self._get_terminal_evaluation(new_board)
         else:
             new_evaluation = self.heuristic.evaluate(new_board)
         
         if self.vv:
             from_eval = self.graph.nodes[from_board]["evaluation"]
-            repetition_msg = f", REPETITION LOSS for {losing_player}" if is_repetition_loss else ""
+            repetition_msg = ", THREEFOLD REPETITION" if is_repetition_draw else ""
             print(f"Adding move {move} to board {new_board} "
                   f"(from {from_eval:.1f} to {new_evaluation:.1f}, "
                   f"terminal={is_terminal}{repetition_msg})")
@@ -126,8 +124,7 @@ class GraphAICopilot(Player):
             best_child=None,
             parent=from_board,
             children=[],
-            explored=is_terminal,
-            move_history=move_history  # Store move history for repetition detection
+            explored=is_terminal
         )
         self.graph.add_edge(from_board, new_board, move=move)
         self.graph.nodes[from_board]["children"].append(new_board)
@@ -156,7 +153,8 @@ class GraphAICopilot(Player):
         best_eval = float("-inf") if maximizing else float("inf")
         
         for child in children:
-            child_eval = self.graph.nodes[child]["evaluation"]
+            # a move back to a position of the path is a draw, whatever that position is worth
+            child_eval = 0.0 if self.graph.edges[from_board, child].get("draw") else self.graph.nodes[child]["evaluation"]
             if self.vv:
                 print(f"Checking child {child} with evaluation {child_eval:.1f}")
             
@@ -211,6 +209,8 @@ class GraphAICopilot(Player):
         
         for node in self.current_level:
             for child in self.graph.nodes[node]["children"]:
+                if self.graph.edges[node, child].get("draw"):
+                    continue  # repetition of an ancestor, nothing to explore
                 if child not in seen:
                     next_level.append(child)
                     seen.add(child)
@@ -220,11 +220,13 @@ class GraphAICopilot(Player):
             return None
         
         self.current_level = next_level
+        self.current_depth += 1
         return self._next_node()
     
     def _reset_level(self):
         """Reset the current level to start from current_position."""
         self.current_level = [self.current_position]
+        self.current_depth = 0
     
     def _explore_next_node(self) -> bool:
         """
@@ -242,30 +244,16 @@ class GraphAICopilot(Player):
                   f"{self.graph.nodes[node]['evaluation']:.1f}")
         
         # Fixed: Check if terminal before getting moves
-        # Also check for repetition loss in move history
-        move_history = self.graph.nodes[node].get("move_history", [])
-        is_repetition_loss = self._is_move_repeated_thrice(move_history)
-        
-        if self._is_terminal_state(node) or is_repetition_loss:
+        if self._is_terminal_state(node):
             # Terminal state - no moves to explore, just mark as explored
             self.graph.nodes[node]["explored"] = True
             
             # Fixed: Ensure terminal evaluation is set correctly
             if not self.graph.nodes[node]["evaluation"] in (float("inf"), float("-inf")):
-                losing_player = None
-                if is_repetition_loss and move_history:
-                    # The player who made the third repetition loses
-                    # The move was made by the previous player (before current_player switched)
-                    losing_player = node.current_player.opposite()
-                self.graph.nodes[node]["evaluation"] = self._get_terminal_evaluation(
-                    node, 
-                    is_repetition_loss=is_repetition_loss,
-                    losing_player=losing_player
-                )
+                self.graph.nodes[node]["evaluation"] = self._get_terminal_evaluation(node)
             self._update_evaluation(node)
             if self.vv:
-                repetition_msg = f" (repetition loss)" if is_repetition_loss else ""
-                print(f"Terminal node {node} marked as explored{repetition_msg}")
+                print(f"Terminal node {node} marked as explored")
             return True
         
         # Generate all moves and add them as children
@@ -320,47 +308,36 @@ class GraphAICopilot(Player):
             print(f"{self.name} is exploring the graph from current position "
                   f"{self.current_position}, current size: {len(self.graph.nodes)}")
         
-        start_time = time.time()
-        nodes_explored = 0
-        start_positions = len(self.graph.nodes)
-        
-        while time.time() - start_time < self.max_thinking_time:
-            # Fixed: Handle case when exploration is complete
-            if not self._explore_next_node():
-                if self.verbose:
-                    print("\nAll nodes explored!")
-                break
-            
-            nodes_explored += 1
-            elapsed_time = time.time() - start_time
-            
-            # Fixed: Progress reporting with proper condition
-            if self.verbose and (not self.vv or self.vvv):
-                best_continuation, best_eval = self._best_continuation(self.current_position)
-                
-                # Fixed: Handle case where no continuation exists (shouldn't happen, but safer)
-                if best_continuation is None:
-                    # Terminal position - game is over
-                    if self.vv:
-                        print("\nCurrent position is terminal!")
-                    continue
-                
-                best_move = self.graph.edges[self.current_position, best_continuation]["move"]
-                nodes_per_second = nodes_explored / elapsed_time if elapsed_time > 0 else 0
-                positions_per_second = (len(self.graph.nodes) - start_positions) / elapsed_time if elapsed_time > 0 else 0
-                
-                # Fixed: Safe access to current_level
-                current_node_str = str(self.current_level[0]) if self.current_level else "N/A"
-                
-                print(f"\rExploring graph{pointpointpoint()} "
-                      f"({nodes_per_second:.0f} nodes/s, {positions_per_second:.0f} positions/s, "
-                      f"#{self.graph.size()}) - Current: {current_node_str} - "
-                      f"Best move: {best_move} (eval: {best_eval:.1f}){pointpointpoint()}",
-                      end="", flush=True)
+        self.start_positions = len(self.graph.nodes)
+        search = AnytimeSearch(self.max_thinking_time, max_nodes=self.max_nodes_per_move,
+                               reporter=ProgressReporter(enabled=self.verbose and (not self.vv or self.vvv)))
+        self.last_report = search.run(self._explore_next_node, best_move=self._current_best_move,
+                                      depth=lambda: self.current_depth, describe=self._describe_progress)
         
         if self.verbose:
-            print(f"\n{self.name} is done exploring the graph, new size: "
-                  f"{len(self.graph.nodes)} (explored {nodes_explored} nodes)")
+            if self.last_report.completed:
+                print("All nodes explored!")
+            print(f"{self.name} is done exploring the graph, new size: "
+                  f"{len(self.graph.nodes)} (explored {self.last_report.nodes} nodes)")
+            print(f"Search report: {self.last_report.summary()}")
+    
+    def _current_best_move(self) -> tuple[Move | None, float]:
+        """Best move from the current position, sampled by the search driver."""
+        best_continuation, best_eval = self._best_continuation(self.current_position)
+        if best_continuation is None:
+            # Terminal position - game is over
+            return None, best_eval
+        return self.graph.edges[self.current_position, best_continuation]["move"], best_eval
+    
+    def _describe_progress(self, report: SearchReport) -> str:
+        """Progress line, only built when the throttled reporter prints."""
+        positions_per_second = (len(self.graph.nodes) - self.start_positions) / report.elapsed if report.elapsed > 0 else 0
+        best_move, best_eval = self._current_best_move()
+        current_node_str = str(self.current_level[0]) if self.current_level else "N/A"
+        return (f"Exploring graph{pointpointpoint()} "
+                f"({report.nodes_per_second:.0f} nodes/s, {positions_per_second:.0f} positions/s, "
+                f"#{self.graph.size()}) - Current: {current_node_str} (depth {self.current_depth}) - "
+                f"Best move: {best_move} (eval: {best_eval:.1f}){pointpointpoint()}")
     
     @override
     def get_move(self, board: Board) -> Move:
@@ -368,6 +345,24 @@ class GraphAICopilot(Player):
         Get the best move from the current board state.
         Fixed: Better error handling for edge cases.
         """
+        if board.move_count < self.last_move_count:  # new game
+            self.history.clear()
+        self.last_move_count = board.move_count
+        self.history[board.to_hash()] += 1
+        move = self._choose_move(board)
+        after = board.__copy__()
+        after.move(move)
+        self.history[after.to_hash()] += 1
+        return move
+    
+    def _choose_move(self, board: Board) -> Move:
+        """Book move, or the best move of the graph search."""
+        if self.book is not None:
+            book_move = self.book.book_move(board, self.history)
+            if book_move is not None:
+                if self.verbose:
+                    print(f"\n{self.name} plays book move {book_move}")
+                return book_move
         self.explore_graph(current_position=board)
         best_continuation, best_eval = self._best_continuation(self.current_position)
         
@@ -2,6 +2,7 @@ from copy import deepcopy
 from typing import override
 
 from topcap.core.common import Player, Board, Color
+from topcap.utils.instrumentation import timed
 from topcap.utils.topcap_utils import simulate_thinking_time
 from .utils.heuristic import Heuristic
 
@@ -11,16 +12,21 @@ class HeuristicAI(Player):
         self.heuristic: Heuristic = heuristic
 
     @override
+    @timed("agent.heuristic.get_move")
     def get_move(self, board : Board):
         available_moves = board.get_all_valid_moves(self.color)
         if not available_moves:
             raise ValueError("No available_moves! Cannot call get_move() in a lost state")
         best_evaluation = float("-inf")
         best_move = None
+        new_boards: list[Board] = []
         for move in available_moves:
             new_board = deepcopy(board)
             new_board.move(move)
-            evaluation = self.heuristic.evaluate(new_board)
+            new_boards.append(new_board)
+        evaluations = self.heuristic.evaluate_batch(new_boards)
+        for move, evaluation in zip(available_moves, evaluations):
+            evaluation = float(evaluation)
             if self.color == Color.BLACK:
                 evaluation = -evaluation
             if evaluation > best_evaluation or best_move is None:
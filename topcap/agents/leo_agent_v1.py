@@ -1,6 +1,8 @@
 from copy import deepcopy
 from typing import final, override
 import random
+import numpy as np
+from numpy.typing import NDArray
 from topcap.core.common import Player, Board, Move, Color
 from topcap.agents.rl_agent import ReinforcementLearningAgent
 
@@ -65,4 +67,25 @@ class LeoAgentV1(ReinforcementLearningAgent):
         self.game_history = [] # reset history
         self.iteration += 1
 
+    def value_table(self) -> tuple[NDArray[np.uint64], NDArray[np.float32]]:
+        """The V-table as sorted to_hash keys and values, for the native self-play generator"""
+        keys = np.fromiter(self.params.keys(), dtype=np.uint64, count=len(self.params))
+        values = np.fromiter(self.params.values(), dtype=np.float32, count=len(self.params))
+        order = np.argsort(keys)
+        return keys[order], values[order]
 
+    def learn_from_episodes(self, records: NDArray, max_reward: float = 10.0):
+        """Same update as game_step_callback for every episode of a topcap.agents.utils.selfplay file,
+        the reward is max_reward times the outcome like in Game"""
+        if self.frozen:
+            return
+        hashes = (np.asarray(records["key"]) >> np.uint64(1)).tolist()
+        outcomes = np.asarray(records["outcome"]).tolist()
+        starts = np.flatnonzero(np.asarray(records["ply"]) == 1).tolist() + [len(hashes)]
+        for start, stop in zip(starts[:-1], starts[1:]):
+            reward = max_reward * outcomes[start]
+            for state in reversed(hashes[start:stop]): # most recent states first
+                old = self.params.get(state, 0)
+                self.params[state] = old + (reward - old) * self.alpha
+                reward *= self.decay
+            self.iteration += 1
@@ -0,0 +1,53 @@
+from collections import Counter
+from typing import override
+
+from topcap.core.common import Player, Board, Move
+from topcap.core.common.native import NativeSearch
+from topcap.utils.instrumentation import timed
+from .utils.heuristic import SimpleHeuristic
+from .utils.negamax import DepthResult
+from .utils.opening_book import OpeningBook
+
+
+class NativeSearchAI(Player):
+    """Same search as AlphaBetaAI with one worker, run by the C++ engine (cpp/src/search.cpp, `make lib`).
+    The engine evaluates positions with the terms of SimpleHeuristic, so only that heuristic can be used."""
+    def __init__(self, heuristic: SimpleHeuristic | None = None, name: str = "Native Search AI", max_thinking_time: float = 5, max_depth: int = 64, table_bits: int = 20, verbose: bool = True, book: OpeningBook | None = None):
+        super().__init__(name, verbose)
+        heuristic = heuristic if heuristic is not None else SimpleHeuristic()
+        if type(heuristic) is not SimpleHeuristic:
+            raise ValueError(f"The native search only evaluates with SimpleHeuristic, not {heuristic.name()}")
+        self.heuristic: SimpleHeuristic = heuristic
+        self.max_thinking_time: float = max_thinking_time
+        self.max_depth: int = max_depth
+        self.searcher: NativeSearch = NativeSearch(table_bits, heuristic.initiative_factor, heuristic.distance_factor, heuristic.available_moves_factor)
+        self.book: OpeningBook | None = book
+        self.history: Counter[int] = Counter() # positions of the current game, for threefold repetition
+        self.last_move_count: int = -1
+        self.last_result: DepthResult | None = None
+
+    @override
+    @timed("agent.native_search.get_move")
+    def get_move(self, board: Board) -> Move:
+        if board.move_count < self.last_move_count: # new game
+            self.history.clear()
+        self.last_move_count = board.move_count
+        self.history[board.to_hash()] += 1
+        book_move = self.book.book_move(board, self.history) if self.book is not None else None
+        result = DepthResult(book_move) if book_move is not None else self.search(board, self.max_thinking_time)
+        if result.move is None:
+            raise ValueError("No available moves! Cannot call get_move() in a lost state")
+        after = board.__copy__()
+        after.move(result.move)
+        self.history[after.to_hash()] += 1
+        if self.verbose and book_move is not None:
+            print(f"\n{self.name} plays book move {book_move}")
+        elif self.verbose:
+            print(f"\n{self.name} chose move {result.move} with score {result.score:.1f} at depth {result.depth} ({result.nodes} nodes in {result.elapsed:.2f}s, {result.nodes / max(result.elapsed, 1e-9):.0f} nodes/s)")
+        return result.move
+
+    def search(self, board: Board, max_time: float, max_depth: int | None = None) -> DepthResult:
+        repeated = [position for position, count in self.history.items() if count >= 2]
+        move, score, depth, nodes, elapsed = self.searcher.search(board, max_time, max_depth if max_depth is not None else self.max_depth, repeated)
+        self.last_result = DepthResult(move, score, depth, nodes, elapsed)
+        return self.last_result
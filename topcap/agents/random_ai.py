@@ -2,6 +2,7 @@ from typing import override
 import random
 
 from topcap.core.common import Player, Board
+from topcap.utils.instrumentation import timed
 from topcap.utils.topcap_utils import simulate_thinking_time
 
 class RandomAI(Player):
@@ -9,6 +10,7 @@ class RandomAI(Player):
         super().__init__(name, verbose)
 
     @override
+    @timed("agent.random.get_move")
     def get_move(self, board : Board):
         available_moves = board.get_all_valid_moves(self.color)
         move = random.choice(available_moves)
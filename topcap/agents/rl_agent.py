@@ -4,6 +4,7 @@ import pickle
 import os
 
 from topcap.core.common import Player, Board, Move, Color
+from topcap.utils.instrumentation import timed
 
 class ReinforcementLearningAgent(Player, ABC):
     def __init__(self, classname: str, name: str, verbose: bool = True, decay: float = 0.95, vv: bool = False):
@@ -19,6 +20,7 @@ class ReinforcementLearningAgent(Player, ABC):
         self.frozen = frozen
 
     @override
+    @timed("agent.rl.get_move")
     def get_move(self, board : Board):
         available_moves = board.get_all_valid_moves(self.color)
         move_evaluations: dict[Move, float] = {}
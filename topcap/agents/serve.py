@@ -0,0 +1,33 @@
+import argparse
+
+from topcap.core.common import Player
+from topcap.core.common.protocol import serve
+from .utils.heuristic import SimpleHeuristic
+
+
+def make_agent(kind: str, name: str | None = None) -> Player:
+    if kind == "random":
+        from .random_ai import RandomAI
+        return RandomAI(name or "Random AI", verbose=False)
+    if kind == "heuristic":
+        from .heuristic_ai import HeuristicAI
+        return HeuristicAI(SimpleHeuristic(), name or "Heuristic AI", verbose=False)
+    if kind == "alphabeta":
+        from .alpha_beta_ai import AlphaBetaAI
+        return AlphaBetaAI(SimpleHeuristic(), name or "Alpha Beta AI", verbose=False)
+    if kind == "native":
+        from .native_search_ai import NativeSearchAI
+        return NativeSearchAI(name=name or "Native Search AI", verbose=False)
+    raise ValueError(f"Unknown agent {kind}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an agent over the engine protocol (topcap.core.common.protocol) on stdin/stdout")
+    parser.add_argument("agent", choices=["random", "heuristic", "alphabeta", "native"])
+    parser.add_argument("--name", default=None)
+    args = parser.parse_args()
+    serve(make_agent(args.agent, args.name))
+
+
+if __name__ == "__main__":
+    main()
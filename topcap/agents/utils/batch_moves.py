@@ -0,0 +1,77 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+import numpy as np
+from numpy.typing import NDArray
+
+from topcap.core.common import Color
+from topcap.core.common.board import _RAY_TARGET, _RAY_PATH, _NEIGHBOUR_SQUARES, _BASE_SQUARES
+
+# Move generation for many positions at once with numpy. Positions are (n, pieces) arrays of board squares
+# (y * 6 + x) for each color plus a black to move flag per position.
+_WHITE_BASE = _BASE_SQUARES[Color.WHITE]
+_BLACK_BASE = _BASE_SQUARES[Color.BLACK]
+_RAY_TARGET_ARRAY: NDArray[np.int64] = np.array(_RAY_TARGET, dtype=np.int64) # [square, direction, neighbour count]
+_RAY_PATH_ARRAY: NDArray[np.uint64] = np.array(_RAY_PATH, dtype=np.uint64)
+_NEIGHBOUR_ARRAY: NDArray[np.uint64] = np.array(_NEIGHBOUR_SQUARES, dtype=np.uint64)
+
+
+@dataclass
+class MoveBatch:
+    """All moves of one piece index in one direction, for the positions in rows"""
+    rows: NDArray[np.int64] # positions the moves belong to
+    white: NDArray[np.int64] # pieces after the move, unsorted
+    black: NDArray[np.int64]
+    black_to_move: NDArray[np.bool_] # player to move after the move
+    reaches_base: NDArray[np.bool_] # the move lands on the opponent's base and wins
+
+
+def occupancy(white: NDArray[np.int64], black: NDArray[np.int64]) -> NDArray[np.uint64]:
+    return np.bitwise_or.reduce(np.uint64(1) << np.concatenate([white, black], axis=1).astype(np.uint64), axis=1)
+
+
+def generate_moves(white: NDArray[np.int64], black: NDArray[np.int64], black_to_move: NDArray[np.bool_]) -> Iterator[MoveBatch]:
+    """Every legal move of the player to move, same rules as Board: a piece moves exactly its neighbour count
+    of squares in a straight line over empty squares and never into its own base"""
+    movers = np.where(black_to_move[:, None], black, white)
+    others = np.where(black_to_move[:, None], white, black)
+    own_base = np.where(black_to_move, _BLACK_BASE, _WHITE_BASE)
+    other_base = np.where(black_to_move, _WHITE_BASE, _BLACK_BASE)
+    occupied = occupancy(white, black)
+    for piece in range(movers.shape[1]):
+        square = movers[:, piece]
+        neighbours = np.bitwise_count(occupied & _NEIGHBOUR_ARRAY[square]).astype(np.int64)
+        for direction in range(4):
+            target = _RAY_TARGET_ARRAY[square, direction, neighbours]
+            path = _RAY_PATH_ARRAY[square, direction, neighbours]
+            rows = np.flatnonzero((target >= 0) & (target != own_base) & ((path & occupied) == 0))
+            if not len(rows):
+                continue
+            moved = movers[rows].copy()
+            moved[:, piece] = target[rows]
+            after_black_to_move = ~black_to_move[rows]
+            # black is to move after a white move
+            new_white = np.where(after_black_to_move[:, None], moved, others[rows])
+            new_black = np.where(after_black_to_move[:, None], others[rows], moved)
+            yield MoveBatch(rows, new_white, new_black, after_black_to_move, target[rows] == other_base[rows])
+
+
+def encode_keys(white: NDArray[np.int64], black: NDArray[np.int64], black_to_move: NDArray[np.bool_]) -> NDArray[np.uint64]:
+    """Board.position_key() of every position: sorted white then black squares, 6 bits each, and the side to move"""
+    squares = np.concatenate([np.sort(white, axis=1), np.sort(black, axis=1)], axis=1).astype(np.uint64)
+    keys = np.zeros(len(squares), dtype=np.uint64)
+    for i in range(squares.shape[1]):
+        keys |= squares[:, i] << np.uint64(6 * i)
+    return (keys << np.uint64(1)) | black_to_move.astype(np.uint64)
+
+
+def decode_keys(keys: NDArray[np.uint64], pieces: int = 4) -> tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.bool_]]:
+    black_to_move = (keys & np.uint64(1)).astype(bool)
+    hashes = keys >> np.uint64(1)
+    squares = np.stack([(hashes >> np.uint64(6 * i)) & np.uint64(63) for i in range(2 * pieces)], axis=1).astype(np.int64)
+    return squares[:, :pieces], squares[:, pieces:], black_to_move
+
+
+def base_reached(keys: NDArray[np.uint64], pieces: int = 4) -> NDArray[np.bool_]:
+    """Positions where a piece stands on the opponent's base, the game is over"""
+    white, black, _ = decode_keys(keys, pieces)
+    return (white == _BLACK_BASE).any(axis=1) | (black == _WHITE_BASE).any(axis=1)
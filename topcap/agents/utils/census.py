@@ -0,0 +1,129 @@
+from dataclasses import dataclass
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from numpy.typing import NDArray
+
+from topcap.core.common import Board
+from .batch_moves import generate_moves, encode_keys, decode_keys, base_reached
+
+
+@dataclass
+class CensusLevel:
+    depth: int
+    new: int # positions first reached at this depth
+    base_reached: int # new positions where the last move reached the opponent's base
+    no_moves: int # new positions where the player to move has no moves left
+    elapsed: float = 0.0
+
+    @property
+    def terminal(self) -> int:
+        return self.base_reached + self.no_moves
+
+
+def _remove_seen(keys: NDArray[np.uint64], seen: NDArray[np.uint64]) -> NDArray[np.uint64]:
+    """keys not in seen, both sorted"""
+    if not len(seen) or not len(keys):
+        return keys
+    index = np.minimum(np.searchsorted(seen, keys), len(seen) - 1)
+    return keys[seen[index] != keys]
+
+
+def _sorted_unique(keys: NDArray[np.uint64], kind: str = "quicksort") -> NDArray[np.uint64]:
+    """Faster than np.unique for plain uint64 keys, stable sort merges already sorted parts in one pass"""
+    keys = np.sort(keys, kind=kind)
+    if not len(keys):
+        return keys
+    keep = np.empty(len(keys), dtype=bool)
+    keep[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=keep[1:])
+    return keys[keep]
+
+
+def _expand_chunk(task: tuple[str, int, int, str | None]) -> int:
+    """Expands frontier[start:stop] and saves its sorted, deduplicated children to output.
+    Returns the number of positions without moves."""
+    frontier_filename, start, stop, output = task
+    frontier = np.load(frontier_filename, mmap_mode="r")[start:stop]
+    white, black, black_to_move = decode_keys(np.asarray(frontier))
+    has_move = np.zeros(len(frontier), dtype=bool)
+    children: list[NDArray[np.uint64]] = []
+    for batch in generate_moves(white, black, black_to_move):
+        has_move[batch.rows] = True
+        if output is not None:
+            children.append(encode_keys(batch.white, batch.black, batch.black_to_move))
+    if output is not None:
+        np.save(output, _sorted_unique(np.concatenate(children)) if children else np.zeros(0, dtype=np.uint64))
+    return int(np.count_nonzero(~has_move))
+
+
+def census(max_depth: int, board: Board | None = None, workers: int = 1, spill_directory: str | None = None, chunk_size: int = 1 << 18, verbose: bool = True) -> list[CensusLevel]:
+    """Counts the positions reachable from board (the initial setup by default) by the ply they are first reached at.
+    Every depth is a sorted uint64 array of position keys on disk, new positions are the children of the last
+    depth minus everything seen before. Positions with the same side to move can only be reached at depths of the same
+    parity, so only those depths are checked. Expansion is split into chunks that run in worker processes.
+    Repetitions are not tracked: a position counts once, whatever the path to it."""
+    board = board if board is not None else Board()
+    own_directory = spill_directory is None
+    directory = tempfile.mkdtemp(prefix="topcap_census_") if spill_directory is None else spill_directory
+    os.makedirs(directory, exist_ok=True)
+    pool = mp.get_context("spawn").Pool(workers) if workers > 1 else None
+    levels: list[CensusLevel] = []
+    level_filenames: list[str] = []
+    try:
+        new = np.array([board.position_key()], dtype=np.uint64)
+        for depth in range(max_depth + 1):
+            start_time = time.perf_counter()
+            level_filename = os.path.join(directory, f"depth_{depth}.npy")
+            np.save(level_filename, new)
+            level_filenames.append(level_filename)
+            count = len(new)
+            reached_base = base_reached(new)
+            frontier = new[~reached_base]
+            frontier_filename = os.path.join(directory, f"frontier_{depth}.npy")
+            np.save(frontier_filename, frontier)
+            expand_children = depth < max_depth # the last depth is only expanded to find positions without moves
+            tasks = [(frontier_filename, start, min(start + chunk_size, len(frontier)), os.path.join(directory, f"children_{depth}_{start}.npy") if expand_children else None)
+                     for start in range(0, len(frontier), chunk_size)]
+            no_moves = sum(pool.imap(_expand_chunk, tasks) if pool is not None else map(_expand_chunk, tasks))
+            if expand_children:
+                parts = [np.load(task[3]) for task in tasks if task[3] is not None]
+                new = _sorted_unique(np.concatenate(parts), kind="stable") if parts else np.zeros(0, dtype=np.uint64)
+                del parts
+                for task in tasks:
+                    if task[3] is not None:
+                        os.remove(task[3])
+                for previous in range(depth - 1, -1, -2): # same parity as depth + 1
+                    new = _remove_seen(new, np.load(level_filenames[previous], mmap_mode="r"))
+            os.remove(frontier_filename)
+            levels.append(CensusLevel(depth, count, int(np.count_nonzero(reached_base)), no_moves, time.perf_counter() - start_time))
+            if verbose:
+                level = levels[-1]
+                print(f"Depth {depth}: {level.new} new positions, {level.terminal} terminal ({level.base_reached} base reached, {level.no_moves} without moves) in {level.elapsed:.2f}s")
+            if not len(new):
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if own_directory:
+            shutil.rmtree(directory, ignore_errors=True)
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the reachable topcap positions by depth")
+    parser.add_argument("--depth", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--spill-directory", default=None)
+    args = parser.parse_args()
+    levels = census(args.depth, workers=args.workers, spill_directory=args.spill_directory)
+    print(f"{sum(level.new for level in levels)} positions, {sum(level.terminal for level in levels)} terminal")
+
+
+if __name__ == "__main__":
+    main()
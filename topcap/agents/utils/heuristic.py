@@ -1,8 +1,52 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
 from math import pow
 from typing import override
+import numpy as np
+from numpy.typing import NDArray
+
 from topcap.core.common import Color, Board
+from topcap.core.common.board import _TILE_TO_COORDS_CACHE, _TILE_TO_SQUARE, _BASE_TILES
 from topcap.utils import distance
+from topcap.utils.instrumentation import counted
+
+# Pieces are indexed by square = y * 6 + x, colors by 0 = white, 1 = black
+_SQUARES = 36
+_MAX_DISTANCE = 10
+_COLORS = (Color.WHITE, Color.BLACK)
+
+# Distance of every tile to each base, so we never re-validate tile strings while evaluating
+_DISTANCE_TO_BASE: dict[str, dict[str, int]] = {
+    base: {tile: distance(tile, base) for tile in _TILE_TO_COORDS_CACHE} for base in _BASE_TILES.values()
+}
+
+def _square(tile: str) -> int:
+    return _TILE_TO_SQUARE[tile]
+
+# one hot encoding of the distance of each square to the opponent base, per color: (2, 36, 11)
+_DISTANCE_ONE_HOT: NDArray[np.float64] = np.zeros((2, _SQUARES, _MAX_DISTANCE + 1))
+for _c, _color in enumerate(_COLORS):
+    for _tile, _distance in _DISTANCE_TO_BASE[_BASE_TILES[_color.opposite()]].items():
+        _DISTANCE_ONE_HOT[_c, _square(_tile), _distance] = 1.0
+
+@dataclass
+class BoardFeatures:
+    """The terms both heuristics are built from, stacked for n positions"""
+    distances: NDArray[np.float64] # (n, 2, 11) histogram of piece distances to the opponent base, [white, black]
+    mobility: NDArray[np.int64] # (n, 2) number of valid moves, [white, black]
+    current_player: NDArray[np.int64] # (n,) Color value of the player to move
+
+    @staticmethod
+    def from_boards(boards: Sequence[Board]) -> "BoardFeatures":
+        contents = np.stack([board.board for board in boards]).reshape(len(boards), _SQUARES)
+        pieces = np.stack([contents == color.value for color in _COLORS], axis=1) # (n, 2, 36)
+        distances = np.einsum("ncs,csd->ncd", pieces.astype(np.float64), _DISTANCE_ONE_HOT)
+        mobility = np.array([[board.mobility[color] for color in _COLORS] for board in boards], dtype=np.int64)
+        current_player = np.array([board.current_player.value for board in boards], dtype=np.int64)
+        return BoardFeatures(distances, mobility, current_player)
+
 
 class Heuristic(ABC): 
     def __init__(self):
@@ -12,6 +56,10 @@ class Heuristic(ABC):
     def evaluate(self, board : Board) -> float:
         # + is advantage for white, - is advantage for black
         raise NotImplementedError("Heuristic must be implemented in Subclass!")
+
+    def evaluate_batch(self, boards: Sequence[Board]) -> NDArray[np.float64]:
+        """Evaluates many positions in one call. Subclasses override this with a vectorised version"""
+        return np.array([self.evaluate(board) for board in boards], dtype=np.float64)
     
     @abstractmethod
     def name(self) -> str:
@@ -25,15 +73,14 @@ class SimpleHeuristic(Heuristic):
         self.available_moves_factor: float = available_moves_factor
 
     @override
+    @counted("heuristic.evaluate")
     def evaluate(self, board: Board) -> float:
         self.board: Board = board
         evaluation = 0
         for tile in board.tiles[Color.BLACK] + board.tiles[Color.WHITE]:
             evaluation += self.evaluate_distance_to_opponent_base(tile)
-        available_black_moves = board.get_all_valid_moves(Color.BLACK)
-        available_white_moves = board.get_all_valid_moves(Color.WHITE)
-        evaluation -= self.available_moves_factor * len(available_black_moves)
-        evaluation += self.available_moves_factor * len(available_white_moves)
+        evaluation -= self.available_moves_factor * board.mobility[Color.BLACK]
+        evaluation += self.available_moves_factor * board.mobility[Color.WHITE]
         return evaluation
     
     def evaluate_distance_to_opponent_base(self, tile: str) -> float:
@@ -43,7 +90,32 @@ class SimpleHeuristic(Heuristic):
         opponent_base = self.board.base_tile[color.opposite()]
         factor: int = -1 * color.value
         initiative_factor = 1.0 / self.initiative_factor if color == self.board.current_player else 1.0
-        return factor * initiative_factor * self.distance_factor * distance(tile, opponent_base)
+        return factor * initiative_factor * self.distance_factor * _DISTANCE_TO_BASE[opponent_base][tile]
+
+    @override
+    @counted("heuristic.evaluate_batch")
+    def evaluate_batch(self, boards: Sequence[Board]) -> NDArray[np.float64]:
+        if not boards:
+            return np.zeros(0)
+        return self.evaluate_features(BoardFeatures.from_boards(boards))
+
+    def evaluate_terms(self, distances: Sequence[Sequence[int]], mobility: Sequence[int], current_player: Color) -> float:
+        """Scalar version of evaluate_features, for evaluators that keep the terms up to date themselves"""
+        evaluation = 0.0
+        for c, color in enumerate(_COLORS):
+            initiative_factor = 1.0 / self.initiative_factor if color == current_player else 1.0
+            distance_sum = sum(d * count for d, count in enumerate(distances[c]))
+            evaluation -= color.value * initiative_factor * self.distance_factor * distance_sum
+        evaluation += self.available_moves_factor * (mobility[0] - mobility[1])
+        return evaluation
+
+    def evaluate_features(self, features: BoardFeatures) -> NDArray[np.float64]:
+        distance_sums = features.distances @ np.arange(_MAX_DISTANCE + 1) # (n, 2)
+        initiative = np.where(features.current_player[:, None] == np.array([color.value for color in _COLORS]), 1.0 / self.initiative_factor, 1.0)
+        terms = initiative * self.distance_factor * distance_sums
+        evaluation = terms[:, 1] - terms[:, 0]
+        evaluation += self.available_moves_factor * (features.mobility[:, 0] - features.mobility[:, 1])
+        return evaluation
 
     @override
     def name(self):
@@ -58,6 +130,7 @@ class ExponentialHeuristic(Heuristic):
         self.flexibility_exponent: float = flexibility_exponent
 
     @override
+    @counted("heuristic.evaluate")
     def evaluate(self, board: Board) -> float:
         self.board: Board = board
         evaluation = 0
@@ -82,14 +155,14 @@ class ExponentialHeuristic(Heuristic):
         if color == Color.NONE:
             raise ValueError(f"No piece at tile {tile}")
         opponent_base = self.board.base_tile[color.opposite()]
-        return distance(tile, opponent_base)
+        return _DISTANCE_TO_BASE[opponent_base][tile]
 
 
     def flexibility_evaluation(self) -> float:
         evaluation = 0.0
         flexibility: dict[Color, float] = {}
         for color in Color.BLACK, Color.WHITE:
-            flexibility[color] = len(self.board.get_all_valid_moves(color))
+            flexibility[color] = self.board.mobility[color]
         if flexibility[self.board.current_player] == 0: # Loss condition
             return float("-inf") * self.board.current_player.value
         for color, flex in flexibility.items():
@@ -97,6 +170,119 @@ class ExponentialHeuristic(Heuristic):
             evaluation += flexibility_score * color.value
         return evaluation
 
+    @override
+    @counted("heuristic.evaluate_batch")
+    def evaluate_batch(self, boards: Sequence[Board]) -> NDArray[np.float64]:
+        if not boards:
+            return np.zeros(0)
+        return self.evaluate_features(BoardFeatures.from_boards(boards))
+
+    def evaluate_terms(self, distances: Sequence[Sequence[int]], mobility: Sequence[int], current_player: Color) -> float:
+        """Scalar version of evaluate_features, for evaluators that keep the terms up to date themselves"""
+        evaluation = 0.0
+        if self.distance_factor != 0:
+            if distances[1][0] > 0: # Victory condition
+                distance_evaluation = float("-inf")
+            elif distances[0][0] > 0:
+                distance_evaluation = float("inf")
+            else:
+                distance_evaluation = 0.0
+                for d in range(1, _MAX_DISTANCE + 1):
+                    if distances[0][d] or distances[1][d]:
+                        distance_evaluation += pow(12 - d, self.distance_exponent) * (distances[0][d] - distances[1][d])
+            evaluation += distance_evaluation * self.distance_factor
+        if self.flexibiliy_factor != 0:
+            if mobility[0 if current_player == Color.WHITE else 1] == 0: # Loss condition
+                flexibility_evaluation = float("-inf") * current_player.value
+            else:
+                flexibility_evaluation = pow(mobility[0], self.flexibility_exponent) - pow(mobility[1], self.flexibility_exponent)
+            evaluation += flexibility_evaluation * self.flexibiliy_factor
+        return evaluation
+
+    def evaluate_features(self, features: BoardFeatures) -> NDArray[np.float64]:
+        evaluation = np.zeros(len(features.current_player))
+        with np.errstate(invalid="ignore"): # inf - inf is nan, like in evaluate()
+            if self.distance_factor != 0:
+                scores = np.power(12.0 - np.arange(_MAX_DISTANCE + 1), self.distance_exponent)
+                distance_evaluation = features.distances[:, 0] @ scores - features.distances[:, 1] @ scores
+                # Victory condition, black pieces are checked first in evaluate()
+                distance_evaluation = np.where(features.distances[:, 0, 0] > 0, float("inf"), distance_evaluation)
+                distance_evaluation = np.where(features.distances[:, 1, 0] > 0, float("-inf"), distance_evaluation)
+                evaluation += distance_evaluation * self.distance_factor
+            if self.flexibiliy_factor != 0:
+                flexibility = np.power(features.mobility.astype(np.float64), self.flexibility_exponent)
+                flexibility_evaluation = flexibility[:, 0] - flexibility[:, 1]
+                current_mobility = np.where(features.current_player == Color.WHITE.value, features.mobility[:, 0], features.mobility[:, 1])
+                # Loss condition
+                flexibility_evaluation = np.where(current_mobility == 0, float("-inf") * features.current_player, flexibility_evaluation)
+                evaluation += flexibility_evaluation * self.flexibiliy_factor
+        return evaluation
+
     @override
     def name(self):
         return f"Exponential Heuristic (df:{self.distance_factor}, ff:{self.flexibiliy_factor}) (de:{self.distance_exponent}, fe:{self.flexibility_exponent})"
+
+
+class CachedHeuristic(Heuristic):
+    """Wraps any heuristic with a bounded LRU cache keyed by position and player to move.
+    Can be passed to any agent instead of the wrapped heuristic."""
+    def __init__(self, heuristic: Heuristic, max_size: int = 100_000):
+        super().__init__()
+        self.heuristic: Heuristic = heuristic
+        self.max_size: int = max_size
+        self.cache: OrderedDict[int, float] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @override
+    def evaluate(self, board: Board) -> float:
+        key = board.position_key()
+        evaluation = self.cache.get(key)
+        if evaluation is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return evaluation
+        self.misses += 1
+        evaluation = self.heuristic.evaluate(board)
+        self.cache[key] = evaluation
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        return evaluation
+
+    @override
+    def evaluate_batch(self, boards: Sequence[Board]) -> NDArray[np.float64]:
+        evaluations = np.zeros(len(boards))
+        keys = [board.position_key() for board in boards]
+        missing: list[int] = []
+        for i, key in enumerate(keys):
+            evaluation = self.cache.get(key)
+            if evaluation is None:
+                missing.append(i)
+                continue
+            self.hits += 1
+            self.cache.move_to_end(key)
+            evaluations[i] = evaluation
+        if missing:
+            self.misses += len(missing)
+            evaluations[missing] = self.heuristic.evaluate_batch([boards[i] for i in missing])
+            for i in missing:
+                self.cache[keys[i]] = float(evaluations[i])
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return evaluations
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def cache_info(self) -> str:
+        return f"hits={self.hits}, misses={self.misses}, hit rate={self.hit_rate():.1%}, size={len(self.cache)}/{self.max_size}"
+
+    def clear(self):
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @override
+    def name(self):
+        return f"Cached {self.heuristic.name()}"
@@ -0,0 +1,61 @@
+from math import isclose, isnan
+
+from topcap.core.common import Color, Board, Move
+from topcap.core.common.board import _BASE_TILES, _TILE_TO_SQUARE
+from .heuristic import SimpleHeuristic, ExponentialHeuristic, _COLORS, _DISTANCE_TO_BASE, _MAX_DISTANCE, _SQUARES
+
+_SQUARE_DISTANCE: list[list[int]] = [[0] * _SQUARES for _ in _COLORS]
+for _c, _color in enumerate(_COLORS):
+    for _tile, _distance in _DISTANCE_TO_BASE[_BASE_TILES[_color.opposite()]].items():
+        _SQUARE_DISTANCE[_c][_TILE_TO_SQUARE[_tile]] = _distance
+
+
+class IncrementalEvaluator:
+    """Keeps the heuristic terms of a board up to date while moves are made and unmade on it.
+    Use evaluator.move() / evaluator.unmake() instead of calling them on the board directly.
+    Mobility is tracked by the board itself, the evaluator only keeps the distance histograms.
+    With check=True every update is compared against a full heuristic.evaluate()."""
+    def __init__(self, heuristic: SimpleHeuristic | ExponentialHeuristic, board: Board, check: bool = False):
+        if not isinstance(heuristic, (SimpleHeuristic, ExponentialHeuristic)):
+            raise TypeError(f"Incremental evaluation is not supported for {heuristic.name()}")
+        self.heuristic: SimpleHeuristic | ExponentialHeuristic = heuristic
+        self.board: Board = board
+        self.check: bool = check
+        self.reset()
+
+    def reset(self):
+        """Recomputes all terms from scratch, needed if the board was changed behind the evaluator's back"""
+        self.distances: list[list[int]] = [[0] * (_MAX_DISTANCE + 1) for _ in _COLORS]
+        for c, color in enumerate(_COLORS):
+            for tile in self.board.tiles[color]:
+                self.distances[c][_SQUARE_DISTANCE[c][_TILE_TO_SQUARE[tile]]] += 1
+
+    def evaluate(self) -> float:
+        mobility = self.board.mobility
+        return self.heuristic.evaluate_terms(self.distances, (mobility[Color.WHITE], mobility[Color.BLACK]), self.board.current_player)
+
+    def move(self, move: Move):
+        self.board.move(move)
+        self._apply(self.board.current_player.opposite(), _TILE_TO_SQUARE[move.from_tile], _TILE_TO_SQUARE[move.to_tile])
+
+    def unmake(self, move: Move):
+        self.board.unmake(move)
+        self._apply(self.board.current_player, _TILE_TO_SQUARE[move.to_tile], _TILE_TO_SQUARE[move.from_tile])
+
+    def _apply(self, color: Color, from_square: int, to_square: int):
+        c = 0 if color == Color.WHITE else 1
+        self.distances[c][_SQUARE_DISTANCE[c][from_square]] -= 1
+        self.distances[c][_SQUARE_DISTANCE[c][to_square]] += 1
+        if self.check:
+            self._check()
+
+    def _check(self):
+        for color in _COLORS:
+            expected_moves = len(self.board.get_all_valid_moves(color))
+            assert self.board.mobility[color] == expected_moves, f"{color} mobility {self.board.mobility[color]} != {expected_moves} on {self.board.to_str()}"
+        expected = self.heuristic.evaluate(self.board)
+        evaluation = self.evaluate()
+        if isnan(expected):
+            assert isnan(evaluation), f"Evaluation {evaluation} != {expected} on {self.board.to_str()}"
+        else:
+            assert evaluation == expected or isclose(evaluation, expected, abs_tol=1e-9), f"Evaluation {evaluation} != {expected} on {self.board.to_str()}"
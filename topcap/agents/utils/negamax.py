@@ -0,0 +1,146 @@
+from collections import Counter
+from dataclasses import dataclass
+from math import isnan
+from multiprocessing.queues import Queue
+from multiprocessing.synchronize import Event
+import time
+
+from topcap.core.common import Color, Board, Move
+from .heuristic import Heuristic
+from .search import AnytimeSearch
+from .transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+WIN_SCORE = 1_000_000.0 # minus the number of plies to the win, so faster wins score higher
+MAX_EVALUATION = WIN_SCORE / 2 # heuristic scores are clipped to this
+
+
+class _Stop(Exception):
+    pass
+
+
+@dataclass
+class DepthResult:
+    """Result of the deepest fully searched iteration"""
+    move: Move | None = None
+    score: float = 0.0
+    depth: int = 0
+    nodes: int = 0
+    elapsed: float = 0.0
+
+
+class NegamaxSearch:
+    """Iterative deepening alpha-beta (negamax) with a transposition table.
+    A position repeated on the search path, or for the third time counting the game history, is scored as a draw."""
+    def __init__(self, heuristic: Heuristic, table: TranspositionTable, history: Counter[int] | None = None, stop: Event | None = None):
+        self.heuristic: Heuristic = heuristic
+        self.table: TranspositionTable = table
+        self.history: Counter[int] = history if history is not None else Counter()
+        self.stop: Event | None = stop
+        self.path: Counter[int] = Counter()
+        self.search: AnytimeSearch = AnytimeSearch(0)
+        self.board: Board = Board()
+        self.root_best: tuple[Move | None, float] = (None, 0.0)
+
+    def iterative_deepening(self, board: Board, max_time: float, max_depth: int, start_depth: int = 1, max_nodes: int | None = None) -> DepthResult:
+        self.board = board.__copy__() # moves are made and unmade on our own copy
+        self.search = AnytimeSearch(max_time, max_nodes=max_nodes)
+        self.search.start(best_move=lambda: self.root_best)
+        self.path.clear()
+        result = DepthResult()
+        depth = min(start_depth, max_depth)
+        try:
+            while depth <= max_depth:
+                score = self._negamax(depth, -float("inf"), float("inf"), 0)
+                result = DepthResult(self.root_best[0], score, depth, self.search.report.nodes)
+                if abs(score) >= MAX_EVALUATION: # the game is decided, deeper searches won't change it
+                    break
+                depth += 1
+        except _Stop:
+            pass
+        report = self.search.finish()
+        result.nodes = report.nodes
+        result.elapsed = report.elapsed
+        if result.move is None: # not even depth 1 finished, fall back to the first move searched
+            result.move = self.root_best[0] or next(iter(self.board.get_all_valid_moves(self.board.current_player)), None)
+        return result
+
+    def _negamax(self, depth: int, alpha: float, beta: float, ply: int) -> float:
+        if self.search.tick() or (self.stop is not None and self.stop.is_set()):
+            raise _Stop()
+        board = self.board
+        winner, _ = board.get_win_reason()
+        if winner != Color.NONE:
+            return WIN_SCORE - ply if winner == board.current_player else -(WIN_SCORE - ply)
+        position = board.to_hash()
+        if ply > 0 and (self.path[position] > 0 or self.history[position] >= 2):
+            return 0.0
+        if depth == 0:
+            return self._evaluate(board)
+        key = (position << 1) | (board.current_player == Color.BLACK)
+        original_alpha = alpha
+        entry = self.table.probe(key)
+        table_move: Move | None = None
+        if entry is not None:
+            score, entry_depth, flag, table_move = entry
+            if ply > 0 and entry_depth >= depth:
+                if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                    return score
+        best_score = -float("inf")
+        best_move: Move | None = None
+        self.path[position] += 1
+        try:
+            for move in self._ordered_moves(board, table_move):
+                board.move(move)
+                try:
+                    score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+                finally:
+                    board.unmake(move)
+                if score > best_score:
+                    best_score = score
+                    best_move = move
+                    if ply == 0:
+                        self.root_best = (move, score)
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break
+        finally:
+            self.path[position] -= 1
+        flag = UPPER if best_score <= original_alpha else LOWER if best_score >= beta else EXACT
+        self.table.store(key, best_score, depth, flag, best_move)
+        return best_score
+
+    def _evaluate(self, board: Board) -> float:
+        evaluation = self.heuristic.evaluate(board) * board.current_player.value
+        if isnan(evaluation):
+            return 0.0
+        return max(-MAX_EVALUATION, min(MAX_EVALUATION, evaluation))
+
+    def _ordered_moves(self, board: Board, table_move: Move | None) -> list[Move]:
+        moves = board.get_all_valid_moves(board.current_player)
+        opponent_base = board.base_tile[board.current_player.opposite()]
+        first: list[Move] = []
+        rest: list[Move] = []
+        for move in moves:
+            if move.to_tile == opponent_base or (table_move is not None and move.from_tile == table_move.from_tile and move.to_tile == table_move.to_tile):
+                first.append(move)
+            else:
+                rest.append(move)
+        return first + rest
+
+
+def smp_worker(table_name: str, table_size: int, heuristic: Heuristic, tasks: Queue, results: Queue, stop: Event):
+    """Lazy SMP helper process: searches every root it gets on the shared table until it receives None"""
+    table = TranspositionTable.attach(table_name, table_size)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            search_id, board, history, max_time, max_depth, start_depth = task
+            searcher = NegamaxSearch(heuristic, table, history, stop)
+            start = time.perf_counter()
+            result = searcher.iterative_deepening(board, max_time, max_depth, start_depth)
+            result.elapsed = time.perf_counter() - start
+            results.put((search_id, result))
+    finally:
+        table.close()
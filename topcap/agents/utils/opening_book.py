@@ -0,0 +1,185 @@
+from collections import Counter
+from dataclasses import dataclass
+import argparse
+import multiprocessing as mp
+import os
+import pickle
+import time
+import numpy as np
+from numpy.typing import NDArray
+
+from topcap.core.common import Color, Board, Move
+from .heuristic import Heuristic, SimpleHeuristic
+from .negamax import NegamaxSearch
+from .transposition import TranspositionTable
+
+# One 16 byte record per slot, key 0 marks an empty slot
+BOOK_DTYPE = np.dtype([("key", "<u8"), ("score", "<f4"), ("move", "<u2"), ("depth", "u1"), ("pad", "u1")])
+_MULTIPLIER = 0x9E3779B97F4A7C15 # spreads the packed piece positions over the slots
+
+
+@dataclass
+class BookEntry:
+    move: Move
+    score: float # from the point of view of the player to move
+    depth: int
+
+
+def _slot(key: int, mask: int) -> int:
+    return ((key * _MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> 20 & mask
+
+
+class OpeningBook:
+    """Read-only opening book, an open addressing hash table memory-mapped from disk.
+    Keys are Board.position_key(), so lookups do not depend on how the position was reached."""
+    def __init__(self, filename: str):
+        self.filename: str = filename
+        self.records: NDArray = np.memmap(filename, dtype=BOOK_DTYPE, mode="r")
+        self.mask: int = len(self.records) - 1
+        if len(self.records) & self.mask:
+            raise ValueError(f"{filename} is not an opening book, its size is not a power of two records")
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.records["key"]))
+
+    def lookup(self, board: Board) -> BookEntry | None:
+        key = board.position_key()
+        slot = _slot(key, self.mask)
+        while True:
+            record = self.records[slot]
+            stored_key = int(record["key"])
+            if stored_key == key:
+                self.hits += 1
+                return BookEntry(Move.from_int(int(record["move"])), float(record["score"]), int(record["depth"]))
+            if stored_key == 0:
+                self.misses += 1
+                return None
+            slot = (slot + 1) & self.mask
+
+    def book_move(self, board: Board, history: Counter[int] | None = None) -> Move | None:
+        """The stored move if the position is in the book and the move is legal, for agents to play before searching.
+        history counts the positions of the game by to_hash(): a book move to a position seen twice would be a threefold
+        repetition draw, the book does not know about it, so it is left to the search."""
+        entry = self.lookup(board)
+        if entry is None or not board.move_is_valid(entry.move, board.current_player):
+            return None
+        if history is not None:
+            after = board.__copy__()
+            after.move(entry.move)
+            if history[after.to_hash()] >= 2:
+                return None
+        return entry.move
+
+
+def write_book(filename: str, results: dict[int, tuple[int, float, int]]):
+    """Writes {position key: (move int, score, depth)} as a book file, at most half full"""
+    capacity = 1
+    while capacity < 2 * len(results):
+        capacity *= 2
+    records = np.zeros(capacity, dtype=BOOK_DTYPE)
+    mask = capacity - 1
+    for key, (move, score, depth) in results.items():
+        slot = _slot(key, mask)
+        while records[slot]["key"] != 0:
+            slot = (slot + 1) & mask
+        records[slot] = (key, score, move, min(depth, 255), 0)
+    temporary = filename + ".tmp"
+    records.tofile(temporary)
+    os.replace(temporary, filename)
+
+
+def book_positions(plies: int) -> list[Board]:
+    """All positions reachable from the initial setup in less than plies moves, without finished games"""
+    positions: list[Board] = []
+    seen: set[int] = set()
+    level = [Board()]
+    for _ in range(plies):
+        next_level: list[Board] = []
+        for board in level:
+            key = board.position_key()
+            if key in seen or board.get_win_reason()[0] != Color.NONE:
+                continue
+            seen.add(key)
+            positions.append(board)
+            for move in board.get_all_valid_moves(board.current_player):
+                new_board = board.__copy__()
+                new_board.move(move)
+                next_level.append(new_board)
+        level = next_level
+    return positions
+
+
+_worker_heuristic: Heuristic | None = None
+_worker_table: TranspositionTable | None = None
+
+def _init_worker(heuristic: Heuristic):
+    global _worker_heuristic, _worker_table
+    _worker_heuristic = heuristic
+    _worker_table = TranspositionTable(1 << 18)
+
+def _search_position(task: tuple[Board, int, float]) -> tuple[int, tuple[int, float, int]]:
+    board, depth, max_time = task
+    assert _worker_heuristic is not None and _worker_table is not None
+    result = NegamaxSearch(_worker_heuristic, _worker_table).iterative_deepening(board, max_time, depth)
+    assert result.move is not None
+    return board.position_key(), (result.move.to_int(), result.score, result.depth)
+
+
+def build_opening_book(filename: str, plies: int, depth: int, heuristic: Heuristic, workers: int = 1, max_time: float = 60, checkpoint_every: int = 20, verbose: bool = True) -> dict[int, tuple[int, float, int]]:
+    """Searches every position of the first plies to depth (or max_time) in parallel and writes the book.
+    Finished searches are checkpointed to filename + '.progress', so an interrupted build resumes where it stopped.
+    Only a build with the same plies, depth and heuristic resumes, otherwise shallow and deep entries would mix."""
+    progress_filename = filename + ".progress"
+    settings = {"plies": plies, "depth": depth, "heuristic": heuristic.name()}
+    results: dict[int, tuple[int, float, int]] = {}
+    if os.path.exists(progress_filename):
+        progress = pickle.load(open(progress_filename, 'rb'))
+        if not isinstance(progress, dict) or progress.get("settings") != settings:
+            stored = progress.get("settings") if isinstance(progress, dict) else None
+            raise ValueError(f"{progress_filename} was built with {stored}, not {settings}. Rerun with the same settings or delete it")
+        results = progress["results"]
+    positions = book_positions(plies)
+    tasks = [(board, depth, max_time) for board in positions if board.position_key() not in results]
+    if verbose:
+        print(f"Building opening book {filename}: {len(positions)} positions in {plies} plies, {len(positions) - len(tasks)} already done, depth {depth}, {workers} workers")
+
+    def checkpoint():
+        temporary = progress_filename + ".tmp"
+        pickle.dump({"settings": settings, "results": results}, open(temporary, 'wb'))
+        os.replace(temporary, progress_filename)
+
+    start = time.perf_counter()
+    done = 0
+    context = mp.get_context("spawn")
+    with context.Pool(workers, initializer=_init_worker, initargs=(heuristic,)) as pool:
+        for key, result in pool.imap_unordered(_search_position, tasks):
+            results[key] = result
+            done += 1
+            if done % checkpoint_every == 0:
+                checkpoint()
+                if verbose:
+                    elapsed = time.perf_counter() - start
+                    print(f"\r{done}/{len(tasks)} positions searched ({done / elapsed:.1f} positions/s)", end="", flush=True)
+    write_book(filename, results)
+    if os.path.exists(progress_filename):
+        os.remove(progress_filename)
+    if verbose:
+        print(f"\nWrote {len(results)} positions to {filename} in {time.perf_counter() - start:.1f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a topcap opening book")
+    parser.add_argument("filename")
+    parser.add_argument("--plies", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--max-time", type=float, default=60)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    build_opening_book(args.filename, args.plies, args.depth, SimpleHeuristic(), args.workers, args.max_time)
+
+
+if __name__ == "__main__":
+    main()
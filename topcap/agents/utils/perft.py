@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+import argparse
+import json
+import os
+import random
+import subprocess
+import time
+import numpy as np
+from numpy.typing import NDArray
+
+from topcap.core.common import Color, Board
+from topcap.core.common.native import native_available, native_perft, _bitboards
+from .batch_moves import generate_moves, encode_keys, decode_keys, base_reached
+
+CPP_PERFT = os.path.join(os.path.dirname(__file__), "..", "..", "..", "cpp", "build", "perft") # built with `make perft` in cpp/
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "..", "tests", "fixtures", "perft.json")
+
+
+@dataclass
+class PerftResult:
+    backend: str
+    key: int
+    depth: int
+    count: int
+    elapsed: float
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.count / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def board_from_key(key: int) -> Board:
+    """Board of a position_key()"""
+    board = Board()
+    board.from_hash(key >> 1)
+    board.current_player = Color.BLACK if key & 1 else Color.WHITE
+    return board
+
+
+def perft_board(board: Board, depth: int) -> int:
+    """Number of move sequences of exactly depth plies with the python Board. Finished games are not continued."""
+    if depth == 0:
+        return 1
+    if board.get_win_reason()[0] != Color.NONE:
+        return 0
+    moves = board.get_all_valid_moves(board.current_player)
+    if depth == 1:
+        return len(moves)
+    count = 0
+    for move in moves:
+        board.move(move)
+        count += perft_board(board, depth - 1)
+        board.unmake(move)
+    return count
+
+
+def perft_batch(board: Board, depth: int) -> int:
+    """Same count with the numpy move generator, one ply at a time. Transpositions are merged and carry
+    the number of sequences leading to them, so this is a lot faster than walking every sequence."""
+    keys: NDArray[np.uint64] = np.array([board.position_key()], dtype=np.uint64)
+    counts: NDArray[np.int64] = np.ones(1, dtype=np.int64)
+    for _ in range(depth):
+        alive = ~base_reached(keys)
+        keys, counts = keys[alive], counts[alive]
+        white, black, black_to_move = decode_keys(keys)
+        child_keys: list[NDArray[np.uint64]] = []
+        child_counts: list[NDArray[np.int64]] = []
+        for batch in generate_moves(white, black, black_to_move):
+            child_keys.append(encode_keys(batch.white, batch.black, batch.black_to_move))
+            child_counts.append(counts[batch.rows])
+        if not child_keys:
+            return 0
+        all_keys = np.concatenate(child_keys)
+        order = np.argsort(all_keys)
+        all_keys, all_counts = all_keys[order], np.concatenate(child_counts)[order]
+        starts = np.flatnonzero(np.concatenate([[True], all_keys[1:] != all_keys[:-1]]))
+        keys, counts = all_keys[starts], np.add.reduceat(all_counts, starts)
+    return int(counts.sum())
+
+
+def perft_native(board: Board, depth: int) -> int:
+    """Same count with the C++ engine through the shared library (`make lib` in cpp/)"""
+    white, black = _bitboards(board)
+    return native_perft(white, black, board.current_player == Color.WHITE, depth)
+
+
+def perft_cpp(positions: list[tuple[Board, int]], binary: str = CPP_PERFT) -> list[tuple[int, float]]:
+    """(count, seconds) of every (board, depth) with the C++ engine, timed inside the engine"""
+    lines = []
+    for board, depth in positions:
+        white, black = _bitboards(board)
+        lines.append(f"{white} {black} {int(board.current_player == Color.WHITE)} {depth}\n")
+    output = subprocess.run([binary], input="".join(lines), capture_output=True, text=True, check=True).stdout
+    results = []
+    for line in output.splitlines():
+        count, nanoseconds = line.split()
+        results.append((int(count), int(nanoseconds) / 1e9))
+    return results
+
+
+def available_backends() -> list[str]:
+    return ["python", "numpy"] + (["native"] if native_available() else []) + (["cpp"] if os.path.exists(CPP_PERFT) else [])
+
+
+def run_perft(backend: str, positions: list[tuple[Board, int]]) -> list[PerftResult]:
+    if backend == "cpp":
+        return [PerftResult(backend, board.position_key(), depth, count, elapsed) for (board, depth), (count, elapsed) in zip(positions, perft_cpp(positions))]
+    perft = {"python": perft_board, "numpy": perft_batch, "native": perft_native}[backend]
+    results = []
+    for board, depth in positions:
+        start = time.perf_counter()
+        count = perft(board.__copy__(), depth)
+        results.append(PerftResult(backend, board.position_key(), depth, count, time.perf_counter() - start))
+    return results
+
+
+def random_positions(count: int, seed: int = 0, min_plies: int = 4, max_plies: int = 30) -> list[Board]:
+    """Positions of random games, none of them finished"""
+    rng = random.Random(seed)
+    positions: list[Board] = []
+    while len(positions) < count:
+        board = Board()
+        for _ in range(rng.randint(min_plies, max_plies)):
+            moves = board.get_all_valid_moves(board.current_player)
+            if not moves:
+                break
+            board.move(rng.choice(moves))
+            if board.get_win_reason()[0] != Color.NONE:
+                break
+        if board.get_win_reason()[0] == Color.NONE:
+            positions.append(board)
+    return positions
+
+
+def write_fixture(filename: str = FIXTURE, start_depth: int = 7, random_count: int = 20, random_depth: int = 5):
+    """Reference counts of the start position and a corpus of random positions, computed with the numpy backend.
+    Every backend is checked against these, so only regenerate them after checking the new counts with another backend."""
+    entries = [{"key": Board().position_key(), "counts": [perft_batch(Board(), depth) for depth in range(start_depth + 1)]}]
+    for board in random_positions(random_count):
+        entries.append({"key": board.position_key(), "counts": [perft_batch(board, depth) for depth in range(random_depth + 1)]})
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    json.dump({"positions": entries}, open(filename, 'w'), indent=1)
+
+
+def load_fixture(filename: str = FIXTURE) -> list[tuple[Board, list[int]]]:
+    return [(board_from_key(entry["key"]), entry["counts"]) for entry in json.load(open(filename))["positions"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time move generation of every engine backend against the perft fixtures")
+    parser.add_argument("--backends", nargs="+", default=available_backends())
+    parser.add_argument("--max-depth", type=int, default=5)
+    parser.add_argument("--write-fixture", action="store_true", help="recompute the reference counts")
+    args = parser.parse_args()
+    if args.write_fixture:
+        write_fixture()
+    fixture = load_fixture()
+    positions = [(board, depth) for board, counts in fixture for depth in range(1, min(len(counts) - 1, args.max_depth) + 1)]
+    expected = [counts[depth] for board, counts in fixture for depth in range(1, min(len(counts) - 1, args.max_depth) + 1)]
+    print(f"{len(fixture)} positions, depths 1 to {args.max_depth}")
+    for backend in args.backends:
+        results = run_perft(backend, positions)
+        wrong = [(result, count) for result, count in zip(results, expected) if result.count != count]
+        total_count = sum(result.count for result in results)
+        total_time = sum(result.elapsed for result in results)
+        print(f"{backend:>7}: {'OK' if not wrong else f'{len(wrong)} WRONG'} - {total_count} leaves in {total_time:.3f}s ({total_count / total_time:,.0f} leaves/s)")
+        for result, count in wrong[:10]:
+            print(f"         key {result.key} depth {result.depth}: {result.count}, expected {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from enum import Enum
+import os
+import pickle
+import time
+
+from topcap.core.common import Color, Board, Move
+
+INFINITY = 10**9
+
+
+class Outcome(Enum):
+    """Game theoretic result, always from the point of view of the player to move"""
+    WIN = "win"
+    LOSS = "loss"
+    DRAW = "draw"
+    UNKNOWN = "unknown"
+
+
+@dataclass
+class ProofResult:
+    outcome: Outcome = Outcome.UNKNOWN
+    line: list[Move] = field(default_factory=list) # principal line, starting with the move of the player to move
+    nodes: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def best_move(self) -> Move | None:
+        return self.line[0] if self.line else None
+
+
+class ProofTable:
+    """Proven wins and losses by position_key(), optionally persisted with pickle.
+    Draws depend on the game history (threefold repetition) and are never stored, neither are proofs that went
+    through a repeated position. The rest only hold while no position of the game history or the search path
+    occurred twice, ProofNumberSearch only looks them up then."""
+    def __init__(self, filename: str | None = None):
+        self.filename: str | None = filename
+        self.results: dict[int, tuple[Outcome, str | None]] = {} # outcome and best move code
+        if filename is not None and os.path.exists(filename):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def get(self, board: Board) -> tuple[Outcome, Move | None] | None:
+        result = self.results.get(board.position_key())
+        if result is None:
+            return None
+        outcome, move_code = result
+        return outcome, Move.from_code(move_code) if move_code is not None else None
+
+    def store(self, board: Board, outcome: Outcome, move: Move | None = None):
+        if outcome not in (Outcome.WIN, Outcome.LOSS):
+            raise ValueError(f"Only proven wins and losses can be stored, not {outcome}")
+        self.results[board.position_key()] = (outcome, move.to_code() if move is not None else None)
+
+    def save(self, filename: str | None = None):
+        filename = filename or self.filename
+        if filename is None:
+            raise ValueError("No filename given to save the proof table to")
+        pickle.dump(self.results, open(filename, 'wb'))
+
+    def load(self, filename: str | None = None):
+        filename = filename or self.filename
+        if filename is None:
+            raise ValueError("No filename given to load the proof table from")
+        self.results.update(pickle.load(open(filename, 'rb')))
+
+
+class _Node:
+    __slots__ = ("board", "parent", "move", "children", "pn", "dn", "is_or", "win_move", "fresh", "clean", "from_table")
+
+    def __init__(self, board: Board, parent: "_Node | None", move: Move | None, is_or: bool):
+        self.board: Board = board
+        self.parent: _Node | None = parent
+        self.move: Move | None = move
+        self.children: list[_Node] | None = None # None until expanded
+        self.pn: int = 1
+        self.dn: int = 1
+        self.is_or: bool = is_or # the prover is to move
+        self.win_move: Move | None = None # known winning move at terminal nodes
+        self.fresh: bool = True # first occurrence of the position in the game history and on the search path
+        self.clean: bool = True # no position of the history or the path up to this node occurred twice
+        self.from_table: bool = False # solved by a table entry, whose line may repeat positions of this one
+
+    def set_terminal(self, prover_wins: bool):
+        self.children = []
+        self.pn, self.dn = (0, INFINITY) if prover_wins else (INFINITY, 0)
+
+
+class ProofNumberSearch:
+    """Proof-number search over the Topcap rules, including threefold repetition.
+    Proves whether prover wins from the root. Draws by repetition count as not winning.
+    Repetitions are counted along the search path on top of the game history, like Game does."""
+    def __init__(self, prover: Color, max_nodes: int, history: Counter[int], table: ProofTable | None = None):
+        self.prover: Color = prover
+        self.max_nodes: int = max_nodes
+        self.history: Counter[int] = history
+        self.table: ProofTable | None = table
+        self.nodes: int = 0
+        self.history_clean: bool = all(count <= 1 for count in history.values())
+
+    def run(self, board: Board) -> _Node:
+        root = _Node(board.__copy__(), None, None, board.current_player == self.prover)
+        self._evaluate_leaf(root, self.history[board.to_hash()])
+        while root.pn != 0 and root.dn != 0 and self.nodes < self.max_nodes:
+            node, path_counts = self._select_most_proving(root)
+            self._expand(node, path_counts)
+            self._update_ancestors(node)
+        return root
+
+    def _select_most_proving(self, root: _Node) -> tuple[_Node, Counter[int]]:
+        path_counts = self.history.copy()
+        path_counts[root.board.to_hash()] += 1 if not self.history[root.board.to_hash()] else 0
+        node = root
+        while node.children:
+            if node.is_or:
+                node = min(node.children, key=lambda child: child.pn)
+            else:
+                node = min(node.children, key=lambda child: child.dn)
+            path_counts[node.board.to_hash()] += 1
+        return node, path_counts
+
+    def _expand(self, node: _Node, path_counts: Counter[int]):
+        node.children = []
+        for move in node.board.get_all_valid_moves(node.board.current_player):
+            board = node.board.__copy__()
+            board.move(move)
+            child = _Node(board, node, move, not node.is_or)
+            self._evaluate_leaf(child, path_counts[board.to_hash()] + 1)
+            node.children.append(child)
+            self.nodes += 1
+        self._set_numbers(node)
+
+    def _evaluate_leaf(self, node: _Node, repetitions: int):
+        board = node.board
+        node.fresh = repetitions <= 1
+        node.clean = node.fresh and (node.parent.clean if node.parent is not None else self.history_clean)
+        winner, _ = board.get_win_reason()
+        if winner != Color.NONE:
+            node.set_terminal(winner == self.prover)
+            return
+        if repetitions >= 3: # draw, the prover did not win
+            node.set_terminal(False)
+            return
+        if self.table is not None and node.clean: # stored proofs visit every position once per line, so at most twice with this path
+            stored = self.table.get(board)
+            if stored is not None:
+                outcome, move = stored
+                mover_wins = outcome == Outcome.WIN
+                node.set_terminal(mover_wins == (board.current_player == self.prover))
+                node.win_move = move if mover_wins else None
+                node.from_table = True
+                return
+        threats = board.threats(board.current_player)
+        if threats: # the player to move reaches the base next move, whatever the history
+            node.set_terminal(board.current_player == self.prover)
+            node.win_move = threats.moves[0]
+
+    def _set_numbers(self, node: _Node):
+        assert node.children is not None
+        if not node.children: # no moves left, the player to move lost
+            node.pn, node.dn = (INFINITY, 0) if node.is_or else (0, INFINITY)
+            return
+        if node.is_or:
+            node.pn = min(child.pn for child in node.children)
+            node.dn = min(INFINITY, sum(child.dn for child in node.children))
+        else:
+            node.pn = min(INFINITY, sum(child.pn for child in node.children))
+            node.dn = min(child.dn for child in node.children)
+
+    def _update_ancestors(self, node: _Node):
+        parent = node.parent
+        while parent is not None:
+            old = (parent.pn, parent.dn)
+            self._set_numbers(parent)
+            if (parent.pn, parent.dn) == old:
+                break
+            parent = parent.parent
+
+    def store_proofs(self, root: _Node):
+        """Stores the proven nodes whose proof never reached a position twice, the others depend on the history"""
+        if self.table is None:
+            return
+        order: list[_Node] = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children or [])
+        fresh_proofs: set[int] = set() # ids of the proven nodes whose proof tree only has fresh positions
+        for node in reversed(order): # children before their parents
+            if node.pn != 0 or not node.fresh or node.from_table:
+                continue
+            if not node.children:
+                fresh_proofs.add(id(node))
+                continue
+            proven = [child for child in node.children if id(child) in fresh_proofs]
+            if not proven or (not node.is_or and len(proven) < len(node.children)):
+                continue
+            fresh_proofs.add(id(node))
+            mover_wins = node.is_or
+            self.table.store(node.board, Outcome.WIN if mover_wins else Outcome.LOSS, proven[0].move if mover_wins else None)
+
+
+def _deciding_child(node: _Node, proof: bool) -> _Node:
+    """The child that keeps the proof (or disproof) alive, preferring longer lines where the choice does not matter"""
+    assert node.children
+    solved = [child for child in node.children if (child.pn if proof else child.dn) == 0]
+    if node.is_or == proof: # the side that needs just one good move
+        return solved[0]
+    expanded = [child for child in solved if child.children]
+    return expanded[0] if expanded else solved[0]
+
+
+def _principal_line(root: _Node, proof: bool) -> list[Move]:
+    line: list[Move] = []
+    node = root
+    while node.children:
+        node = _deciding_child(node, proof)
+        assert node.move is not None
+        line.append(node.move)
+    if node.win_move is not None:
+        line.append(node.win_move)
+    return line
+
+
+def prove(board: Board, max_nodes: int = 100_000, history: Iterable[Board] | None = None, table: ProofTable | None = None) -> ProofResult:
+    """Solves the position for the player to move within max_nodes generated nodes per proof.
+    history are the positions of the game so far including this one (like Game.board_states), for threefold repetition.
+    Returns Outcome.UNKNOWN if the budget runs out."""
+    start = time.perf_counter()
+    counts: Counter[int] = Counter(position.to_hash() for position in history) if history is not None else Counter()
+    result = ProofResult()
+    player = board.current_player
+    # first try to prove a win, then a loss. If both fail with a full disproof, nobody can force a win
+    disproven = 0
+    for prover, outcome in (player, Outcome.WIN), (player.opposite(), Outcome.LOSS):
+        search = ProofNumberSearch(prover, max_nodes, counts, table)
+        root = search.run(board)
+        result.nodes += search.nodes
+        search.store_proofs(root)
+        if root.pn == 0:
+            result.outcome = outcome
+            result.line = _principal_line(root, proof=True)
+            break
+        if root.dn == 0:
+            disproven += 1
+            if disproven == 2:
+                result.outcome = Outcome.DRAW
+                result.line = _principal_line(root, proof=False)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+class EndgameOracle:
+    """Lets search agents ask for proven results, with a small node budget per probe.
+    Proven wins and losses are kept in the table and reused for later probes."""
+    def __init__(self, table: ProofTable | None = None, max_nodes: int = 5_000):
+        self.table: ProofTable = table if table is not None else ProofTable()
+        self.max_nodes: int = max_nodes
+        self.probes: int = 0
+        self.solved: int = 0
+
+    def probe(self, board: Board, history: Iterable[Board] | None = None) -> ProofResult:
+        self.probes += 1
+        stored = self.table.get(board) if history is None else None # with a history, prove() decides if the entry holds
+        if stored is not None:
+            self.solved += 1
+            outcome, move = stored
+            return ProofResult(outcome, [move] if move is not None else [])
+        result = prove(board, self.max_nodes, history, self.table)
+        if result.outcome != Outcome.UNKNOWN:
+            self.solved += 1
+        return result
@@ -0,0 +1,150 @@
+from dataclasses import dataclass, field
+from typing import Callable
+import time
+
+from topcap.core.common import Move
+
+
+@dataclass
+class SearchReport:
+    """Summary of one anytime search, returned by AnytimeSearch.run()"""
+    nodes: int = 0
+    depth: int = 0
+    elapsed: float = 0.0
+    completed: bool = False # True if the search space was exhausted before the deadline
+    # (elapsed seconds, move, evaluation) every time the best move changed
+    best_moves: list[tuple[float, Move, float]] = field(default_factory=list)
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def best_move(self) -> Move | None:
+        return self.best_moves[-1][1] if self.best_moves else None
+
+    def summary(self) -> str:
+        return f"{self.nodes} nodes in {self.elapsed:.2f}s ({self.nodes_per_second:.0f} nodes/s), depth {self.depth}, best move changed {len(self.best_moves)} times"
+
+
+class ProgressReporter:
+    """Prints a progress line at most max_rate times per second"""
+    def __init__(self, enabled: bool = True, max_rate: float = 4.0):
+        self.enabled: bool = enabled
+        self.min_interval: float = 1.0 / max_rate
+        self.last_print: float = float("-inf")
+        self.printed: bool = False
+
+    def report(self, now: float, describe: Callable[[], str]):
+        if not self.enabled or now - self.last_print < self.min_interval:
+            return
+        self.last_print = now
+        self.printed = True
+        print(f"\r{describe()}", end="", flush=True)
+
+    def finish(self):
+        if self.printed:
+            print()
+        self.printed = False
+
+
+class AnytimeSearch:
+    """Deadline and bookkeeping driver shared by the search agents.
+
+    The clock is only read every check_every nodes. check_every adapts to the measured
+    node rate so that checks happen about every check_interval seconds; the best move,
+    depth and progress line are only sampled at those checks.
+    Either call run(step) with a function expanding one node, or call start(), tick()
+    once per node (it returns True when the search has to stop) and finish().
+    """
+    MAX_CHECK_EVERY = 4096
+
+    def __init__(self, max_time: float, max_nodes: int | None = None, check_interval: float = 0.01, reporter: ProgressReporter | None = None):
+        self.max_time: float = max_time
+        self.max_nodes: int | None = max_nodes
+        self.check_interval: float = check_interval
+        self.reporter: ProgressReporter = reporter if reporter is not None else ProgressReporter(enabled=False)
+        self.best_move: Callable[[], tuple[Move | None, float]] | None = None
+        self.depth: Callable[[], int] | None = None
+        self.describe: Callable[[SearchReport], str] | None = None
+        self.report: SearchReport = SearchReport()
+        self.stopped: bool = False
+        self._start_time: float = 0.0
+        self._deadline: float = 0.0
+        self._next_check: int = 1
+        self._last_check_time: float = 0.0
+        self._last_check_nodes: int = 0
+
+    def start(self, best_move: Callable[[], tuple[Move | None, float]] | None = None, depth: Callable[[], int] | None = None, describe: Callable[[SearchReport], str] | None = None):
+        self.best_move = best_move
+        self.depth = depth
+        self.describe = describe
+        self.report = SearchReport()
+        self.stopped = False
+        self._start_time = time.perf_counter()
+        self._deadline = self._start_time + self.max_time
+        self._last_check_time = self._start_time
+        self._last_check_nodes = 0
+        self._next_check = 1
+
+    def tick(self) -> bool:
+        """Counts one expanded node. Returns True if the search has to stop"""
+        self.report.nodes += 1
+        if self.report.nodes < self._next_check:
+            return self.stopped
+        return self._check()
+
+    def _check(self) -> bool:
+        now = time.perf_counter()
+        nodes = self.report.nodes
+        self.report.elapsed = now - self._start_time
+        self._sample()
+        self.reporter.report(now, self._describe)
+        if now >= self._deadline or (self.max_nodes is not None and nodes >= self.max_nodes):
+            self.stopped = True
+            return True
+        # adapt the check frequency to the current node rate
+        rate = (nodes - self._last_check_nodes) / max(now - self._last_check_time, 1e-9)
+        check_every = max(1, min(int(rate * self.check_interval), self.MAX_CHECK_EVERY))
+        # never overshoot the deadline by more than one interval
+        check_every = max(1, min(check_every, int(rate * (self._deadline - now)) + 1))
+        self._last_check_time = now
+        self._last_check_nodes = nodes
+        self._next_check = nodes + check_every
+        if self.max_nodes is not None:
+            self._next_check = min(self._next_check, self.max_nodes)
+        return False
+
+    def _sample(self):
+        if self.depth is not None:
+            self.report.depth = max(self.report.depth, self.depth())
+        if self.best_move is None:
+            return
+        move, evaluation = self.best_move()
+        if move is None:
+            return
+        best_moves = self.report.best_moves
+        if not best_moves or best_moves[-1][1].to_code() != move.to_code():
+            best_moves.append((self.report.elapsed, move, evaluation))
+
+    def _describe(self) -> str:
+        if self.describe is not None:
+            return self.describe(self.report)
+        return f"Searching... {self.report.summary()}"
+
+    def finish(self) -> SearchReport:
+        self.report.elapsed = time.perf_counter() - self._start_time
+        self._sample()
+        self.reporter.finish()
+        return self.report
+
+    def run(self, step: Callable[[], bool], best_move: Callable[[], tuple[Move | None, float]] | None = None, depth: Callable[[], int] | None = None, describe: Callable[[SearchReport], str] | None = None) -> SearchReport:
+        """Calls step() until the deadline or node limit is hit, or until step() returns False (search space exhausted)"""
+        self.start(best_move, depth, describe)
+        while True:
+            if not step():
+                self.report.completed = True
+                break
+            if self.tick():
+                break
+        return self.finish()
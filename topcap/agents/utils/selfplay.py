@@ -0,0 +1,73 @@
+import argparse
+import os
+import time
+import numpy as np
+from numpy.typing import NDArray
+
+from topcap.core.common.native import native_selfplay
+
+# Self-play episodes generated by the C++ engine (cpp/src/selfplay.cpp, `make lib`). A file is a flat array of
+# these records, one per move, episodes one after the other. Same layout as selfplay::Record.
+EPISODE_DTYPE = np.dtype([
+    ("key", "<u8"), # position after the move, Board.position_key()
+    ("move", "<u2"), # Move.to_int()
+    ("ply", "<u2"), # 1 for the first move of an episode
+    ("outcome", "i1"), # 1 white won, -1 black won, 0 draw
+    ("reason", "u1"), # 1 base reached, 2 no moves left, 4 threefold repetition
+    ("padding", "<u2"),
+])
+
+
+def generate_episodes(filename: str, games: int, epsilon: float = 1.0, values: tuple[NDArray[np.uint64], NDArray[np.float32]] | None = None,
+                      seed: int = 0, append: bool = False, batch_size: int = 10_000, verbose: bool = True) -> int:
+    """Plays games in the C++ engine and writes their episodes to filename, returns the number of records.
+    Both sides play epsilon-greedy on values, (to_hash keys, values from white's point of view) like
+    LeoAgentV1.value_table(), or randomly without values. The engine runs without the GIL, in batches."""
+    keys, table = values if values is not None else (np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.float32))
+    order = np.argsort(keys)
+    keys, table = np.ascontiguousarray(keys[order], dtype=np.uint64), np.ascontiguousarray(table[order], dtype=np.float32)
+    if not append and os.path.exists(filename):
+        os.remove(filename)
+    start_time = time.perf_counter()
+    written = 0
+    for batch, start in enumerate(range(0, games, batch_size)):
+        written += native_selfplay(filename, min(batch_size, games - start), epsilon, keys, table, seed + batch)
+        if verbose:
+            elapsed = time.perf_counter() - start_time
+            print(f"{min(start + batch_size, games)}/{games} games, {written} moves in {elapsed:.1f}s ({min(start + batch_size, games) / elapsed * 60:,.0f} games/min)")
+    return written
+
+
+def open_episodes(filename: str) -> np.memmap:
+    """The records of filename, mapped read-only without copying"""
+    return np.memmap(filename, dtype=EPISODE_DTYPE, mode="r")
+
+
+def episode_bounds(records: NDArray) -> NDArray[np.int64]:
+    """Start index of every episode plus the end of the last one"""
+    return np.append(np.flatnonzero(records["ply"] == 1), len(records))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate self-play episodes with the C++ engine")
+    parser.add_argument("filename")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--epsilon", type=float, default=1.0, help="probability of a random move, 1 plays randomly")
+    parser.add_argument("--agent", default=None, help="name of a saved LeoAgentV1 whose values guide the greedy moves")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--append", action="store_true")
+    args = parser.parse_args()
+    values = None
+    if args.agent is not None:
+        from topcap.agents.leo_agent_v1 import LeoAgentV1
+        agent = LeoAgentV1(args.agent, verbose=False)
+        agent.load_latest()
+        values = agent.value_table()
+    generate_episodes(args.filename, args.games, args.epsilon, values, args.seed, args.append)
+    records = open_episodes(args.filename)
+    outcomes = records["outcome"][episode_bounds(records)[:-1]]
+    print(f"{len(outcomes)} episodes: {np.count_nonzero(outcomes == 1)} white wins, {np.count_nonzero(outcomes == -1)} black wins, {np.count_nonzero(outcomes == 0)} draws")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+from dataclasses import dataclass
+from collections.abc import Iterable
+from math import comb
+import argparse
+import multiprocessing as mp
+import os
+import pickle
+import time
+import numpy as np
+from numpy.typing import NDArray
+
+from topcap.core.common import Color, Board, Move
+from topcap.core.common.board import _BASE_SQUARES, _TILE_TO_SQUARE
+from .batch_moves import generate_moves
+from .proof_number import Outcome
+
+# 2 bit results, from the point of view of the player to move
+UNKNOWN = 0
+WIN = 1
+LOSS = 2
+DRAW = 3
+_OUTCOMES: dict[int, Outcome] = {UNKNOWN: Outcome.UNKNOWN, WIN: Outcome.WIN, LOSS: Outcome.LOSS, DRAW: Outcome.DRAW}
+_OPPOSITE: dict[Outcome, Outcome] = {Outcome.WIN: Outcome.LOSS, Outcome.LOSS: Outcome.WIN, Outcome.DRAW: Outcome.DRAW, Outcome.UNKNOWN: Outcome.UNKNOWN}
+_PREFERENCE: dict[Outcome, int] = {Outcome.WIN: 3, Outcome.DRAW: 2, Outcome.UNKNOWN: 1, Outcome.LOSS: 0}
+
+# Pieces never stand on a base in a running game: they can't enter their own and entering the other one ends the game.
+# So positions only use the 34 other squares, compact square c is board square c + 1.
+_WHITE_BASE = _BASE_SQUARES[Color.WHITE]
+_BLACK_BASE = _BASE_SQUARES[Color.BLACK]
+assert (_WHITE_BASE, _BLACK_BASE) == (0, 35)
+_FREE_SQUARES = 34
+_BINOMIAL: NDArray[np.int64] = np.array([[comb(n, r) for r in range(5)] for n in range(_FREE_SQUARES + 1)], dtype=np.int64)
+_SHIFTS: NDArray[np.uint8] = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+
+def _rank_combinations(squares: NDArray[np.int64]) -> NDArray[np.int64]:
+    """Colex rank of every row of sorted, distinct compact squares"""
+    rank = np.zeros(len(squares), dtype=np.int64)
+    for i in range(squares.shape[1]):
+        rank += _BINOMIAL[squares[:, i], i + 1]
+    return rank
+
+def _unrank_combinations(rank: NDArray[np.int64], pieces: int, free_squares: int) -> NDArray[np.int64]:
+    squares = np.empty((len(rank), pieces), dtype=np.int64)
+    rank = rank.copy()
+    for i in range(pieces, 0, -1):
+        # largest square with C(square, i) <= rank
+        square = np.searchsorted(_BINOMIAL[:free_squares, i], rank, side="right") - 1
+        squares[:, i - 1] = square
+        rank -= _BINOMIAL[square, i]
+    return squares
+
+
+class Tablebase:
+    """Win/draw/loss of every position with pieces white and pieces black pieces, 2 bits per position in a memory-mapped file.
+    Positions are ranked densely: index = (black to move * white combinations + white rank) * black combinations + black rank,
+    with the black pieces ranked among the squares the white pieces leave free.
+    Results ignore the game history: a position that is only a draw because of threefold repetition is still a win here.
+    Results say nothing about the distance to the win, so agents converting a win should still avoid repeating positions."""
+    def __init__(self, filename: str, pieces: int = 4, mode: str = "r"):
+        self.filename: str = filename
+        self.pieces: int = pieces
+        self.white_combinations: int = comb(_FREE_SQUARES, pieces)
+        self.black_combinations: int = comb(_FREE_SQUARES - pieces, pieces)
+        self.size: int = 2 * self.white_combinations * self.black_combinations
+        byte_size = (self.size + 3) // 4
+        if mode != "w+" and os.path.getsize(filename) != byte_size:
+            raise ValueError(f"{filename} is not a tablebase for {pieces} pieces per player")
+        self.data: NDArray[np.uint8] = np.memmap(filename, dtype=np.uint8, mode=mode, shape=(byte_size,))
+
+    def rank(self, white: NDArray[np.int64], black: NDArray[np.int64], black_to_move: NDArray[np.bool_]) -> NDArray[np.int64]:
+        """Indices of positions given as (n, pieces) board squares in any order"""
+        white = np.sort(white, axis=1) - 1
+        black = np.sort(black, axis=1) - 1
+        # rank the black pieces among the squares not taken by white pieces
+        black = black - (white[:, None, :] < black[:, :, None]).sum(axis=2)
+        side = black_to_move.astype(np.int64)
+        return (side * self.white_combinations + _rank_combinations(white)) * self.black_combinations + _rank_combinations(black)
+
+    def unrank(self, index: NDArray[np.int64]) -> tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.bool_]]:
+        """Board squares of the white and black pieces (sorted) and the side to move of every index"""
+        per_side = self.white_combinations * self.black_combinations
+        black_to_move = index >= per_side
+        rest = index % per_side
+        white = _unrank_combinations(rest // self.black_combinations, self.pieces, _FREE_SQUARES)
+        black = _unrank_combinations(rest % self.black_combinations, self.pieces, _FREE_SQUARES - self.pieces)
+        for i in range(self.pieces): # white is sorted, skip the white squares in increasing order
+            black += black >= white[:, i:i + 1]
+        return white + 1, black + 1, black_to_move
+
+    def values(self, index: NDArray[np.int64]) -> NDArray[np.uint8]:
+        return (self.data[index >> 2] >> _SHIFTS[index & 3]) & 3
+
+    def _read_chunk(self, start: int, stop: int) -> NDArray[np.uint8]:
+        packed = np.asarray(self.data[start >> 2:(stop + 3) >> 2])
+        return ((packed[:, None] >> _SHIFTS) & 3).reshape(-1)[:stop - start].astype(np.uint8)
+
+    def _write_chunk(self, start: int, values: NDArray[np.uint8]):
+        padded = np.zeros((len(values) + 3) // 4 * 4, dtype=np.uint8)
+        padded[:len(values)] = values
+        packed = (padded.reshape(-1, 4) << _SHIFTS).sum(axis=1, dtype=np.uint8)
+        self.data[start >> 2:(start >> 2) + len(packed)] = packed
+
+    def propagate(self, start: int, stop: int) -> int:
+        """One retrograde step over the unknown positions of [start, stop): a position is won if a move reaches
+        the opponent's base or a lost position, and lost if it has no moves or all moves reach won positions.
+        start must be a multiple of 4, so chunks never share a byte. Returns the number of newly solved positions."""
+        values = self._read_chunk(start, stop)
+        unknown = np.flatnonzero(values == UNKNOWN)
+        if not len(unknown):
+            return 0
+        white, black, black_to_move = self.unrank(unknown + start)
+        wins = np.zeros(len(unknown), dtype=bool)
+        all_won = np.ones(len(unknown), dtype=bool) # also holds without any moves
+        for batch in generate_moves(white, black, black_to_move):
+            wins[batch.rows[batch.reaches_base]] = True
+            rows = batch.rows[~batch.reaches_base]
+            results = self.values(self.rank(batch.white[~batch.reaches_base], batch.black[~batch.reaches_base], batch.black_to_move[~batch.reaches_base]))
+            wins[rows] |= results == LOSS
+            all_won[rows] &= results == WIN
+        solved = np.where(wins, WIN, np.where(all_won, LOSS, UNKNOWN)).astype(np.uint8)
+        values[unknown] = solved
+        self._write_chunk(start, values)
+        return int(np.count_nonzero(solved))
+
+    def finalize(self, start: int, stop: int) -> int:
+        """Marks the positions still unknown after the last pass as draws: neither player can force a win"""
+        values = self._read_chunk(start, stop)
+        unknown = values == UNKNOWN
+        values[unknown] = DRAW
+        self._write_chunk(start, values)
+        return int(np.count_nonzero(unknown))
+
+    def counts(self) -> dict[Outcome, int]:
+        counts: dict[Outcome, int] = {outcome: 0 for outcome in _OUTCOMES.values()}
+        chunk = 1 << 24
+        for start in range(0, self.size, chunk):
+            values = self._read_chunk(start, min(start + chunk, self.size))
+            for value, total in enumerate(np.bincount(values, minlength=4)):
+                counts[_OUTCOMES[value]] += int(total)
+        return counts
+
+    def probe(self, board: Board) -> Outcome:
+        """Result of the position for the player to move"""
+        winner, _ = board.get_win_reason()
+        if winner != Color.NONE:
+            return Outcome.WIN if winner == board.current_player else Outcome.LOSS
+        if len(board.tiles[Color.WHITE]) != self.pieces or len(board.tiles[Color.BLACK]) != self.pieces:
+            raise ValueError(f"This tablebase only holds positions with {self.pieces} pieces per player")
+        white = np.array([[_TILE_TO_SQUARE[tile] for tile in board.tiles[Color.WHITE]]], dtype=np.int64)
+        black = np.array([[_TILE_TO_SQUARE[tile] for tile in board.tiles[Color.BLACK]]], dtype=np.int64)
+        index = self.rank(white, black, np.array([board.current_player == Color.BLACK]))
+        return _OUTCOMES[int(self.values(index)[0])]
+
+    def score_moves(self, board: Board) -> list[tuple[Move, Outcome]]:
+        """Every move with the result it leads to for the player making it"""
+        scores: list[tuple[Move, Outcome]] = []
+        for move in board.get_all_valid_moves(board.current_player):
+            after = board.__copy__()
+            after.move(move)
+            scores.append((move, _OPPOSITE[self.probe(after)]))
+        return scores
+
+    def best_move(self, board: Board) -> Move | None:
+        """A move keeping the best result, moves onto the opponent's base first"""
+        scores = self.score_moves(board)
+        if not scores:
+            return None
+        opponent_base = board.base_tile[board.current_player.opposite()]
+        return max(scores, key=lambda score: (_PREFERENCE[score[1]], score[0].to_tile == opponent_base))[0]
+
+    def analyse_game(self, positions: Iterable[Board]) -> list["MoveAnalysis"]:
+        """Result before and after every move of a game, positions like Game.board_states"""
+        analysis: list[MoveAnalysis] = []
+        previous: Board | None = None
+        for ply, board in enumerate(positions):
+            if previous is not None:
+                before = self.probe(previous)
+                after = _OPPOSITE[self.probe(board)]
+                analysis.append(MoveAnalysis(ply, previous.current_player, before, after))
+            previous = board
+        return analysis
+
+    def flush(self):
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+
+
+@dataclass
+class MoveAnalysis:
+    ply: int
+    player: Color
+    before: Outcome # result for player before the move
+    after: Outcome # result for player after the move
+
+    @property
+    def is_mistake(self) -> bool:
+        """The move gave away a win or a draw"""
+        return _PREFERENCE[self.after] < _PREFERENCE[self.before]
+
+
+_worker_tablebase: Tablebase | None = None
+
+def _init_worker(filename: str, pieces: int):
+    global _worker_tablebase
+    _worker_tablebase = Tablebase(filename, pieces, mode="r+")
+
+def _run_chunk(task: tuple[str, int, int]) -> int:
+    step, start, stop = task
+    assert _worker_tablebase is not None
+    solved = _worker_tablebase.propagate(start, stop) if step == "propagate" else _worker_tablebase.finalize(start, stop)
+    _worker_tablebase.flush()
+    return solved
+
+
+def generate_tablebase(filename: str, pieces: int = 4, workers: int = 1, chunk_size: int = 1 << 20, verbose: bool = True) -> Tablebase:
+    """Solves every position with retrograde passes until a pass solves nothing, then marks the rest as draws.
+    Chunks of a pass run in parallel, every worker writes its own chunks of the shared result file.
+    Progress is checkpointed to filename + '.state' after every finished chunk, a restarted run continues from there:
+    redoing a chunk is harmless because positions only ever go from unknown to solved."""
+    chunk_size = max(4, chunk_size // 4 * 4)
+    state_filename = filename + ".state"
+    state: dict[str, int | str] = {"pieces": pieces, "pass": 0, "step": "propagate", "next_chunk": 0, "solved": 0}
+    if os.path.exists(state_filename) and os.path.exists(filename):
+        state = pickle.load(open(state_filename, 'rb'))
+        if state["pieces"] != pieces:
+            raise ValueError(f"{state_filename} belongs to a tablebase with {state['pieces']} pieces per player")
+        tablebase = Tablebase(filename, pieces, mode="r+")
+    else:
+        tablebase = Tablebase(filename, pieces, mode="w+")
+    if state["step"] == "done":
+        return tablebase
+    chunks = [(start, min(start + chunk_size, tablebase.size)) for start in range(0, tablebase.size, chunk_size)]
+    if verbose:
+        print(f"Tablebase {filename}: {tablebase.size} positions ({tablebase.data.nbytes / 1e6:.1f} MB) in {len(chunks)} chunks, {workers} workers, resuming pass {state['pass']} at chunk {state['next_chunk']}")
+
+    def checkpoint():
+        tablebase.flush()
+        temporary = state_filename + ".tmp"
+        pickle.dump(state, open(temporary, 'wb'))
+        os.replace(temporary, state_filename)
+
+    pool = mp.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(filename, pieces)) if workers > 1 else None
+    if pool is None:
+        _init_worker(filename, pieces)
+    try:
+        while state["step"] != "done":
+            start_time = time.perf_counter()
+            next_chunk = int(state["next_chunk"])
+            tasks = [(state["step"], start, stop) for start, stop in chunks[next_chunk:]]
+            results = pool.imap(_run_chunk, tasks) if pool is not None else map(_run_chunk, tasks)
+            for solved in results: # in order, so next_chunk always is the first unfinished chunk
+                state["solved"] = int(state["solved"]) + solved
+                state["next_chunk"] = int(state["next_chunk"]) + 1
+                checkpoint()
+            if verbose:
+                print(f"Pass {state['pass']} ({state['step']}): {state['solved']} positions solved in {time.perf_counter() - start_time:.1f}s")
+            if state["step"] == "finalize":
+                state["step"] = "done"
+            elif state["solved"] == 0:
+                state["step"] = "finalize"
+            state["pass"] = int(state["pass"]) + 1
+            state["next_chunk"] = 0
+            state["solved"] = 0
+            checkpoint()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if verbose:
+        print(f"Tablebase done: {', '.join(f'{outcome.value}: {count}' for outcome, count in tablebase.counts().items())}")
+    return tablebase
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a topcap tablebase")
+    parser.add_argument("filename")
+    parser.add_argument("--pieces", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=1 << 20)
+    args = parser.parse_args()
+    generate_tablebase(args.filename, args.pieces, args.workers, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
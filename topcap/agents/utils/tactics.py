@@ -0,0 +1,84 @@
+from collections import Counter
+
+from topcap.core.common import Color, Board, Move
+from topcap.core.common.board import _BASE_REACH, _TILE_TO_SQUARE
+
+
+def winning_move(board: Board) -> Move | None:
+    """A move that wins immediately for the player to move: onto the opponent's base, or leaving the opponent without moves"""
+    threats = board.threats(board.current_player)
+    if threats:
+        return threats.moves[0]
+    opponent = board.current_player.opposite()
+    for move in board.get_all_valid_moves(board.current_player):
+        board.move(move)
+        stalemated = board.mobility[opponent] == 0
+        board.unmake(move)
+        if stalemated:
+            return move
+    return None
+
+
+def forced_result(board: Board, plies: int = 3, history: Counter[int] | None = None) -> tuple[Color, Move | None]:
+    """Looks for a forced win or loss within the next plies (1 to 3) without expanding the full tree.
+    Returns the winner and, if the player to move wins, the winning move. Color.NONE if nothing is forced.
+    Wins in 3 plies are only searched through base threats, see Board.threats().
+    history counts the positions of the game by to_hash(), a move to a position seen twice is a draw like in Game
+    (a position cannot repeat within 3 plies, so the path does not count)."""
+    history = history if history is not None else Counter()
+    board = board.__copy__() # we make and unmake moves on it
+    player = board.current_player
+    winner, _ = board.get_win_reason()
+    if winner != Color.NONE:
+        return winner, None
+    move = winning_move(board)
+    if move is not None:
+        return player, move
+    if plies < 2:
+        return Color.NONE, None
+    if _all_moves_lose(board, history):
+        return player.opposite(), None
+    if plies < 3:
+        return Color.NONE, None
+    for move in board.threats(player, plies=2).moves:
+        board.move(move)
+        forced = history[board.to_hash()] < 2 and winning_move(board) is None and _all_moves_lose(board, history)
+        board.unmake(move)
+        if forced:
+            return player, move
+    return Color.NONE, None
+
+
+def _all_moves_lose(board: Board, history: Counter[int]) -> bool:
+    """True if every move of the player to move allows an immediate win of the opponent.
+    A move to a position seen twice in history ends the game in a draw, so it is not refuted."""
+    for move in board.get_all_valid_moves(board.current_player):
+        board.move(move)
+        refuted = history[board.to_hash()] < 2 and winning_move(board) is not None
+        board.unmake(move)
+        if not refuted:
+            return False
+    return True
+
+
+def order_moves(board: Board, moves: list[Move] | None = None) -> list[Move]:
+    """Sorts moves for search: wins first, then moves that block the opponent's base threats,
+    then moves into a line with the opponent's base. Keeps the original order otherwise."""
+    if moves is None:
+        moves = board.get_all_valid_moves(board.current_player)
+    player = board.current_player
+    own_threats = board.threats(player)
+    winning = {move.to_code() for move in own_threats.moves}
+    defending = set(board.threats(player.opposite()).defending_squares)
+    reach = _BASE_REACH[player.opposite()]
+
+    def priority(move: Move) -> int:
+        if move.to_code() in winning:
+            return 3
+        if move.to_tile in defending:
+            return 2
+        if reach[_TILE_TO_SQUARE[move.to_tile]] is not None:
+            return 1
+        return 0
+
+    return sorted(moves, key=priority, reverse=True)
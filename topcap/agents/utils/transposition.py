@@ -0,0 +1,91 @@
+from multiprocessing import shared_memory
+import struct
+import numpy as np
+from numpy.typing import NDArray
+
+from topcap.core.common import Move
+
+# Bound of a stored score
+EXACT = 1
+LOWER = 2 # score is at least the stored value (beta cutoff)
+UPPER = 3 # score is at most the stored value (failed low)
+
+# Layout of the data word: score as float32 bits | depth << 32 | flag << 40 | (move int + 1) << 42
+_DEPTH_SHIFT = 32
+_FLAG_SHIFT = 40
+_MOVE_SHIFT = 42
+_ENTRY_BYTES = 16
+
+
+class TranspositionTable:
+    """Fixed size table of (key ^ data, data) uint64 pairs, indexed by key modulo the size.
+    Can live in shared memory, so several processes probe and store concurrently without locks:
+    an entry torn by two simultaneous writers fails the key check and is treated as a miss."""
+    def __init__(self, size: int = 1 << 20, shared: bool = False, name: str | None = None):
+        self.size: int = size
+        self.shm: shared_memory.SharedMemory | None = None
+        if name is not None: # attach to a table created by another process
+            # processes started by multiprocessing share the creator's resource tracker, only the creator unlinks
+            self.shm = shared_memory.SharedMemory(name=name)
+        elif shared:
+            self.shm = shared_memory.SharedMemory(create=True, size=size * _ENTRY_BYTES)
+        if self.shm is not None:
+            self.entries: NDArray[np.uint64] = np.ndarray((size, 2), dtype=np.uint64, buffer=self.shm.buf)
+            if name is None:
+                self.entries[:] = 0
+        else:
+            self.entries = np.zeros((size, 2), dtype=np.uint64)
+        self.probes: int = 0
+        self.hits: int = 0
+
+    @staticmethod
+    def attach(name: str, size: int) -> "TranspositionTable":
+        """Opens a shared table created with shared=True in another process"""
+        return TranspositionTable(size, name=name)
+
+    @property
+    def name(self) -> str | None:
+        return self.shm.name if self.shm is not None else None
+
+    def probe(self, key: int) -> tuple[float, int, int, Move | None] | None:
+        """Returns (score, depth, flag, best move) or None if the position is not stored"""
+        self.probes += 1
+        entry = self.entries[key % self.size]
+        check, data = int(entry[0]), int(entry[1])
+        if data == 0 or check ^ data != key:
+            return None
+        self.hits += 1
+        score = struct.unpack("<f", struct.pack("<I", data & 0xFFFFFFFF))[0]
+        depth = (data >> _DEPTH_SHIFT) & 0xFF
+        flag = (data >> _FLAG_SHIFT) & 0x3
+        move = (data >> _MOVE_SHIFT) & 0x7FF
+        return score, depth, flag, Move.from_int(move - 1) if move else None
+
+    def store(self, key: int, score: float, depth: int, flag: int, move: Move | None):
+        index = key % self.size
+        entry = self.entries[index]
+        old_data = int(entry[1])
+        # depth preferred replacement, unless the slot holds another position
+        if old_data and int(entry[0]) ^ old_data == key and (old_data >> _DEPTH_SHIFT) & 0xFF > depth:
+            return
+        score_bits = struct.unpack("<I", struct.pack("<f", score))[0]
+        data = score_bits | (min(depth, 0xFF) << _DEPTH_SHIFT) | (flag << _FLAG_SHIFT) | ((move.to_int() + 1 if move is not None else 0) << _MOVE_SHIFT)
+        entry[0] = key ^ data
+        entry[1] = data
+
+    def fill_rate(self) -> float:
+        return float(np.count_nonzero(self.entries[:, 1])) / self.size
+
+    def clear(self):
+        self.entries[:] = 0
+        self.probes = 0
+        self.hits = 0
+
+    def close(self, unlink: bool = False):
+        if self.shm is None:
+            return
+        del self.entries
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+        self.shm = None
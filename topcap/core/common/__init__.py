@@ -1,6 +1,15 @@
+import os
+
 from .board import Board
 from .color import Color
 from .move import Move
 from .player import Player
 
+# TOPCAP_BOARD_BACKEND=native plays on the C++ engine (cpp/, `make lib`) instead of the python Board
+if os.environ.get("TOPCAP_BOARD_BACKEND", "python") == "native":
+    from .native import NativeBoard as Board, native_available
+    if not native_available():
+        from .native import NATIVE_LIB
+        raise ImportError(f"TOPCAP_BOARD_BACKEND=native but {NATIVE_LIB} is missing, build it with `make lib` in cpp/")
+
 __all__ = ["Board", "Color", "Move", "Player"]
@@ -1,10 +1,12 @@
 from typing import  override
 from copy import deepcopy
+from dataclasses import dataclass, field
 import numpy as np
 from numpy.typing import NDArray
 
 import topcap.utils as utils
 from topcap.utils.topcap_utils import WinReason
+from topcap.utils.instrumentation import counted
 from .color import Color
 from .move import Move
 
@@ -19,20 +21,91 @@ for y in range(6):
         _TILE_TO_COORDS_CACHE[tile] = coords
         _COORDS_TO_TILE_CACHE[coords] = tile
 
+# Base tile of each color, a piece reaching the opponent's base wins
+_BASE_TILES: dict[Color, str] = {Color.BLACK: "f6", Color.WHITE: "a1"}
+
+# Squares are numbered y * 6 + x, like in to_hash()
+_SQUARE_TO_TILE: list[str] = [_COORDS_TO_TILE_CACHE[(square // 6, square % 6)] for square in range(36)]
+_TILE_TO_SQUARE: dict[str, int] = {tile: square for square, tile in enumerate(_SQUARE_TO_TILE)}
+_BASE_SQUARES: dict[Color, int] = {color: _TILE_TO_SQUARE[tile] for color, tile in _BASE_TILES.items()}
+_DIRECTIONS: list[tuple[int, int]] = [(-1, 0), (1, 0), (0, -1), (0, 1)] # (dx, dy), same order as _get_valid_moves_for_tile
+# For each square, direction and neighbour count: target square (-1 if off the board or not moving) and the path as bitmask
+_RAY_TARGET: list[list[list[int]]] = [[[-1] * 9 for _ in _DIRECTIONS] for _ in range(36)]
+_RAY_PATH: list[list[list[int]]] = [[[0] * 9 for _ in _DIRECTIONS] for _ in range(36)]
+_PATH_BETWEEN: dict[tuple[int, int], int] = {} # (from, to) -> path bitmask, for every straight move
+for square in range(36):
+    for direction, (dx, dy) in enumerate(_DIRECTIONS):
+        path = 0
+        for distance in range(1, 9):
+            y, x = square // 6 + dy * distance, square % 6 + dx * distance
+            if y < 0 or y >= 6 or x < 0 or x >= 6:
+                break
+            path |= 1 << (y * 6 + x)
+            _RAY_TARGET[square][direction][distance] = y * 6 + x
+            _RAY_PATH[square][direction][distance] = path
+            _PATH_BETWEEN[(square, y * 6 + x)] = path
+# Changing a square can only change the moves of pieces next to it (neighbour count) or in its row and column (path)
+_AFFECTED_SQUARES: list[int] = [0] * 36
+for square in range(36):
+    for other in range(36):
+        dy, dx = abs(square // 6 - other // 6), abs(square % 6 - other % 6)
+        if dy == 0 or dx == 0 or (dy <= 1 and dx <= 1):
+            _AFFECTED_SQUARES[square] |= 1 << other
+# Base-reach lookup: for every base and square in line with it, the neighbour count a piece needs
+# to jump onto the base from there and the squares it passes (base included)
+_BASE_REACH: dict[Color, list[tuple[int, int] | None]] = {}
+for color, base in _BASE_SQUARES.items():
+    _BASE_REACH[color] = [None] * 36
+    for square in range(36):
+        for direction in range(4):
+            for distance in range(1, 9):
+                if _RAY_TARGET[square][direction][distance] == base:
+                    _BASE_REACH[color][square] = (distance, _RAY_PATH[square][direction][distance])
+# Squares around each square, placing or removing a piece there changes its neighbour count
+_NEIGHBOUR_SQUARES: list[int] = [0] * 36
+for square in range(36):
+    for other in range(36):
+        if other != square and abs(square // 6 - other // 6) <= 1 and abs(square % 6 - other % 6) <= 1:
+            _NEIGHBOUR_SQUARES[square] |= 1 << other
+
+
+def _mask_to_tiles(mask: int) -> list[str]:
+    tiles: list[str] = []
+    while mask:
+        bit = mask & -mask
+        tiles.append(_SQUARE_TO_TILE[bit.bit_length() - 1])
+        mask ^= bit
+    return tiles
+
+
+@dataclass
+class Threats:
+    """Ways for one color to reach the opponent's base, returned by Board.threats()"""
+    attackers: list[str] = field(default_factory=list) # pieces making the first move of a threat
+    moves: list[Move] = field(default_factory=list) # first moves of the threats, the winning moves for plies=1
+    defending_squares: list[str] = field(default_factory=list) # empty squares where an opponent piece breaks at least one threat
+
+    def __bool__(self) -> bool:
+        return bool(self.moves)
+
 
 class Board:
     def __init__(self):
         self.board: NDArray[np.int8] = np.zeros((6, 6), dtype=np.int8)
         self.neighbour_count_board: NDArray[np.int8] = np.zeros((6, 6), dtype=np.int8)
+        self._reset_mobility()
         self.initial_setup()
     
+    def _reset_mobility(self):
+        self.occupied: int = 0 # bitboard of all pieces
+        self.move_masks: list[int] = [0] * 36 # bitmask of the target squares of the piece on each square
+        self.mobility: dict[Color, int] = {Color.WHITE: 0, Color.BLACK: 0} # number of valid moves of each color
+
     def initial_setup(self):
         self.tiles: dict[Color, list[str]] = {}
         self.tiles[Color.WHITE] = ["a4", "b3", "c2", "d1"]
         self.tiles[Color.BLACK] = ["c6", "d5", "e4", "f3"]
-        self.base_tile : dict[Color, str] = {}
-        self.base_tile[Color.BLACK] = "f6"
-        self.base_tile[Color.WHITE] = "a1"
+        self.base_tile : dict[Color, str] = dict(_BASE_TILES)
         for tile in self.tiles[Color.WHITE]:
             self._set_tile_content(tile, Color.WHITE)
         for tile in self.tiles[Color.BLACK]:
@@ -40,19 +113,97 @@ class Board:
         self.current_player: Color = Color.WHITE
         self.move_count: int= 0
     
+    @counted("board.move")
     def move(self, move: Move, verbose: bool = False):
         from_coords = _TILE_TO_COORDS_CACHE[move.from_tile]
         from_content = Color(self.board[from_coords])
-        if not self.move_is_valid(move, from_content):
+        # the move masks cover every generated move, the full validation is only needed for odd input
+        is_generated_move = move.to_tile in _TILE_TO_SQUARE and self.move_masks[_TILE_TO_SQUARE[move.from_tile]] >> _TILE_TO_SQUARE[move.to_tile] & 1
+        if not is_generated_move and not self.move_is_valid(move, from_content):
             raise ValueError(f"Cannot execute move, invalid move {move}, please check this before running move()")
         # _set_tile_content now handles tiles dictionary updates, so we just call it
-        self._set_tile_content(move.from_tile, Color.NONE)
-        self._set_tile_content(move.to_tile, from_content)
+        self._shift_piece(move.from_tile, move.to_tile, from_content)
         self.current_player = self.current_player.opposite()
         self.move_count += 1
         if verbose:
             print(f"Executed move {move}")
 
+    def unmake(self, move: Move):
+        """Takes back move, which has to be the last move executed on this board"""
+        moved_content = self.current_player.opposite()
+        if self.get_tile_content(move.to_tile) != moved_content or self.get_tile_content(move.from_tile) != Color.NONE:
+            raise ValueError(f"Cannot unmake move {move}, it was not the last move on this board")
+        self._shift_piece(move.to_tile, move.from_tile, moved_content)
+        self.current_player = moved_content
+        self.move_count -= 1
+
+    def _shift_piece(self, from_tile: str, to_tile: str, content: Color):
+        self._set_tile_content(from_tile, Color.NONE, update_moves=False)
+        self._set_tile_content(to_tile, content, update_moves=False)
+        self._update_move_masks(_AFFECTED_SQUARES[_TILE_TO_SQUARE[from_tile]] | _AFFECTED_SQUARES[_TILE_TO_SQUARE[to_tile]])
+
+    def threats(self, color: Color, plies: int = 1) -> Threats:
+        """Pieces of color that reach the opponent's base with their next move (plies=1),
+        or within their next two moves, not counting the opponent's reply in between (plies=2).
+        Two move threats are first moves after which a piece reaches the base that could not before."""
+        if plies not in (1, 2):
+            raise ValueError(f"Threats can only be looked up 1 or 2 plies ahead, not {plies}")
+        threats = Threats()
+        defending = self._base_threats(color, threats)
+        if plies == 2:
+            defending |= self._two_move_threats(color, threats)
+        # the opponent can not move into its own base
+        threats.defending_squares = _mask_to_tiles(defending & ~self.occupied & ~(1 << _BASE_SQUARES[color.opposite()]))
+        return threats
+
+    def _base_threats(self, color: Color, threats: Threats) -> int:
+        """Adds the pieces that jump onto the opponent's base next move, returns the squares that block them"""
+        base = _BASE_SQUARES[color.opposite()]
+        defending = 0
+        for tile in self.tiles[color]:
+            square = _TILE_TO_SQUARE[tile]
+            if self.move_masks[square] >> base & 1:
+                threats.attackers.append(tile)
+                threats.moves.append(Move(tile, _SQUARE_TO_TILE[base]))
+                defending |= _BASE_REACH[color.opposite()][square][1] | _NEIGHBOUR_SQUARES[square]
+        return defending
+
+    def _two_move_threats(self, color: Color, threats: Threats) -> int:
+        opponent = color.opposite()
+        base = _BASE_SQUARES[opponent]
+        # a second move onto the base needs a piece in line with it, which the first move has to create or unblock
+        in_line = sum(1 << square for square, reach in enumerate(_BASE_REACH[opponent]) if reach is not None)
+        own = sum(1 << _TILE_TO_SQUARE[tile] for tile in self.tiles[color])
+        defending = 0
+        order = self.tiles[color][:]
+        one_move_attackers = set(threats.attackers)
+        for tile in order:
+            from_square = _TILE_TO_SQUARE[tile]
+            mask = self.move_masks[from_square]
+            if mask >> base & 1:
+                continue # already a threat in one
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                to_square = bit.bit_length() - 1
+                touched = _AFFECTED_SQUARES[from_square] | _AFFECTED_SQUARES[to_square]
+                if not (bit | (touched & own)) & in_line:
+                    continue
+                to_tile = _SQUARE_TO_TILE[to_square]
+                self._shift_piece(tile, to_tile, color)
+                follow_up = Threats()
+                follow_up_defending = self._base_threats(color, follow_up)
+                self._shift_piece(to_tile, tile, color)
+                if not set(follow_up.attackers) - one_move_attackers:
+                    continue # only threats that already exist
+                first_move = Move(tile, to_tile)
+                threats.attackers.append(tile)
+                threats.moves.append(first_move)
+                # block the first move, or the follow-up
+                defending |= _PATH_BETWEEN[(from_square, to_square)] | _NEIGHBOUR_SQUARES[from_square] | follow_up_defending
+        self.tiles[color] = order # shifting pieces back and forth reorders the tiles, which would change the move order
+        return defending
+
     def move_is_valid(self, move: Move | None, moving_player: Color, verbose: bool = False) -> bool:
         if move is None:
             if verbose:
@@ -84,7 +235,7 @@ class Board:
         to_coords = _TILE_TO_COORDS_CACHE[to_tile]
         dy = to_coords[0] - from_coords[0]  # row difference
         dx = to_coords[1] - from_coords[1]  # column difference
-        if dx != 0 and dy != 0:
+        if (dx != 0 and dy != 0) or dx == dy == 0:
             if verbose:
                 print(f"Invalid move, path is diagonal or empty")
             return False
@@ -122,6 +273,7 @@ class Board:
 
         return True
     
+    @counted("board.move_generation")
     def get_all_valid_moves(self, player: Color) -> list[Move]:
         tiles: list[str] = self.tiles[player]
         moves: list[Move] = []
@@ -133,7 +285,7 @@ class Board:
         for color, base in self.base_tile.items():
             if self.get_tile_content(base) == color.opposite():
                 return color.opposite(), WinReason.BASE_REACHED 
-        if len(self.get_all_valid_moves(self.current_player)) == 0:
+        if self.mobility[self.current_player] == 0:
             return self.current_player.opposite(), WinReason.NO_MOVES_LEFT 
         return Color.NONE, WinReason.NONE 
 
@@ -143,7 +295,7 @@ class Board:
     def _tile_number(self, coords: tuple[int, int]):
         return coords[0] + coords[1]*6
         
-    def _set_tile_content(self, tile: str, content: Color):
+    def _set_tile_content(self, tile: str, content: Color, update_moves: bool = True):
         add_content = content != Color.NONE
         if not self._tile_exists(tile):
             raise ValueError(f"Tile {tile} does not exist, can't set content")
@@ -166,6 +318,42 @@ class Board:
         
         self._update_neighbour_count_coords(coords, add_content)
         self.board[coords] = content.value
+        square = _TILE_TO_SQUARE[tile]
+        self.occupied ^= 1 << square
+        if old_content != Color.NONE:
+            self.mobility[old_content] -= self.move_masks[square].bit_count()
+            self.move_masks[square] = 0
+        if update_moves:
+            self._update_move_masks(_AFFECTED_SQUARES[square])
+
+    def _update_move_masks(self, affected: int):
+        """Recomputes the moves of all pieces on the affected squares"""
+        affected &= self.occupied
+        while affected:
+            bit = affected & -affected
+            self._update_piece_moves(bit.bit_length() - 1)
+            affected ^= bit
+
+    def _update_piece_moves(self, square: int):
+        color = Color(self.board[square // 6, square % 6])
+        neighbour_count = int(self.neighbour_count_board[square // 6, square % 6])
+        own_base = _BASE_SQUARES[color]
+        mask = 0
+        for direction in range(4):
+            target = _RAY_TARGET[square][direction][neighbour_count]
+            if target >= 0 and target != own_base and not _RAY_PATH[square][direction][neighbour_count] & self.occupied:
+                mask |= 1 << target
+        self.mobility[color] += mask.bit_count() - self.move_masks[square].bit_count()
+        self.move_masks[square] = mask
+
+    def _rebuild_move_masks(self):
+        self._reset_mobility()
+        for color in Color.WHITE, Color.BLACK:
+            for tile in self.tiles[color]:
+                self.occupied |= 1 << _TILE_TO_SQUARE[tile]
+        for color in Color.WHITE, Color.BLACK:
+            for tile in self.tiles[color]:
+                self._update_piece_moves(_TILE_TO_SQUARE[tile])
     
     def get_tile_content(self, tile: str):
         coords = _TILE_TO_COORDS_CACHE[tile]
@@ -207,49 +395,20 @@ class Board:
 
     def _get_valid_moves_for_tile(self, tile: str) -> list[Move]:
         valid_moves: list[Move] = []
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        coords = _TILE_TO_COORDS_CACHE[tile]
-        tile_content = Color(self.board[coords])
-        neighbour_count = int(self.neighbour_count_board[coords])
-        base_tile = self.base_tile[tile_content]
-        
-        for dx, dy in directions:
-            new_y = coords[0] + dy * neighbour_count
-            new_x = coords[1] + dx * neighbour_count
-            if new_y < 0 or new_y >= 6 or new_x < 0 or new_x >= 6:
-                continue
-            to_coords = (new_y, new_x)
-            to_tile = _COORDS_TO_TILE_CACHE[to_coords]
-            
-            # Inline validation checks (avoid calling move_is_valid)
-            if to_tile == tile:  # Can't move to same tile
-                continue
-            if to_tile == base_tile:
-                continue
-            
-            # Check path is clear
-            # coords are (y, x) format, directions are (dy, dx)
-            step_y = 1 if dy > 0 else -1 if dy < 0 else 0
-            step_x = 1 if dx > 0 else -1 if dx < 0 else 0
-            y, x = coords[0], coords[1]
-            path_clear = True
-            for _ in range(neighbour_count):
-                y += step_y
-                x += step_x
-                if y < 0 or y >= 6 or x < 0 or x >= 6:
-                    path_clear = False
-                    break
-                if self.board[y, x] != Color.NONE.value:
-                    path_clear = False
-                    break
-            
-            if path_clear:
-                valid_moves.append(Move(tile, to_tile))
+        square = _TILE_TO_SQUARE[tile]
+        mask = self.move_masks[square]
+        if not mask:
+            return valid_moves
+        neighbour_count = int(self.neighbour_count_board[square // 6, square % 6])
+        for direction in range(4):
+            target = _RAY_TARGET[square][direction][neighbour_count]
+            if target >= 0 and mask >> target & 1:
+                valid_moves.append(Move(tile, _SQUARE_TO_TILE[target]))
         return valid_moves
     
     @override
     def __repr__(self):
-        return f"B{self.to_hash()[-4:]}({self.move_count})"
+        return f"B{str(self.to_hash())[-4:]}({self.move_count})"
 
     @override
     def __eq__(self, other: object):
@@ -275,6 +434,7 @@ class Board:
         my_str += " " * space_length + "  a b c d e f\n"
         return my_str
 
+    @counted("board.to_hash")
     def to_hash(self) -> int:
         # Use numpy operations to find pieces faster
         white_mask = self.board == Color.WHITE.value
@@ -304,6 +464,7 @@ class Board:
             h |= (pos << (i * 6))
         return int(h)  # Ensure Python int, not numpy.int64
 
+    @counted("board.from_hash")
     def from_hash(self, hash: int):
         positions = []
         for i in range(8):
@@ -326,11 +487,17 @@ class Board:
             self.board[coords] = Color.BLACK.value
             self._update_neighbour_count_coords(coords, True)
         self._update_piece_positions()
+        self._rebuild_move_masks()
+
+    def position_key(self) -> int:
+        """to_hash() plus the player to move in the lowest bit, for caches and tables where the side to move matters"""
+        return (self.to_hash() << 1) | (self.current_player == Color.BLACK)
 
     @override
     def __hash__(self) -> int:
         return self.to_hash()
     
+    @counted("board.copy")
     def __copy__(self):
         """Custom shallow copy for faster copying."""
         new_board = object.__new__(Board)
@@ -340,6 +507,9 @@ class Board:
         new_board.base_tile = self.base_tile.copy()
         new_board.current_player = self.current_player
         new_board.move_count = self.move_count
+        new_board.occupied = self.occupied
+        new_board.move_masks = self.move_masks[:]
+        new_board.mobility = self.mobility.copy()
         return new_board
     
     def __deepcopy__(self, memo):
@@ -45,6 +45,17 @@ class Move:
         
         return Move(from_tile, to_tile)
     
+    def to_int(self) -> int:
+        """Packs the move into 11 bits: from_square * 36 + to_square, squares numbered y * 6 + x"""
+        return _tile_to_square(self.from_tile) * 36 + _tile_to_square(self.to_tile)
+
+    @staticmethod
+    def from_int(code: int) -> 'Move':
+        """Reverse of to_int()"""
+        if code < 0 or code >= 36 * 36:
+            raise ValueError(f"Move int must be between 0 and {36 * 36 - 1}, got: {code}")
+        return Move(_square_to_tile(code // 36), _square_to_tile(code % 36))
+    
     def path(self) -> list[str]:
         # Use cached coords if available for performance
         if _TILE_TO_COORDS_CACHE is not None:
@@ -77,3 +88,8 @@ class Move:
         return path
 
 
+def _tile_to_square(tile: str) -> int:
+    return (ord(tile[0]) - ord('a')) + 6 * (int(tile[1]) - 1)
+
+def _square_to_tile(square: int) -> str:
+    return chr(square % 6 + ord('a')) + str(square // 6 + 1)
@@ -0,0 +1,323 @@
+from typing import override
+from functools import cached_property
+import ctypes
+import os
+import numpy as np
+from numpy.typing import NDArray
+
+from topcap.utils.topcap_utils import WinReason
+from topcap.utils.instrumentation import counted
+from .board import Board, _BASE_TILES, _SQUARE_TO_TILE, _TILE_TO_SQUARE, _NEIGHBOUR_SQUARES
+from .color import Color
+from .move import Move
+
+# Board backed by the C++ engine in cpp/ through the C interface of cpp/include/capi.h.
+# Build the library with `make lib` in cpp/, or point TOPCAP_NATIVE_LIB at another build.
+NATIVE_LIB = os.environ.get("TOPCAP_NATIVE_LIB", os.path.join(os.path.dirname(__file__), "..", "..", "..", "cpp", "build", "libtopcap.so"))
+
+# game::EndReason values
+_END_REASONS: list[WinReason] = [WinReason.NONE, WinReason.BASE_REACHED, WinReason.NO_MOVES_LEFT, WinReason.INVALID_MOVE, WinReason.DRAW_THREEFOLD_REPETITION]
+_WINNERS: dict[int, Color] = {1: Color.WHITE, -1: Color.BLACK, 0: Color.NONE}
+_MOVE_TILES: list[tuple[str, str]] = [(_SQUARE_TO_TILE[code // 36], _SQUARE_TO_TILE[code % 36]) for code in range(36 * 36)]
+_MAX_MOVES = 64
+
+
+def _load_library(filename: str) -> ctypes.CDLL | None:
+    if not os.path.exists(filename):
+        return None
+    lib = ctypes.CDLL(filename)
+    u64, c_int, int_p, u64_p = ctypes.c_uint64, ctypes.c_int, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_uint64)
+    lib.topcap_moves.argtypes = [u64, u64, c_int, int_p]
+    lib.topcap_moves.restype = c_int
+    lib.topcap_is_legal.argtypes = [u64, u64, c_int, c_int]
+    lib.topcap_is_legal.restype = c_int
+    lib.topcap_make_move.argtypes = [u64, u64, c_int, c_int, u64_p, u64_p]
+    lib.topcap_make_move.restype = None
+    lib.topcap_terminal.argtypes = [u64, u64, c_int, int_p]
+    lib.topcap_terminal.restype = c_int
+    lib.topcap_hash.argtypes = [u64, u64]
+    lib.topcap_hash.restype = u64
+    lib.topcap_perft.argtypes = [u64, u64, c_int, c_int]
+    lib.topcap_perft.restype = u64
+    lib.topcap_play_game.argtypes = [int_p, c_int, int_p, int_p]
+    lib.topcap_play_game.restype = c_int
+    lib.topcap_selfplay.argtypes = [ctypes.c_char_p, c_int, ctypes.c_double, u64_p, ctypes.POINTER(ctypes.c_float), ctypes.c_int64, u64]
+    lib.topcap_selfplay.restype = ctypes.c_int64
+    lib.topcap_search_new.argtypes = [c_int, ctypes.c_double, ctypes.c_double, ctypes.c_double]
+    lib.topcap_search_new.restype = ctypes.c_void_p
+    lib.topcap_search_free.argtypes = [ctypes.c_void_p]
+    lib.topcap_search_free.restype = None
+    lib.topcap_search_clear.argtypes = [ctypes.c_void_p]
+    lib.topcap_search_clear.restype = None
+    lib.topcap_search.argtypes = [ctypes.c_void_p, u64, u64, c_int, ctypes.c_double, c_int, u64_p, c_int,
+                                  ctypes.POINTER(ctypes.c_double), int_p, u64_p, ctypes.POINTER(ctypes.c_double)]
+    lib.topcap_search.restype = c_int
+    lib.topcap_evaluate.argtypes = [u64, u64, c_int, ctypes.c_double, ctypes.c_double, ctypes.c_double]
+    lib.topcap_evaluate.restype = ctypes.c_double
+    return lib
+
+
+_LIB = _load_library(NATIVE_LIB)
+
+
+def native_available() -> bool:
+    return _LIB is not None
+
+
+def _lib() -> ctypes.CDLL:
+    if _LIB is None:
+        raise ImportError(f"Native engine library {NATIVE_LIB} not found, build it with `make lib` in cpp/")
+    return _LIB
+
+
+def native_perft(white: int, black: int, white_to_play: bool, depth: int) -> int:
+    return _lib().topcap_perft(white, black, white_to_play, depth)
+
+
+def play_native_game(moves: list[Move]) -> tuple[Color, WinReason, int]:
+    """Plays moves from the initial setup with the C++ game rules, threefold repetition included.
+    Returns the winner, the reason the game ended (WinReason.NONE if the moves ran out first) and the number of moves played."""
+    codes = (ctypes.c_int * max(len(moves), 1))(*[move.to_int() for move in moves])
+    winner, steps = ctypes.c_int(), ctypes.c_int()
+    reason = _lib().topcap_play_game(codes, len(moves), ctypes.byref(winner), ctypes.byref(steps))
+    return _WINNERS[winner.value], _END_REASONS[reason], steps.value
+
+
+def native_selfplay(filename: str, games: int, epsilon: float, keys: NDArray[np.uint64], values: NDArray[np.float32], seed: int) -> int:
+    """Appends games self-play episodes to filename (see topcap/agents/utils/selfplay.py), returns the number of records.
+    keys have to be sorted to_hash() values, contiguous like values."""
+    written = _lib().topcap_selfplay(filename.encode(), games, epsilon, keys.ctypes.data_as(ctypes.POINTER(ctypes.c_uint64)),
+                                     values.ctypes.data_as(ctypes.POINTER(ctypes.c_float)), len(keys), seed)
+    if written < 0:
+        raise OSError(f"Can't open {filename} for writing episodes")
+    return written
+
+
+def _bitboards(board: Board) -> tuple[int, int]:
+    if isinstance(board, NativeBoard):
+        return board.bitboards[Color.WHITE], board.bitboards[Color.BLACK]
+    return tuple(sum(1 << _TILE_TO_SQUARE[tile] for tile in board.tiles[color]) for color in (Color.WHITE, Color.BLACK)) # type: ignore
+
+
+def native_evaluate(board: Board, initiative_factor: float = 1.0, distance_factor: float = 1.0, available_moves_factor: float = 1.0) -> float:
+    """SimpleHeuristic.evaluate() computed by the engine"""
+    white, black = _bitboards(board)
+    return _lib().topcap_evaluate(white, black, board.current_player == Color.WHITE, initiative_factor, distance_factor, available_moves_factor)
+
+
+class NativeSearch:
+    """Handle of a search::Searcher in the engine, its transposition table is kept between searches.
+    Scores are from the point of view of the player to move, like NegamaxSearch."""
+    def __init__(self, table_bits: int = 20, initiative_factor: float = 1.0, distance_factor: float = 1.0, available_moves_factor: float = 1.0):
+        self._lib: ctypes.CDLL = _lib()
+        self._handle: int = self._lib.topcap_search_new(table_bits, initiative_factor, distance_factor, available_moves_factor)
+
+    def search(self, board: Board, max_time: float, max_depth: int, repeated: list[int] | None = None) -> tuple[Move | None, float, int, int, float]:
+        """(best move, score, depth, nodes, seconds) of the deepest completed iteration.
+        repeated are the to_hash() of the positions the game already saw twice."""
+        repeated = repeated or []
+        white, black = _bitboards(board)
+        score, depth, nodes, elapsed = ctypes.c_double(), ctypes.c_int(), ctypes.c_uint64(), ctypes.c_double()
+        code = self._lib.topcap_search(self._handle, white, black, board.current_player == Color.WHITE, max_time, max_depth,
+                                       (ctypes.c_uint64 * max(len(repeated), 1))(*repeated), len(repeated),
+                                       ctypes.byref(score), ctypes.byref(depth), ctypes.byref(nodes), ctypes.byref(elapsed))
+        return Move(*_MOVE_TILES[code]) if code >= 0 else None, score.value, depth.value, nodes.value, elapsed.value
+
+    def clear(self):
+        self._lib.topcap_search_clear(self._handle)
+
+    def __del__(self):
+        if getattr(self, "_handle", None):
+            self._lib.topcap_search_free(self._handle)
+            self._handle = 0
+
+
+class NativeBoard(Board):
+    """Board keeping only the two bitboards, move generation, validation, win checks and hashing run in the C++ engine.
+    The python views of the position (board, tiles, move_masks, ...) are computed when read and cached until the next change.
+    Tiles are listed in square order, so moves come in a different order than with the python Board."""
+    _CACHED = ("tiles", "board", "neighbour_count_board", "occupied", "move_masks", "mobility")
+
+    def __init__(self):
+        self._lib: ctypes.CDLL = _lib()
+        self._moves_buffer = (ctypes.c_int * _MAX_MOVES)()
+        self.initial_setup()
+
+    @override
+    def initial_setup(self):
+        self.bitboards: dict[Color, int] = {Color.WHITE: 0, Color.BLACK: 0}
+        for tile in ["a4", "b3", "c2", "d1"]:
+            self.bitboards[Color.WHITE] |= 1 << _TILE_TO_SQUARE[tile]
+        for tile in ["c6", "d5", "e4", "f3"]:
+            self.bitboards[Color.BLACK] |= 1 << _TILE_TO_SQUARE[tile]
+        self.base_tile: dict[Color, str] = dict(_BASE_TILES)
+        self.current_player: Color = Color.WHITE
+        self.move_count: int = 0
+        self._invalidate()
+
+    def _invalidate(self):
+        for name in self._CACHED:
+            self.__dict__.pop(name, None)
+
+    @cached_property
+    def tiles(self) -> dict[Color, list[str]]:
+        return {color: [_SQUARE_TO_TILE[square] for square in range(36) if bitboard >> square & 1] for color, bitboard in self.bitboards.items()}
+
+    @cached_property
+    def board(self) -> NDArray[np.int8]:
+        board = np.zeros((6, 6), dtype=np.int8)
+        for color, bitboard in self.bitboards.items():
+            for square in range(36):
+                if bitboard >> square & 1:
+                    board[square // 6, square % 6] = color.value
+        return board
+
+    @cached_property
+    def neighbour_count_board(self) -> NDArray[np.int8]:
+        occupied = self.occupied
+        return np.array([(_NEIGHBOUR_SQUARES[square] & occupied).bit_count() for square in range(36)], dtype=np.int8).reshape(6, 6)
+
+    @cached_property
+    def occupied(self) -> int:
+        return self.bitboards[Color.WHITE] | self.bitboards[Color.BLACK]
+
+    @cached_property
+    def move_masks(self) -> list[int]:
+        masks = [0] * 36
+        for color in Color.WHITE, Color.BLACK:
+            for code in self._move_codes(color):
+                masks[code // 36] |= 1 << (code % 36)
+        return masks
+
+    @cached_property
+    def mobility(self) -> dict[Color, int]:
+        return {color: sum(self.move_masks[_TILE_TO_SQUARE[tile]].bit_count() for tile in self.tiles[color]) for color in (Color.WHITE, Color.BLACK)}
+
+    def _move_codes(self, color: Color) -> list[int]:
+        count = self._lib.topcap_moves(self.bitboards[Color.WHITE], self.bitboards[Color.BLACK], color == Color.WHITE, self._moves_buffer)
+        return self._moves_buffer[:count]
+
+    @override
+    @counted("board.move")
+    def move(self, move: Move, verbose: bool = False):
+        from_content = self.get_tile_content(move.from_tile) if self._tile_exists(move.from_tile) else Color.NONE
+        if not self.move_is_valid(move, from_content):
+            raise ValueError(f"Cannot execute move, invalid move {move}, please check this before running move()")
+        white, black = ctypes.c_uint64(), ctypes.c_uint64()
+        self._lib.topcap_make_move(self.bitboards[Color.WHITE], self.bitboards[Color.BLACK], from_content == Color.WHITE, move.to_int(), ctypes.byref(white), ctypes.byref(black))
+        self.bitboards = {Color.WHITE: white.value, Color.BLACK: black.value}
+        self._invalidate()
+        self.current_player = self.current_player.opposite()
+        self.move_count += 1
+        if verbose:
+            print(f"Executed move {move}")
+
+    @override
+    def _shift_piece(self, from_tile: str, to_tile: str, content: Color):
+        self.bitboards[content] ^= 1 << _TILE_TO_SQUARE[from_tile] | 1 << _TILE_TO_SQUARE[to_tile]
+        self._invalidate()
+
+    @override
+    def move_is_valid(self, move: Move | None, moving_player: Color, verbose: bool = False) -> bool:
+        if move is None or not self._tile_exists(move.from_tile) or not self._tile_exists(move.to_tile):
+            if verbose:
+                print(f"Move {move} is None or has a tile that does not exist, invalid move")
+            return False
+        if moving_player == Color.NONE or self.get_tile_content(move.from_tile) != moving_player:
+            if verbose:
+                print(f"Invalid move, from tile {move.from_tile} holds no piece of {moving_player}")
+            return False
+        if not self._lib.topcap_is_legal(self.bitboards[Color.WHITE], self.bitboards[Color.BLACK], moving_player == Color.WHITE, move.to_int()):
+            if verbose:
+                print(f"Invalid move {move}, rejected by the engine")
+            return False
+        return True
+
+    @override
+    @counted("board.move_generation")
+    def get_all_valid_moves(self, player: Color) -> list[Move]:
+        return [Move(*_MOVE_TILES[code]) for code in self._move_codes(player)]
+
+    @override
+    def _get_valid_moves_for_tile(self, tile: str) -> list[Move]:
+        content = self.get_tile_content(tile)
+        if content == Color.NONE:
+            return []
+        return [move for move in self.get_all_valid_moves(content) if move.from_tile == tile]
+
+    @override
+    def get_win_reason(self) -> tuple[Color, WinReason]:
+        winner = ctypes.c_int()
+        reason = self._lib.topcap_terminal(self.bitboards[Color.WHITE], self.bitboards[Color.BLACK], self.current_player == Color.WHITE, ctypes.byref(winner))
+        return _WINNERS[winner.value], _END_REASONS[reason]
+
+    @override
+    def _set_tile_content(self, tile: str, content: Color, update_moves: bool = True):
+        if not self._tile_exists(tile):
+            raise ValueError(f"Tile {tile} does not exist, can't set content")
+        old_content = self.get_tile_content(tile)
+        if content != Color.NONE and old_content != Color.NONE:
+            raise ValueError(f"Tile {tile} is already occupied, can't the content to {content}")
+        if content == Color.NONE and old_content == Color.NONE:
+            raise ValueError(f"Tile {tile} is already empty, can't remove the content")
+        bit = 1 << _TILE_TO_SQUARE[tile]
+        self.bitboards[content if content != Color.NONE else old_content] ^= bit
+        self._invalidate()
+
+    @override
+    def get_tile_content(self, tile: str):
+        bit = 1 << _TILE_TO_SQUARE[tile]
+        if self.bitboards[Color.WHITE] & bit:
+            return Color.WHITE
+        if self.bitboards[Color.BLACK] & bit:
+            return Color.BLACK
+        return Color.NONE
+
+    @override
+    def _get_neighbour_count(self, tile: str) -> int:
+        return (_NEIGHBOUR_SQUARES[_TILE_TO_SQUARE[tile]] & self.occupied).bit_count()
+
+    @override
+    @counted("board.to_hash")
+    def to_hash(self) -> int:
+        return self._lib.topcap_hash(self.bitboards[Color.WHITE], self.bitboards[Color.BLACK])
+
+    @override
+    @counted("board.from_hash")
+    def from_hash(self, hash: int):
+        squares = [(hash >> (i * 6)) & 0b111111 for i in range(8)]
+        self.bitboards = {Color.WHITE: sum(1 << square for square in squares[:4]), Color.BLACK: sum(1 << square for square in squares[4:])}
+        self._invalidate()
+
+    def __getstate__(self):
+        # the library handle and buffer can't be pickled, for multiprocessing
+        return {name: value for name, value in self.__dict__.items() if name not in self._CACHED and name not in ("_lib", "_moves_buffer")}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lib = _lib()
+        self._moves_buffer = (ctypes.c_int * _MAX_MOVES)()
+
+    def to_python_board(self) -> Board:
+        """Same position on a python Board"""
+        board = Board()
+        board.from_hash(self.to_hash())
+        board.current_player = self.current_player
+        board.move_count = self.move_count
+        return board
+
+    @override
+    @counted("board.copy")
+    def __copy__(self):
+        new_board = object.__new__(NativeBoard)
+        new_board._lib = self._lib
+        new_board._moves_buffer = (ctypes.c_int * _MAX_MOVES)()
+        new_board.bitboards = self.bitboards.copy()
+        new_board.base_tile = self.base_tile.copy()
+        new_board.current_player = self.current_player
+        new_board.move_count = self.move_count
+        return new_board
+
+    @override
+    def __deepcopy__(self, memo):
+        return self.__copy__()
@@ -26,7 +26,25 @@ class Player(ABC):
             move [Move] : The chosen move by the player for the current board state
         """
 
+    def opponent_move_callback(self, move: Move, board: Board):
+        """Called by the game right after the opponent played a valid move.
+            move [Move] : The move the opponent played
+            board [Board] : The board state after that move (do not keep a reference, it is mutated by the game)
+        """
+        pass
+
+    def game_step_callback(self, player: Color, new_board: Board, reward: float, terminal: bool):
+        """Called by the game after every step of either player, with the reward of the step for white (Game's MAX_REWARD
+        times the winner), used by the learning agents.
+            player [Color] : The player to move next, or the player that just moved if the game is over
+            new_board [Board] : The board state after the step (do not keep a reference, it is mutated by the game)
+        """
+        pass
+
     def game_over_callback(self, win: bool):
+        """Called by the game once it is over, however it ended.
+            win [bool] : True if this player won, False for a loss or a draw
+        """
         pass
 
 
@@ -0,0 +1,84 @@
+"""Line protocol between a game runner and an engine process on its stdin/stdout, one command per line:
+
+    host -> engine                                      engine -> host
+    topcap                                              id <name>, then ready
+    newgame <white|black>                               ready
+    opponent <move>                                     (nothing)
+    go <hash> <white|black> <move count> <seconds>      move <move>
+    quit
+
+hash is Board.to_hash() of the position, white|black the player to move and seconds the time the engine may think.
+Moves are in Move.to_code() format, "(a1 a2)". Any command can be answered with "error <message>" instead.
+ExternalEngine (topcap.agents) plays through it, serve() puts any Player behind it, cpp/build/engine speaks it too."""
+from contextlib import redirect_stdout
+import sys
+from typing import TextIO
+
+from .board import Board
+from .color import Color
+from .move import Move
+from .player import Player
+
+
+def color_name(color: Color) -> str:
+    return "white" if color == Color.WHITE else "black"
+
+
+def parse_color(name: str) -> Color:
+    if name not in ("white", "black"):
+        raise ValueError(f"Color must be white or black, got: {name}")
+    return Color.WHITE if name == "white" else Color.BLACK
+
+
+def go_command(board: Board, seconds: float) -> str:
+    return f"go {board.to_hash()} {color_name(board.current_player)} {board.move_count} {seconds:g}"
+
+
+def board_from_go(hash: str, color: str, move_count: str) -> Board:
+    board = Board()
+    board.from_hash(int(hash))
+    board.current_player = parse_color(color)
+    board.move_count = int(move_count)
+    return board
+
+
+def serve(player: Player, input: TextIO = sys.stdin, output: TextIO = sys.stdout):
+    """Plays player over the protocol until quit or the end of input.
+    Whatever the player prints goes to stderr, stdout only carries the protocol."""
+    player.verbose = False
+    board = Board()
+
+    def reply(message: str):
+        output.write(message + "\n")
+        output.flush()
+
+    for line in input:
+        if not line.strip():
+            continue
+        command, *args = line.split()
+        try:
+            with redirect_stdout(sys.stderr):
+                if command == "topcap":
+                    reply(f"id {player.name}")
+                    reply("ready")
+                elif command == "newgame":
+                    player.set_color(parse_color(args[0]))
+                    board = Board()
+                    reply("ready")
+                elif command == "opponent":
+                    move = Move.from_code(" ".join(args))
+                    board.move(move)
+                    player.opponent_move_callback(move, board)
+                elif command == "go":
+                    board = board_from_go(*args[:3])
+                    if hasattr(player, "max_thinking_time"):
+                        player.max_thinking_time = float(args[3])
+                    move = player.get_move(board.__copy__())
+                    board.move(move)
+                    reply(f"move {move.to_code()}")
+                elif command == "quit":
+                    return
+                else:
+                    reply(f"error unknown command {command}")
+        except Exception as error:
+            reply(f"error {type(error).__name__}: {error}")
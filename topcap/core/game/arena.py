@@ -1,19 +1,22 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 import random
-import matplotlib.pyplot as plt
+import threading
 from datetime import datetime
 
 from topcap.agents.leo_agent_v1 import LeoAgentV1
 from topcap.agents.rl_agent import ReinforcementLearningAgent
 
 from .game import Game
-from topcap.agents import RandomAI
+from topcap.agents.random_ai import RandomAI
+from topcap.agents.external_engine import ExternalEngine
+from topcap.agents.utils.tablebase import Tablebase
 from topcap.core.common import Player, Color
-from topcap.utils import WinReason
+from topcap.utils import WinReason, instrumentation
 
 class Arena: 
-    def __init__(self) -> None:
+    def __init__(self, tablebase: Tablebase | None = None) -> None:
         self.wins_by_player: defaultdict[str, int] = defaultdict(int)
         self.wins_by_type: defaultdict[str, int] = defaultdict(int)
         self.total_games: int = 0
@@ -21,6 +24,10 @@ class Arena:
         self.game_history: list[dict[str, int]] = []  # List of {player_name: cumulative_wins} per game
         # Track param size over time
         self.param_size_history: list[int] = []
+        # Optional perfect move scoring: moves that gave away a won or drawn position
+        self.tablebase: Tablebase | None = tablebase
+        self.mistakes_by_player: defaultdict[str, int] = defaultdict(int)
+        self.moves_by_player: defaultdict[str, int] = defaultdict(int)
 
 
     def _run_single_game(self, white: Player, black: Player, verbose: bool=False) -> tuple[Player | None, WinReason, Game]:
@@ -53,10 +60,13 @@ class Arena:
         if not verbose:
             player_1.verbose = False
             player_2.verbose = False
+        before = instrumentation.snapshot()
         for i in range(count):
             white = player_1 if i%2==0 else player_2
             black = player_1 if i%2==1 else player_2
             winner, win_reason, game = self._run_single_game(white, black, verbose)
+            if self.tablebase is not None:
+                self._analyse_game(game)
             if winner:
                 print(f"Game {i+1}/{count}: {winner} wins because {win_reason.value}")
                 # Track stats
@@ -71,11 +81,64 @@ class Arena:
             cumulative_wins = dict(self.wins_by_player)
             self.game_history.append(cumulative_wins)
         
+        if instrumentation.ENABLED:
+            print(instrumentation.since(before, games=count).format())
+        if self.tablebase is not None:
+            for name, moves in self.moves_by_player.items():
+                print(f"{name}: {self.mistakes_by_player[name]} mistakes in {moves} moves according to the tablebase")
         if count > 1 and plot_stats:
             self._plot_stats()
 
+    def run_engine_games(self, count: int, command_1: list[str], command_2: list[str], workers: int = 4, move_time: float = 1.0, move_timeout: float | None = None, plot_stats: bool = True) -> None:
+        """Runs X games with alternating colors between two engine processes (ExternalEngine), workers games at a time.
+        Every worker thread plays with its own pair of processes, an engine that does not answer within move_timeout
+        is killed and loses the game as crashed."""
+        local = threading.local()
+        engines: list[ExternalEngine] = []
+
+        def play(i: int) -> tuple[Player | None, WinReason, Game]:
+            if not hasattr(local, "engines"):
+                local.engines = (ExternalEngine(command_1, move_time=move_time, move_timeout=move_timeout, verbose=False),
+                                 ExternalEngine(command_2, move_time=move_time, move_timeout=move_timeout, verbose=False))
+                if local.engines[0].name == local.engines[1].name:
+                    local.engines[1].name += " 2"
+                engines.extend(local.engines)
+            white = local.engines[i % 2]
+            black = local.engines[1 - i % 2]
+            return self._run_single_game(white, black)
+
+        try:
+            with ThreadPoolExecutor(workers) as executor:
+                for i, (winner, win_reason, game) in enumerate(executor.map(play, range(count))):
+                    if self.tablebase is not None:
+                        self._analyse_game(game)
+                    if winner:
+                        print(f"Game {i+1}/{count}: {winner} wins because {win_reason.value}")
+                        self.wins_by_player[winner.name] += 1
+                    else:
+                        print(f"Game {i+1}/{count}: Draw - {win_reason.value}")
+                        self.wins_by_player["Draw"] += 1
+                    self.wins_by_type[win_reason.name] += 1
+                    self.total_games += 1
+                    self.game_history.append(dict(self.wins_by_player))
+        finally:
+            for engine in engines:
+                engine.close()
+        if count > 1 and plot_stats:
+            self._plot_stats()
+
+    def _analyse_game(self, game: Game) -> None:
+        """Scores every move of the game with the tablebase and counts the moves that gave away a win or a draw"""
+        assert self.tablebase is not None
+        for analysis in self.tablebase.analyse_game(game.board_states):
+            player = game.white if analysis.player == Color.WHITE else game.black
+            self.moves_by_player[player.name] += 1
+            if analysis.is_mistake:
+                self.mistakes_by_player[player.name] += 1
+
     def _plot_stats(self) -> None:
         """Plot winrate and win type statistics"""
+        import matplotlib.pyplot as plt # slow to import, only needed here
         fig, (ax1, ax2, ax3, ax4) = plt.subplots(1, 4, figsize=(20, 4))
         
         # Winrate over time (moving average over last 20 games)
@@ -217,6 +280,7 @@ class Arena:
         log_frequency = 50
         start_time = datetime.now()
         position_count = 0
+        log_snapshot = instrumentation.snapshot()
         for i in range(num_games):
             # Every save_frequency games, save the agent and add a snapshot
             if i > 0 and i % save_frequency == 0:
@@ -232,6 +296,9 @@ class Arena:
                 print(f"{(log_frequency/duration):.0f} games/s")
                 print(f"{(position_count/duration):.0f} posistions/s")
                 print(f"{(position_count/log_frequency):.0f} posistions/game")
+                if instrumentation.ENABLED:
+                    print(instrumentation.since(log_snapshot, games=log_frequency).format())
+                    log_snapshot = instrumentation.snapshot()
                 start_time = datetime.now()
                 position_count = 0
             
@@ -404,6 +471,7 @@ class Arena:
     
     def _plot_progress(self, iteration_winrates: dict[int, float], agent: ReinforcementLearningAgent, opponent_name: str) -> None:
         """Plot winrate over iterations."""
+        import matplotlib.pyplot as plt
         iterations = sorted(iteration_winrates.keys())
         winrates = [iteration_winrates[it] for it in iterations]
         
@@ -2,9 +2,9 @@ from copy import deepcopy
 from collections import Counter
 import traceback
 
-from topcap.agents.rl_agent import ReinforcementLearningAgent
 from topcap.core.common import Board, Player, Color, Move
-from topcap.utils import WinReason
+from topcap.utils import WinReason, instrumentation
+from topcap.utils.instrumentation import counted, timed
 
 class Game:
     def __init__(self, verbose: bool = True):
@@ -20,6 +20,7 @@ class Game:
         self.winner: Color
         self.win_reason: WinReason
         self.game_over: bool
+        self.instrumentation: instrumentation.Report | None = None # counters of the last game, with TOPCAP_INSTRUMENT=1
 
     def _setup_new_game(self, white: Player, black: Player, custom_board: Board | None = None):
         self.white = white
@@ -39,7 +40,9 @@ class Game:
         if self.verbose:
             print(message)
 
+    @timed("game.run_game")
     def run_game(self, white: Player, black: Player, custom_board: Board | None = None):
+        before = instrumentation.snapshot() if instrumentation.ENABLED else None
         self._setup_new_game(white, black, custom_board)
         self.log("Here begins the game of topcap!\n")
         self.log(f"{self.white} vs {self.black} ")
@@ -55,16 +58,27 @@ class Game:
             if not self.game_over and self.verbose:
                 # do not print next game state if game is over
                 self._print_game_state()
+        for player in self.white, self.black:
+            try:
+                player.game_over_callback(player.color == self.winner)
+            except Exception as error: # the result stands, the game is over
+                print(f"ERROR: {player}'s game over callback crashed!! Type: {type(error).__name__}, Error: {error}")
+                self.log(traceback.format_exc())
+        if before is not None:
+            self.instrumentation = instrumentation.since(before, games=1)
 
-    def _handle_crash(self, error):
-        print(f"ERROR: {self.current_player} crashed!! Type: {type(error).__name__}, Error: {error}")
+    def _handle_crash(self, error, player: Player | None = None):
+        """Ends the game, the player that crashed (the current player by default) loses"""
+        player = player if player is not None else self.current_player
+        print(f"ERROR: {player} crashed!! Type: {type(error).__name__}, Error: {error}")
         self.log(traceback.format_exc())
         # TODO: add step_callback?
         self.win_reason = WinReason.CRASHED
-        self.winner = Color.WHITE if self.current_player.color == Color.BLACK else Color.BLACK
+        self.winner = Color.WHITE if player.color == Color.BLACK else Color.BLACK
         self.game_over = True
         self.log(f"{self.winner} wins because {self.win_reason.value}!")
         
+    @counted("game.step")
     def _game_step(self, next_move: Move):
         if not self.board.move_is_valid(next_move, self.current_player.color):
             # INVALID_MOVE
@@ -74,6 +88,12 @@ class Game:
             # VALID MOVE
             self.board.move(next_move)
             self.log(f"{self.current_player} moved from {next_move.from_tile} to {next_move.to_tile}")
+            opponent = self.black if self.current_player is self.white else self.white
+            try:
+                opponent.opponent_move_callback(next_move, self.board)
+            except Exception as error: # the move was fine, the opponent crashed
+                self._handle_crash(error, opponent)
+                return
             self.winner, self.win_reason = self.board.get_win_reason()
             self.game_over = self.win_reason != WinReason.NONE
 
@@ -98,10 +118,8 @@ class Game:
                 self.log(f"{self.winner} wins because {self.win_reason}!")
 
         # AGENT GAME STEP CALLBACKS
-        if isinstance(self.white, ReinforcementLearningAgent):
-            self.white.game_step_callback(self.current_player.color, self.board, reward, self.game_over)
-        if isinstance(self.black, ReinforcementLearningAgent):
-            self.black.game_step_callback(self.current_player.color, self.board, reward, self.game_over)
+        self.white.game_step_callback(self.current_player.color, self.board, reward, self.game_over)
+        self.black.game_step_callback(self.current_player.color, self.board, reward, self.game_over)
 
     def _print_game_state(self):
         next_available_moves = self.board.get_all_valid_moves(self.current_player.color)
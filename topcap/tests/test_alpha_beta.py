@@ -0,0 +1,54 @@
+from topcap.agents import AlphaBetaAI, RandomAI
+from topcap.agents.utils.heuristic import SimpleHeuristic
+from topcap.agents.utils.transposition import TranspositionTable, EXACT, LOWER
+from topcap.core.common import Board, Color, Move
+from topcap.core.game import Game
+from topcap.utils import WinReason
+
+
+def test_transposition_table_round_trip():
+    table = TranspositionTable(1024)
+    board = Board()
+    key = board.position_key()
+    table.store(key, -3.5, 4, EXACT, Move("a4", "a6"))
+    score, depth, flag, move = table.probe(key)
+    assert (score, depth, flag) == (-3.5, 4, EXACT)
+    assert move is not None and move.to_code() == "(a4 a6)"
+    assert table.probe(key + 1024) is None # same slot, other position
+    # a torn write fails the key check
+    table.entries[key % 1024, 1] ^= 1 << 50
+    assert table.probe(key) is None
+
+def test_shared_table_is_visible_to_other_handles():
+    table = TranspositionTable(1024, shared=True)
+    try:
+        other = TranspositionTable.attach(table.name, 1024)
+        other.store(12345, 1.0, 2, LOWER, None)
+        assert table.probe(12345) == (1.0, 2, LOWER, None)
+        other.close()
+    finally:
+        table.close(unlink=True)
+
+def test_alpha_beta_takes_the_win():
+    board = Board()
+    board._set_tile_content("d1", Color.NONE)
+    board._set_tile_content("e6", Color.WHITE)
+    agent = AlphaBetaAI(SimpleHeuristic(), max_thinking_time=1, verbose=False)
+    agent.set_color(Color.WHITE)
+    assert agent.get_move(board).to_code() == "(e6 f6)"
+
+def test_alpha_beta_game():
+    agent = AlphaBetaAI(SimpleHeuristic(), max_thinking_time=0.05, verbose=False)
+    game = Game(verbose=False)
+    game.run_game(agent, RandomAI("Randi", verbose=False))
+    assert game.win_reason not in (WinReason.CRASHED, WinReason.INVALID_MOVE)
+
+def test_lazy_smp_search():
+    agent = AlphaBetaAI(SimpleHeuristic(), workers=2, verbose=False)
+    try:
+        board = Board()
+        result = agent.search(board, max_time=1, max_depth=4)
+        assert result.move is not None and board.move_is_valid(result.move, Color.WHITE)
+        assert result.depth == 4
+    finally:
+        agent.close()
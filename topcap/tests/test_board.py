@@ -1,6 +1,9 @@
+import random
+
 import pytest
 
 from topcap.core.common import Board, Color, Move
+from topcap.core.common.board import _TILE_TO_COORDS_CACHE
 import topcap.utils as utils
 
 def test_tile_to_coords():
@@ -57,3 +60,47 @@ def test_get_valid_moves():
 
 
 
+
+def test_incremental_mobility_matches_move_validation():
+    rng = random.Random(0)
+    all_moves = [Move(from_tile, to_tile) for from_tile in _TILE_TO_COORDS_CACHE for to_tile in _TILE_TO_COORDS_CACHE if from_tile != to_tile]
+    for _ in range(30):
+        board = Board()
+        while board.get_win_reason()[0] == Color.NONE:
+            for color in Color.WHITE, Color.BLACK:
+                assert board.mobility[color] == sum(board.move_is_valid(move, color) for move in all_moves)
+            board.move(rng.choice(board.get_all_valid_moves(board.current_player)))
+            copy = Board()
+            copy.from_hash(board.to_hash())
+            assert copy.move_masks == board.move_masks and copy.mobility == board.mobility
+
+def test_threats_match_move_generation():
+    rng = random.Random(1)
+    for _ in range(30):
+        board = Board()
+        while board.get_win_reason()[0] == Color.NONE:
+            for color in Color.WHITE, Color.BLACK:
+                opponent_base = board.base_tile[color.opposite()]
+                tiles = board.tiles[color][:]
+                one = board.threats(color)
+                assert sorted(one.attackers) == sorted(m.from_tile for m in board.get_all_valid_moves(color) if m.to_tile == opponent_base)
+                two = board.threats(color, plies=2)
+                expected = [m.to_code() for m in one.moves]
+                for move in board.get_all_valid_moves(color):
+                    if move.from_tile in one.attackers:
+                        continue
+                    after = board.__copy__()
+                    after.move(move)
+                    if any(m.to_tile == opponent_base and m.from_tile not in one.attackers for m in after.get_all_valid_moves(color)):
+                        expected.append(move.to_code())
+                assert sorted(m.to_code() for m in two.moves) == sorted(expected)
+                assert board.tiles[color] == tiles
+                assert not set(two.defending_squares) & set(board.tiles[Color.WHITE] + board.tiles[Color.BLACK])
+            board.move(rng.choice(board.get_all_valid_moves(board.current_player)))
+
+def test_move_int_round_trip():
+    for from_tile in _TILE_TO_COORDS_CACHE:
+        for to_tile in _TILE_TO_COORDS_CACHE:
+            code = Move(from_tile, to_tile).to_int()
+            assert 0 <= code < 36 * 36
+            assert Move.from_int(code).to_code() == Move(from_tile, to_tile).to_code()
@@ -0,0 +1,44 @@
+import numpy as np
+
+from topcap.agents.utils.batch_moves import decode_keys, encode_keys
+from topcap.agents.utils.census import census
+from topcap.core.common import Board, Color
+from topcap.utils import WinReason
+
+
+def _check_against_board_bfs(board: Board, max_depth: int, spill_directory: str):
+    levels = census(max_depth, board, spill_directory=spill_directory, chunk_size=500, verbose=False)
+    # plain breadth-first search over Board, every position counted at the first depth it is reached
+    seen = {board.position_key()}
+    level = [board]
+    for depth in range(max_depth + 1):
+        reasons = [position.get_win_reason()[1] for position in level]
+        assert levels[depth].new == len(level)
+        assert levels[depth].base_reached == reasons.count(WinReason.BASE_REACHED)
+        assert levels[depth].no_moves == reasons.count(WinReason.NO_MOVES_LEFT)
+        next_level = []
+        for position, reason in zip(level, reasons):
+            if reason != WinReason.NONE:
+                continue
+            for move in position.get_all_valid_moves(position.current_player):
+                child = position.__copy__()
+                child.move(move)
+                if child.position_key() not in seen:
+                    seen.add(child.position_key())
+                    next_level.append(child)
+        level = next_level
+
+def test_keys_match_board():
+    board = Board()
+    board.move(board.get_all_valid_moves(Color.WHITE)[3])
+    key = np.array([board.position_key()], dtype=np.uint64)
+    white, black, black_to_move = decode_keys(key)
+    assert bool(black_to_move[0])
+    assert (encode_keys(white[:, ::-1], black, black_to_move) == key).all()
+
+def test_census_matches_board_bfs(tmp_path):
+    _check_against_board_bfs(Board(), 4, str(tmp_path / "initial"))
+    board = Board()
+    board._set_tile_content("d1", Color.NONE)
+    board._set_tile_content("e6", Color.WHITE)
+    _check_against_board_bfs(board, 3, str(tmp_path / "threat"))
@@ -1,6 +1,8 @@
+from typing import override
+
 from topcap.agents import RandomAI, DeterministicAI
 from topcap.core.game import Game
-from topcap.core.common import Move, Board
+from topcap.core.common import Move, Board, Color
 from topcap.utils.topcap_utils import WinReason
 
 VERBOSE = True
@@ -45,3 +47,18 @@ def test_no_moves_left():
     assert game.win_reason == WinReason.NO_MOVES_LEFT
     assert game.winner == leo.color
 
+
+class _FragileAI(RandomAI):
+    """Crashes as soon as it hears about the opponent's move"""
+    @override
+    def opponent_move_callback(self, move: Move, board: Board):
+        raise RuntimeError("lost the connection")
+
+def test_callback_crash_is_charged_to_the_opponent():
+    leo = RandomAI(name="Léo", verbose=VERBOSE)
+    jan = _FragileAI(name="Jan", verbose=VERBOSE)
+    game = Game(verbose=VERBOSE)
+    game.run_game(leo, jan)
+    assert game.board.move_count == 1
+    assert game.win_reason == WinReason.CRASHED
+    assert game.winner == Color.WHITE
@@ -0,0 +1,126 @@
+import time
+
+from topcap.agents import GraphAI, GraphAICopilot, RandomAI
+from topcap.agents.utils.heuristic import SimpleHeuristic
+from topcap.core.common import Board, Color, Move
+from topcap.core.game import Game
+from topcap.utils import WinReason
+
+THINKING_TIME = 0.3
+
+
+def test_graph_respects_memory_budget():
+    graph_ai = GraphAI(SimpleHeuristic(), max_thinking_time=THINKING_TIME, verbose=False, max_graph_nodes=200)
+    board = Board()
+    graph_ai.get_move(board)
+    assert len(graph_ai.graph.nodes) <= 200
+    assert graph_ai.nodes_freed > 0
+
+def test_eviction_keeps_the_frontier():
+    # the first level does not fit: nothing can be evicted, the search stops instead of collapsing the root's children
+    graph_ai = GraphAI(SimpleHeuristic(), max_thinking_time=10, verbose=False, max_graph_nodes=60)
+    board = Board()
+    graph_ai.get_move(board)
+    root_children = graph_ai.graph.nodes[graph_ai.current_position]["children"]
+    assert len(root_children) == len(board.get_all_valid_moves(board.current_player))
+    assert graph_ai.nodes_freed == 0 and graph_ai.current_level == root_children
+    # one level deeper, only explored nodes of the level are collapsed, never the root's children or unexplored nodes
+    graph_ai = GraphAI(SimpleHeuristic(), max_thinking_time=10, verbose=False, max_graph_nodes=200, max_nodes_per_move=40)
+    graph_ai.get_move(board)
+    assert graph_ai.nodes_freed > 0 and graph_ai.current_depth == 2
+    for child in graph_ai.graph.nodes[graph_ai.current_position]["children"]:
+        assert graph_ai.graph.nodes[child]["explored"]
+        assert len(graph_ai.graph.nodes[child]["children"]) == len(child.get_all_valid_moves(child.current_player))
+    assert any(not graph_ai.graph.nodes[node]["explored"] for node in graph_ai.current_level)
+
+def test_unreachable_subtrees_are_pruned():
+    graph_ai = GraphAI(SimpleHeuristic(), max_thinking_time=THINKING_TIME, verbose=False)
+    board = Board()
+    board.move(graph_ai.get_move(board))
+    board.move(board.get_all_valid_moves(board.current_player)[0])
+    graph_ai.get_move(board)
+    reachable = graph_ai._reachable_nodes()
+    assert set(graph_ai.graph.nodes) == set(reachable)
+    assert graph_ai.graph.nodes[graph_ai.current_position]["parent"] is None
+
+def test_ponder_hit_reuses_tree():
+    graph_ai = GraphAI(SimpleHeuristic(), max_thinking_time=THINKING_TIME, verbose=False, ponder=True)
+    board = Board()
+    board.move(graph_ai.get_move(board))
+    time.sleep(THINKING_TIME)
+    predicted = graph_ai.ponder_position
+    assert predicted is not None
+    reply = next(move for move in board.get_all_valid_moves(board.current_player) if _after(board, move) == predicted)
+    board.move(reply)
+    graph_ai.opponent_move_callback(reply, board)
+    assert graph_ai.ponder_hits == 1
+    assert graph_ai.ponder_report is not None and graph_ai.ponder_report.nodes > 0
+    assert graph_ai.graph.nodes[predicted]["explored"]
+    graph_ai.get_move(board)
+
+def test_ponder_in_game():
+    graph_ai = GraphAI(SimpleHeuristic(), max_thinking_time=0.05, verbose=False, ponder=True, max_graph_nodes=2000)
+    game = Game(verbose=False)
+    game.run_game(graph_ai, RandomAI("Randi", verbose=False))
+    assert game.win_reason != WinReason.CRASHED
+    assert graph_ai.ponder_hits + graph_ai.ponder_misses > 0
+    assert graph_ai._ponder_thread is None # stopped when the game ended
+
+def test_new_game_stops_pondering():
+    graph_ai = GraphAI(SimpleHeuristic(), max_thinking_time=THINKING_TIME, verbose=False, ponder=True)
+    board = Board()
+    board.move(graph_ai.get_move(board))
+    assert graph_ai._ponder_thread is not None
+    graph_ai.set_color(Color.BLACK)
+    assert graph_ai._ponder_thread is None and graph_ai.ponder_position is None
+
+def _after(board: Board, move: Move) -> Board:
+    new_board = board.__copy__()
+    new_board.move(move)
+    return new_board
+
+def _repetition_cycle(board: Board) -> list[Move]:
+    """Four moves, both players moving a piece and back, that lead to board again"""
+    for white in board.get_all_valid_moves(board.current_player):
+        back = Move(white.to_tile, white.from_tile)
+        after = _after(board, white)
+        for black in after.get_all_valid_moves(after.current_player):
+            black_back = Move(black.to_tile, black.from_tile)
+            if _after(after, black).move_is_valid(back, board.current_player) and _after(_after(after, black), back).move_is_valid(black_back, after.current_player):
+                return [white, black, back, black_back]
+    raise ValueError("No repetition cycle found")
+
+def test_copilot_threefold_repetition_is_a_draw():
+    copilot = GraphAICopilot(SimpleHeuristic(), max_thinking_time=10, verbose=False, max_nodes_per_move=1)
+    board = Board()
+    cycle = _repetition_cycle(board)
+    # play the cycle twice but the last move, which would bring the start position for the third time
+    for move in (cycle + cycle)[:-1]:
+        copilot.history[board.to_hash()] += 1
+        board.move(move)
+    copilot.history[board.to_hash()] += 1
+    copilot.explore_graph(board)
+    repeated = _after(board, cycle[-1])
+    assert repeated == Board()
+    assert copilot.graph.nodes[repeated]["explored"]
+    assert copilot.graph.nodes[repeated]["evaluation"] == 0.0
+    # the other children are searched as usual
+    child = _after(board, next(move for move in board.get_all_valid_moves(board.current_player) if move.to_code() != cycle[-1].to_code()))
+    assert not copilot.graph.nodes[child]["explored"]
+
+def test_copilot_repetition_on_the_search_path_is_a_draw():
+    copilot = GraphAICopilot(SimpleHeuristic(), max_thinking_time=10, verbose=False, max_nodes_per_move=1)
+    board = Board()
+    copilot.explore_graph(board)
+    position = copilot.current_position
+    for move in _repetition_cycle(board):
+        copilot._add_move(position, move)
+        parent, position = position, _after(position, move)
+    # the last move of the cycle goes back to the root, which keeps its own node and subtree
+    assert position == board
+    assert copilot.graph.nodes[board]["parent"] is None
+    assert len(copilot.graph.nodes[board]["children"]) > 1
+    assert copilot.graph.edges[parent, board]["draw"]
+    copilot.graph.nodes[parent]["explored"] = True
+    copilot._update_evaluation(parent)
+    assert copilot.graph.nodes[parent]["evaluation"] == 0.0
@@ -0,0 +1,70 @@
+import random
+
+import numpy as np
+
+from topcap.agents import HeuristicAI
+from topcap.agents.utils.heuristic import BoardFeatures, CachedHeuristic, SimpleHeuristic, ExponentialHeuristic
+from topcap.core.common import Board, Color
+
+
+def _random_boards(count: int, seed: int = 0) -> list[Board]:
+    rng = random.Random(seed)
+    boards: list[Board] = []
+    board = Board()
+    while len(boards) < count:
+        moves = board.get_all_valid_moves(board.current_player)
+        if not moves or board.get_win_reason()[0] != Color.NONE:
+            board = Board()
+            continue
+        board.move(rng.choice(moves))
+        boards.append(board.__copy__())
+    return boards
+
+def test_cached_heuristic_matches_wrapped():
+    heuristic = ExponentialHeuristic()
+    cached = CachedHeuristic(ExponentialHeuristic(), max_size=16)
+    boards = _random_boards(50)
+    for board in boards[:10] * 2 + boards:
+        assert cached.evaluate(board) == heuristic.evaluate(board)
+    assert cached.hits > 0
+    assert len(cached.cache) <= 16
+
+def test_cached_heuristic_keys_on_player_to_move():
+    cached = CachedHeuristic(SimpleHeuristic(initiative_factor=2.0))
+    board = Board()
+    white_to_move = cached.evaluate(board)
+    board.current_player = Color.BLACK
+    black_to_move = cached.evaluate(board)
+    assert cached.misses == 2
+    assert white_to_move != black_to_move
+
+def test_cached_heuristic_is_transparent_to_agents():
+    cached = CachedHeuristic(SimpleHeuristic())
+    agent = HeuristicAI(cached, verbose=False)
+    agent.set_color(Color.WHITE)
+    board = Board()
+    agent.get_move(board)
+    agent.get_move(board)
+    assert cached.hits == cached.misses
+
+def test_evaluate_batch_matches_evaluate():
+    boards = _random_boards(300, seed=1)
+    heuristics = [SimpleHeuristic(), SimpleHeuristic(initiative_factor=2.0, distance_factor=0.5), ExponentialHeuristic(), ExponentialHeuristic(flexibily_factor=0.0)]
+    for heuristic in heuristics:
+        batch = heuristic.evaluate_batch(boards)
+        scalar = np.array([heuristic.evaluate(board) for board in boards])
+        np.testing.assert_allclose(batch, scalar, rtol=1e-9, atol=1e-9)
+
+def test_board_features_mobility():
+    boards = _random_boards(100, seed=2)
+    features = BoardFeatures.from_boards(boards)
+    for board, mobility in zip(boards, features.mobility):
+        assert list(mobility) == [len(board.get_all_valid_moves(Color.WHITE)), len(board.get_all_valid_moves(Color.BLACK))]
+
+def test_cached_evaluate_batch():
+    boards = _random_boards(40, seed=3)
+    cached = CachedHeuristic(ExponentialHeuristic())
+    first = cached.evaluate_batch(boards[:20])
+    second = cached.evaluate_batch(boards)
+    np.testing.assert_array_equal(first, second[:20])
+    assert cached.hits == 20
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = ["matplotlib", "networkx", "torch"]
+
+
+def _loaded_heavy_modules(code: str) -> list[str]:
+    """Heavy modules in sys.modules after running code in a fresh interpreter"""
+    check = f"{code}\nimport sys\nprint(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    return subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True).stdout.split()
+
+
+def test_core_imports_are_light():
+    # what every worker process of a pool pays just to play games
+    assert _loaded_heavy_modules("import topcap.core.common, topcap.core.game, topcap.core.game.arena") == []
+    assert _loaded_heavy_modules("from topcap.agents import RandomAI, HeuristicAI, AlphaBetaAI\nfrom topcap.agents.leo_agent_v1 import LeoAgentV1") == []
+
+
+def test_agents_load_by_name():
+    assert _loaded_heavy_modules("from topcap.agents import GraphAI") == ["networkx"]
+    import topcap.agents
+    assert topcap.agents.GraphAI.__name__ == "GraphAI"
+    assert set(topcap.agents.__all__) <= set(dir(topcap.agents))
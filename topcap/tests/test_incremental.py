@@ -0,0 +1,34 @@
+import random
+
+from topcap.agents.utils.heuristic import SimpleHeuristic, ExponentialHeuristic
+from topcap.agents.utils.incremental import IncrementalEvaluator
+from topcap.core.common import Board, Color
+
+
+def test_incremental_matches_full_evaluation_under_random_play():
+    rng = random.Random(0)
+    for heuristic in SimpleHeuristic(initiative_factor=2.0), ExponentialHeuristic():
+        for _ in range(20):
+            evaluator = IncrementalEvaluator(heuristic, Board(), check=True)
+            while evaluator.board.get_win_reason()[0] == Color.NONE:
+                evaluator.move(rng.choice(evaluator.board.get_all_valid_moves(evaluator.board.current_player)))
+
+def test_unmake_restores_board_and_terms():
+    rng = random.Random(1)
+    board = Board()
+    evaluator = IncrementalEvaluator(ExponentialHeuristic(), board, check=True)
+    start_hash, start_neighbours, start_evaluation = board.to_hash(), board.neighbour_count_board.copy(), evaluator.evaluate()
+    played = []
+    for _ in range(10):
+        moves = board.get_all_valid_moves(board.current_player)
+        if not moves or board.get_win_reason()[0] != Color.NONE:
+            break
+        move = rng.choice(moves)
+        evaluator.move(move)
+        played.append(move)
+    for move in reversed(played):
+        evaluator.unmake(move)
+    assert board.to_hash() == start_hash
+    assert (board.neighbour_count_board == start_neighbours).all()
+    assert board.current_player == Color.WHITE and board.move_count == 0
+    assert evaluator.evaluate() == start_evaluation
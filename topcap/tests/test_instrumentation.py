@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+from topcap.core.common import Board
+from topcap.utils import instrumentation
+
+
+def test_disabled_is_the_plain_function():
+    assert not instrumentation.ENABLED
+    assert not hasattr(Board.to_hash, "__wrapped__")
+    assert not hasattr(Board.get_all_valid_moves, "__wrapped__")
+
+
+def test_counters(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+
+    @instrumentation.counted("test.counted")
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    @instrumentation.timed("test.timed")
+    def fail():
+        raise ValueError
+
+    before = instrumentation.snapshot()
+    assert add(1, 2) == 3
+    add(3, 4)
+    try:
+        fail()
+    except ValueError:
+        pass
+    report = instrumentation.since(before, games=2)
+    assert report.counts == {"test.counted": 2, "test.timed": 1}
+    assert set(report.times) == {"test.timed"}
+    assert "test.counted" in report.format() and "1.0/game" in report.format()
+
+
+def test_game_report():
+    script = ("from topcap.agents import RandomAI\nfrom topcap.core.game import Game\n"
+              "game = Game(verbose=False)\ngame.run_game(RandomAI('Randi', False), RandomAI('Rando', False))\n"
+              "counts = game.instrumentation.counts\n"
+              "assert counts['game.step'] == game.current_step + 1, counts\n"
+              "assert counts['agent.random.get_move'] == counts['game.step']\n"
+              "assert counts['board.move'] >= counts['game.step']\n")
+    subprocess.run([sys.executable, "-c", script], env=os.environ | {"TOPCAP_INSTRUMENT": "1"}, check=True)
@@ -0,0 +1,89 @@
+import pickle
+import random
+import pytest
+
+from topcap.agents import DeterministicAI
+from topcap.agents.utils.perft import random_positions
+from topcap.core.common import Board, Color, Move, Player
+from topcap.core.common.native import NativeBoard, native_available, play_native_game
+from topcap.core.game import Game
+from topcap.utils.topcap_utils import WinReason
+
+pytestmark = pytest.mark.skipif(not native_available(), reason="C++ engine library not built, run `make lib` in cpp/")
+
+
+class _ShufflingAI(Player):
+    """Random moves, but often moves the last piece back to provoke repetitions. Records its moves."""
+    def __init__(self, name: str, rng: random.Random, moves: list[Move]):
+        super().__init__(name, verbose=False)
+        self.rng = rng
+        self.moves = moves
+        self.last: Move | None = None
+
+    def get_move(self, board: Board):
+        moves = board.get_all_valid_moves(self.color)
+        back = [move for move in moves if self.last is not None and move.to_code() == f"({self.last.to_tile} {self.last.from_tile})"]
+        move = back[0] if back and self.rng.random() < 0.7 else self.rng.choice(moves)
+        self.last = move
+        self.moves.append(move)
+        return move
+
+def _native(board: Board) -> NativeBoard:
+    native = NativeBoard()
+    native.from_hash(board.to_hash())
+    native.current_player = board.current_player
+    return native
+
+def _codes(moves: list[Move]) -> list[str]:
+    return sorted(move.to_code() for move in moves)
+
+def test_legal_moves_and_outcomes_match():
+    for board in random_positions(200, seed=1, max_plies=60):
+        native = _native(board)
+        assert native.to_hash() == board.to_hash() and native == board
+        assert (native.board == board.board).all() and (native.neighbour_count_board == board.neighbour_count_board).all()
+        for color in Color.WHITE, Color.BLACK:
+            assert _codes(native.get_all_valid_moves(color)) == _codes(board.get_all_valid_moves(color))
+            assert native.mobility[color] == board.mobility[color]
+        for move in board.get_all_valid_moves(board.current_player):
+            board.move(move)
+            native.move(move)
+            assert native.to_hash() == board.to_hash() and native.get_win_reason() == board.get_win_reason()
+            board.unmake(move)
+            native.unmake(move)
+
+def test_invalid_moves_and_base_tile():
+    board = Board()
+    board._set_tile_content("a2", Color.WHITE)
+    board._set_tile_content("a4", Color.NONE)
+    native = _native(board)
+    # a2 has one neighbour (b3), one step down would be a1, its own base
+    for tested in board, native:
+        assert _codes(tested._get_valid_moves_for_tile("a2")) == ["(a2 a3)", "(a2 b2)"]
+        assert not tested.move_is_valid(Move("a2", "a1"), Color.WHITE)
+        assert not tested.move_is_valid(Move("a2", "a2"), Color.WHITE)
+        assert not tested.move_is_valid(Move("c6", "c4"), Color.WHITE)
+        with pytest.raises(ValueError):
+            tested.move(Move("a2", "a1"))
+    assert play_native_game([Move("a4", "a3"), Move("c6", "a6")]) == (Color.WHITE, WinReason.INVALID_MOVE, 1)
+
+def test_games_match_python_game():
+    reasons = set()
+    for seed in range(40):
+        rng = random.Random(seed)
+        moves: list[Move] = []
+        game = Game(verbose=False)
+        game.run_game(_ShufflingAI("white", rng, moves), _ShufflingAI("black", rng, moves))
+        reasons.add(game.win_reason)
+        assert play_native_game(moves) == (game.winner, game.win_reason, game.board.move_count)
+        # replaying the game on the native board gives the same positions and result
+        native_game = Game(verbose=False)
+        native_game.run_game(DeterministicAI("white", moves[::2], verbose=False), DeterministicAI("black", moves[1::2], verbose=False), custom_board=NativeBoard())
+        assert (native_game.winner, native_game.win_reason, native_game.board) == (game.winner, game.win_reason, game.board)
+    assert WinReason.DRAW_THREEFOLD_REPETITION in reasons and reasons - {WinReason.DRAW_THREEFOLD_REPETITION}
+
+def test_pickle():
+    board = NativeBoard()
+    board.move(Move("a4", "a3"))
+    copy = pickle.loads(pickle.dumps(board))
+    assert copy.position_key() == board.position_key() and _codes(copy.get_all_valid_moves(Color.BLACK)) == _codes(board.get_all_valid_moves(Color.BLACK))
@@ -0,0 +1,45 @@
+import pytest
+
+from topcap.agents import NativeSearchAI, RandomAI
+from topcap.agents.utils.heuristic import ExponentialHeuristic, SimpleHeuristic
+from topcap.agents.utils.negamax import NegamaxSearch
+from topcap.agents.utils.perft import random_positions
+from topcap.agents.utils.transposition import TranspositionTable
+from topcap.core.common import Board, Color
+from topcap.core.common.native import NativeSearch, native_available, native_evaluate
+from topcap.core.game import Game
+from topcap.utils import WinReason
+
+pytestmark = pytest.mark.skipif(not native_available(), reason="C++ engine library not built, run `make lib` in cpp/")
+
+
+def test_evaluation_matches_simple_heuristic():
+    for factors in (1.0, 1.0, 1.0), (2.0, 0.5, 3.0):
+        heuristic = SimpleHeuristic(*factors)
+        for board in random_positions(50, seed=2):
+            assert native_evaluate(board, *factors) == pytest.approx(heuristic.evaluate(board))
+
+def test_search_matches_python_negamax():
+    heuristic = SimpleHeuristic(initiative_factor=2.0)
+    for board in random_positions(10, seed=3):
+        expected = NegamaxSearch(heuristic, TranspositionTable(1 << 16)).iterative_deepening(board, max_time=100, max_depth=3)
+        move, score, depth, _, _ = NativeSearch(16, initiative_factor=2.0).search(board, max_time=100, max_depth=3)
+        assert score == pytest.approx(expected.score) and depth == expected.depth
+        assert move is not None and expected.move is not None and move.to_code() == expected.move.to_code()
+
+def test_native_search_takes_the_win():
+    board = Board()
+    board._set_tile_content("d1", Color.NONE)
+    board._set_tile_content("e6", Color.WHITE)
+    agent = NativeSearchAI(max_thinking_time=1, verbose=False)
+    agent.set_color(Color.WHITE)
+    assert agent.get_move(board).to_code() == "(e6 f6)"
+    assert agent.last_result is not None and agent.last_result.depth == 1
+
+def test_native_search_game():
+    agent = NativeSearchAI(max_thinking_time=0.05, verbose=False)
+    game = Game(verbose=False)
+    game.run_game(agent, RandomAI("Randi", verbose=False))
+    assert game.win_reason not in (WinReason.CRASHED, WinReason.INVALID_MOVE)
+    with pytest.raises(ValueError):
+        NativeSearchAI(ExponentialHeuristic(), verbose=False)
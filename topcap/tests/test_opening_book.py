@@ -0,0 +1,71 @@
+import os
+import pickle
+import pytest
+
+from topcap.agents import AlphaBetaAI
+from topcap.agents.utils.heuristic import SimpleHeuristic
+from topcap.agents.utils.opening_book import OpeningBook, book_positions, build_opening_book, write_book
+from topcap.core.common import Board, Color, Move
+
+
+def test_book_lookup(tmp_path):
+    filename = str(tmp_path / "test.book")
+    positions = book_positions(2)
+    assert positions[0].position_key() == Board().position_key()
+    results = {board.position_key(): (board.get_all_valid_moves(board.current_player)[0].to_int(), 0.5, 3) for board in positions}
+    write_book(filename, results)
+    book = OpeningBook(filename)
+    assert len(book) == len(positions)
+    for board in positions:
+        entry = book.lookup(board)
+        assert entry is not None and entry.depth == 3 and entry.score == 0.5
+        assert entry.move.to_code() == board.get_all_valid_moves(board.current_player)[0].to_code()
+    unknown = Board()
+    unknown._set_tile_content("d1", Color.NONE)
+    assert book.lookup(unknown) is None
+
+def test_build_resumes_and_agents_use_the_book(tmp_path):
+    filename = str(tmp_path / "test.book")
+    heuristic = SimpleHeuristic()
+    # a finished search left in the progress file is not repeated
+    fake = (Move("c2", "c4").to_int(), 7.0, 1)
+    settings = {"plies": 2, "depth": 1, "heuristic": heuristic.name()}
+    pickle.dump({"settings": settings, "results": {Board().position_key(): fake}}, open(filename + ".progress", 'wb'))
+    # unless it was built with other settings
+    with pytest.raises(ValueError):
+        build_opening_book(filename, plies=2, depth=3, heuristic=heuristic, verbose=False)
+    results = build_opening_book(filename, plies=2, depth=1, heuristic=heuristic, verbose=False)
+    assert results[Board().position_key()] == fake
+    assert len(results) == len(book_positions(2))
+    assert not os.path.exists(filename + ".progress")
+
+    book = OpeningBook(filename)
+    agent = AlphaBetaAI(heuristic, max_thinking_time=1, verbose=False, book=book)
+    agent.set_color(Color.WHITE)
+    assert agent.get_move(Board()).to_code() == "(c2 c4)"
+    assert book.hits == 1
+
+def test_book_moves_avoid_threefold_repetition(tmp_path):
+    # white follows the book around the cycle (a4 b4) (c6 d6) (b4 a4) (d6 c6)
+    filename = str(tmp_path / "cycle.book")
+    cycle = [Move("a4", "b4"), Move("c6", "d6"), Move("b4", "a4"), Move("d6", "c6")]
+    board = Board()
+    after_two = board.__copy__()
+    after_two.move(cycle[0])
+    after_two.move(cycle[1])
+    write_book(filename, {board.position_key(): (cycle[0].to_int(), 0.0, 1), after_two.position_key(): (cycle[2].to_int(), 0.0, 1)})
+    book = OpeningBook(filename)
+    agent = AlphaBetaAI(SimpleHeuristic(), max_thinking_time=0.2, max_depth=2, verbose=False, book=book)
+    agent.set_color(Color.WHITE)
+    for ply in range(0, 8, 2):
+        assert agent.get_move(board).to_code() == cycle[ply % 4].to_code()
+        board.move(cycle[ply % 4])
+        board.move(cycle[(ply + 1) % 4])
+    assert agent.last_result is None # only book moves so far
+    # (a4 b4) again would reach its position for the third time, the agent searches instead
+    after = board.__copy__()
+    after.move(cycle[0])
+    assert agent.history[after.to_hash()] == 2
+    assert book.book_move(board, agent.history) is None and book.book_move(board) is not None
+    agent.get_move(board)
+    assert agent.last_result is not None
@@ -0,0 +1,31 @@
+import pytest
+
+from topcap.agents.utils.perft import available_backends, board_from_key, load_fixture, run_perft
+
+
+def _check(backend: str, max_depth: int):
+    fixture = load_fixture()
+    positions = [(board, depth) for board, counts in fixture for depth in range(1, min(len(counts) - 1, max_depth) + 1)]
+    expected = [counts[depth] for board, counts in fixture for depth in range(1, min(len(counts) - 1, max_depth) + 1)]
+    assert [result.count for result in run_perft(backend, positions)] == expected
+
+def test_fixture_keys_round_trip():
+    for board, counts in load_fixture():
+        assert board_from_key(board.position_key()).position_key() == board.position_key()
+        assert counts[0] == 1 and counts[1] == len(board.get_all_valid_moves(board.current_player))
+
+def test_python_board_perft():
+    _check("python", 3)
+
+def test_numpy_perft():
+    _check("numpy", 6)
+
+def test_native_perft():
+    if "native" not in available_backends():
+        pytest.skip("C++ engine library not built, run `make lib` in cpp/")
+    _check("native", 5)
+
+def test_cpp_perft():
+    if "cpp" not in available_backends():
+        pytest.skip("C++ perft driver not built, run `make perft` in cpp/")
+    _check("cpp", 7)
@@ -0,0 +1,83 @@
+from topcap.agents import GraphAI
+from topcap.agents.utils.heuristic import SimpleHeuristic
+from topcap.agents.utils.proof_number import EndgameOracle, Outcome, ProofTable, prove
+from topcap.core.common import Board, Color
+
+# white wins in 3 plies by taking away all of black's moves
+WIN_IN_THREE = 138350652134210
+
+
+def _from_hash(hash: int, current_player: Color) -> Board:
+    board = Board()
+    board.from_hash(hash)
+    board.current_player = current_player
+    return board
+
+def test_proves_base_reach():
+    board = Board()
+    for tile in "d1", "c6":
+        board._set_tile_content(tile, Color.NONE)
+    board._set_tile_content("e6", Color.WHITE)
+    board._set_tile_content("a2", Color.BLACK)
+    result = prove(board, max_nodes=1000)
+    assert result.outcome == Outcome.WIN
+    assert result.best_move is not None and result.best_move.to_code() == "(e6 f6)"
+
+def test_proven_line_is_consistent():
+    board = _from_hash(WIN_IN_THREE, Color.WHITE)
+    result = prove(board, max_nodes=1000)
+    assert result.outcome == Outcome.WIN
+    assert len(result.line) == 3
+    for move in result.line:
+        board.move(move)
+    assert board.get_win_reason()[0] == Color.WHITE
+    board = _from_hash(WIN_IN_THREE, Color.WHITE)
+    board.move(result.line[0])
+    assert prove(board, max_nodes=1000).outcome == Outcome.LOSS
+
+def test_repetition_is_a_draw_not_a_win():
+    # with the position after our best move already seen twice, playing it would be a draw
+    board = _from_hash(WIN_IN_THREE, Color.WHITE)
+    winning = prove(board, max_nodes=1000).line[0]
+    after = board.__copy__()
+    after.move(winning)
+    result = prove(board, max_nodes=1000, history=[after, after, board])
+    assert result.best_move is None or result.best_move.to_code() != winning.to_code()
+
+def test_oracle_respects_history():
+    # the table proves the win without history, with the repetition the oracle has to find the other line
+    board = _from_hash(WIN_IN_THREE, Color.WHITE)
+    oracle = EndgameOracle(max_nodes=1000)
+    winning = oracle.probe(board).line[0]
+    after = board.__copy__()
+    after.move(winning)
+    history = [after, after, board]
+    result = oracle.probe(board, history)
+    assert result.best_move is not None and result.best_move.to_code() != winning.to_code()
+    assert [move.to_code() for move in result.line] == [move.to_code() for move in prove(board, max_nodes=1000, history=history).line]
+    # the proof through the repeated position is not stored, the one avoiding it is
+    table = ProofTable()
+    prove(board, max_nodes=1000, history=history, table=table)
+    stored = table.get(board)
+    assert stored is not None and stored[1] is not None and stored[1].to_code() == result.line[0].to_code()
+
+def test_proof_table_persists(tmp_path):
+    filename = str(tmp_path / "proofs.pkl")
+    table = ProofTable(filename)
+    board = _from_hash(WIN_IN_THREE, Color.WHITE)
+    prove(board, max_nodes=1000, table=table)
+    assert table.get(board) is not None
+    table.save()
+    loaded = ProofTable(filename)
+    assert len(loaded) == len(table)
+    outcome, move = loaded.get(board)
+    assert outcome == Outcome.WIN and move is not None
+
+def test_graph_ai_consults_oracle():
+    oracle = EndgameOracle(max_nodes=1000)
+    graph_ai = GraphAI(SimpleHeuristic(), max_thinking_time=10, verbose=False, oracle=oracle)
+    graph_ai.set_color(Color.WHITE)
+    board = _from_hash(WIN_IN_THREE, Color.WHITE)
+    move = graph_ai.get_move(board)
+    assert move.to_code() == prove(board, max_nodes=1000).line[0].to_code()
+    assert oracle.solved == 1
@@ -0,0 +1,95 @@
+import io
+import os
+import sys
+import pytest
+
+from topcap.agents import RandomAI, DeterministicAI
+from topcap.agents.external_engine import ExternalEngine
+from topcap.core.common import Board, Color, Move
+from topcap.core.common.protocol import serve, go_command, board_from_go
+from topcap.core.game import Game
+from topcap.core.game.arena import Arena
+from topcap.utils.topcap_utils import WinReason
+
+SERVE_RANDOM = [sys.executable, "-m", "topcap.agents.serve", "random"]
+CPP_ENGINE = os.path.join(os.path.dirname(__file__), "..", "..", "cpp", "build", "engine") # built with `make engine` in cpp/
+# answers the handshake and a new game, then never moves
+SLOW_ENGINE = [sys.executable, "-c", "import sys, time\nfor line in sys.stdin:\n"
+               "    if line.startswith('topcap'): print('id Slow\\nready', flush=True)\n"
+               "    elif line.startswith('newgame'): print('ready', flush=True)\n"
+               "    elif line.startswith('go'): time.sleep(60)"]
+
+# answers the handshake and a new game, then exits
+DYING_ENGINE = [sys.executable, "-c", "import sys\nfor line in sys.stdin:\n"
+                "    if line.startswith('topcap'): print('id Dying\\nready', flush=True)\n"
+                "    elif line.startswith('newgame'): print('ready', flush=True); sys.exit()"]
+
+
+def _serve(player, lines: list[str]) -> list[str]:
+    output = io.StringIO()
+    serve(player, io.StringIO("".join(line + "\n" for line in lines)), output)
+    return output.getvalue().splitlines()
+
+
+def test_go_command_round_trip():
+    board = Board()
+    board.move(Move("d1", "d2"))
+    parts = go_command(board, 0.5).split()
+    assert parts[0] == "go" and parts[4] == "0.5"
+    copy = board_from_go(*parts[1:4])
+    assert copy.position_key() == board.position_key()
+    assert copy.move_count == 1
+
+
+def test_serve():
+    moves = [Move("d1", "d2")]
+    replies = _serve(DeterministicAI(name="Det", moves=moves), ["topcap", "newgame white", go_command(Board(), 1.0), "go nonsense", "hello", "quit", "topcap"])
+    assert replies[:4] == ["id Det", "ready", "ready", "move (d1 d2)"]
+    assert replies[4].startswith("error") and replies[5] == "error unknown command hello"
+    assert len(replies) == 6 # nothing after quit
+
+
+def test_external_engine_game():
+    with ExternalEngine(SERVE_RANDOM, move_time=0.1, move_timeout=10.0, verbose=False) as engine:
+        assert engine.name == "Random AI"
+        for _ in range(2):
+            game = Game(verbose=False)
+            game.run_game(engine, RandomAI("Randi", verbose=False))
+            assert game.win_reason not in (WinReason.NONE, WinReason.CRASHED, WinReason.INVALID_MOVE)
+
+
+def test_external_engine_timeout():
+    engine = ExternalEngine(SLOW_ENGINE, move_time=0.1, move_timeout=0.5, verbose=False)
+    game = Game(verbose=False)
+    game.run_game(engine, RandomAI("Randi", verbose=False))
+    assert game.win_reason == WinReason.CRASHED
+    assert game.winner == engine.color.opposite()
+    assert engine.process is None # killed
+    engine.set_color(engine.color) # restarted for the next game
+    assert engine.process is not None
+    engine.close()
+
+
+def test_external_engine_exits_mid_game():
+    engine = ExternalEngine(DYING_ENGINE, verbose=False)
+    engine.set_color(Color.BLACK)
+    assert engine.process is not None
+    engine.process.wait()
+    with pytest.raises(RuntimeError):
+        engine.opponent_move_callback(Move("d1", "d2"), Board())
+    assert engine.process is None
+    # in a game, the crash is charged to the engine and not to the player whose move it missed
+    game = Game(verbose=False)
+    game.run_game(RandomAI("Randi", verbose=False), engine)
+    assert game.win_reason == WinReason.CRASHED
+    assert game.winner == Color.WHITE
+    engine.close()
+
+
+@pytest.mark.skipif(not os.path.exists(CPP_ENGINE), reason="cpp engine not built, run `make engine` in cpp/")
+def test_arena_engine_games():
+    arena = Arena()
+    arena.run_engine_games(4, [CPP_ENGINE, "random"], SERVE_RANDOM, workers=2, move_time=0.05, move_timeout=10.0, plot_stats=False)
+    assert arena.total_games == 4
+    assert sum(arena.wins_by_player.values()) == 4
+    assert "CRASHED" not in arena.wins_by_type and "INVALID_MOVE" not in arena.wins_by_type
@@ -0,0 +1,40 @@
+import time
+
+from topcap.agents import GraphAICopilot
+from topcap.agents.utils.heuristic import SimpleHeuristic
+from topcap.agents.utils.search import AnytimeSearch
+from topcap.core.common import Board
+
+
+def test_anytime_search_node_limit():
+    search = AnytimeSearch(max_time=10, max_nodes=1000)
+    report = search.run(lambda: True)
+    assert report.nodes == 1000
+    assert not report.completed
+
+def test_anytime_search_deadline():
+    search = AnytimeSearch(max_time=0.1)
+    start = time.perf_counter()
+    report = search.run(lambda: True)
+    assert time.perf_counter() - start < 0.2
+    assert report.nodes > 0
+    assert report.nodes_per_second > 0
+
+def test_anytime_search_completes():
+    remaining = [5]
+    def step() -> bool:
+        remaining[0] -= 1
+        return remaining[0] >= 0
+    report = AnytimeSearch(max_time=10).run(step)
+    assert report.completed
+    assert report.nodes == 5
+
+def test_search_agent_report():
+    copilot = GraphAICopilot(SimpleHeuristic(), max_thinking_time=10, verbose=False, max_nodes_per_move=50)
+    move = copilot.get_move(Board())
+    report = copilot.last_report
+    assert report is not None
+    assert report.nodes == 50
+    assert report.depth >= 1
+    assert report.best_move is not None
+    assert report.best_move.to_code() == move.to_code()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from topcap.agents.leo_agent_v1 import LeoAgentV1
+from topcap.agents.utils.selfplay import EPISODE_DTYPE, episode_bounds, generate_episodes, open_episodes
+from topcap.core.common import Board, Color, Move
+from topcap.core.common.native import native_available, play_native_game
+from topcap.utils.topcap_utils import WinReason
+
+pytestmark = pytest.mark.skipif(not native_available(), reason="C++ engine library not built, run `make lib` in cpp/")
+
+_OUTCOMES = {Color.WHITE: 1, Color.BLACK: -1, Color.NONE: 0}
+_REASONS = {WinReason.BASE_REACHED: 1, WinReason.NO_MOVES_LEFT: 2, WinReason.DRAW_THREEFOLD_REPETITION: 4}
+
+
+def test_random_episodes_replay(tmp_path):
+    filename = str(tmp_path / "episodes.bin")
+    written = generate_episodes(filename, 300, batch_size=128, verbose=False)
+    records = open_episodes(filename)
+    assert EPISODE_DTYPE.itemsize == 16 and len(records) == written
+    bounds = episode_bounds(records)
+    assert len(bounds) == 301
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        episode = records[start:stop]
+        assert (episode["ply"] == np.arange(1, stop - start + 1)).all()
+        moves = [Move.from_int(int(code)) for code in episode["move"]]
+        board = Board()
+        for move, key in zip(moves, episode["key"].tolist()):
+            board.move(move)
+            assert board.position_key() == key
+        winner, reason, steps = play_native_game(moves)
+        assert steps == len(moves)
+        assert (episode["outcome"] == _OUTCOMES[winner]).all() and (episode["reason"] == _REASONS[reason]).all()
+
+def test_greedy_episodes_follow_values(tmp_path):
+    filename = str(tmp_path / "episodes.bin")
+    agent = LeoAgentV1("selfplay_test", verbose=False, alpha=0.5)
+    generate_episodes(filename, 200, verbose=False)
+    agent.learn_from_episodes(open_episodes(filename))
+    assert agent.iteration == 200 and agent.params
+    keys, values = agent.value_table()
+    generate_episodes(filename, 20, epsilon=0.0, values=(keys, values), seed=1, verbose=False)
+    records = open_episodes(filename)
+    for start, stop in zip(episode_bounds(records)[:-1], episode_bounds(records)[1:]):
+        board = Board()
+        for record in records[start:stop]:
+            evaluations = [(agent.params.get(_after(board, move).to_hash(), 0), move) for move in board.get_all_valid_moves(board.current_player)]
+            best = max(value for value, _ in evaluations) if board.current_player == Color.WHITE else min(value for value, _ in evaluations)
+            chosen = Move.from_int(int(record["move"]))
+            assert np.isclose(agent.params.get(_after(board, chosen).to_hash(), 0), best)
+            board.move(chosen)
+
+def _after(board: Board, move: Move) -> Board:
+    after = board.__copy__()
+    after.move(move)
+    return after
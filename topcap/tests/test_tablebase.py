@@ -0,0 +1,64 @@
+import os
+import pickle
+import random
+import numpy as np
+
+from topcap.agents.utils.proof_number import Outcome
+from topcap.agents.utils.tablebase import Tablebase, generate_tablebase
+from topcap.core.common import Board, Color
+from topcap.core.common.board import _SQUARE_TO_TILE
+
+
+def _board(white: list[int], black: list[int], black_to_move: bool) -> Board:
+    board = Board()
+    for color in Color.WHITE, Color.BLACK:
+        for tile in board.tiles[color][:]:
+            board._set_tile_content(tile, Color.NONE)
+    for square in white:
+        board._set_tile_content(_SQUARE_TO_TILE[square], Color.WHITE)
+    for square in black:
+        board._set_tile_content(_SQUARE_TO_TILE[square], Color.BLACK)
+    board.current_player = Color.BLACK if black_to_move else Color.WHITE
+    return board
+
+def test_rank_round_trip(tmp_path):
+    tablebase = Tablebase(str(tmp_path / "tb"), pieces=4, mode="w+")
+    index = np.random.default_rng(0).integers(0, tablebase.size, 10_000)
+    white, black, black_to_move = tablebase.unrank(index)
+    assert not np.isin(white, [0, 35]).any() and not np.isin(black, [0, 35]).any()
+    assert all(len(set(w) | set(b)) == 8 for w, b in zip(white.tolist(), black.tolist()))
+    assert (tablebase.rank(white[:, ::-1], black, black_to_move) == index).all()
+
+def test_results_match_board_moves(tmp_path):
+    filename = str(tmp_path / "tb")
+    tablebase = generate_tablebase(filename, pieces=2, chunk_size=1 << 16, verbose=False)
+    counts = tablebase.counts()
+    assert counts[Outcome.UNKNOWN] == 0 and counts[Outcome.WIN] and counts[Outcome.LOSS] and counts[Outcome.DRAW]
+    rng = random.Random(0)
+    seen = set()
+    for index in rng.sample(range(tablebase.size), 300):
+        white, black, black_to_move = tablebase.unrank(np.array([index]))
+        board = _board(white[0].tolist(), black[0].tolist(), bool(black_to_move[0]))
+        outcome = tablebase.probe(board)
+        seen.add(outcome)
+        results = [result for _, result in tablebase.score_moves(board)]
+        if Outcome.WIN in results:
+            assert outcome == Outcome.WIN
+        elif all(result == Outcome.LOSS for result in results):
+            assert outcome == Outcome.LOSS
+        else:
+            assert outcome == Outcome.DRAW
+        best = tablebase.best_move(board)
+        if best is not None:
+            after = board.__copy__()
+            after.move(best)
+            assert {Outcome.WIN: Outcome.LOSS, Outcome.LOSS: Outcome.WIN, Outcome.DRAW: Outcome.DRAW}[tablebase.probe(after)] == outcome
+    assert seen == {Outcome.WIN, Outcome.LOSS, Outcome.DRAW}
+
+    # an interrupted run resumes from its state file and reaches the same results
+    expected = np.array(tablebase.data)
+    resumed = str(tmp_path / "resumed")
+    Tablebase(resumed, pieces=2, mode="w+").flush()
+    pickle.dump({"pieces": 2, "pass": 1, "step": "propagate", "next_chunk": 3, "solved": 0}, open(resumed + ".state", 'wb'))
+    assert (np.array(generate_tablebase(resumed, pieces=2, chunk_size=1 << 16, verbose=False).data) == expected).all()
+    assert os.path.exists(resumed + ".state")
@@ -0,0 +1,86 @@
+import random
+from collections import Counter
+
+from topcap.agents import GraphAI
+from topcap.agents.utils.heuristic import SimpleHeuristic
+from topcap.agents.utils.tactics import forced_result, order_moves, winning_move
+from topcap.core.common import Board, Color
+
+
+def _position(white: list[str], black: list[str], current_player: Color = Color.WHITE) -> Board:
+    board = Board()
+    for color in Color.WHITE, Color.BLACK:
+        for tile in board.tiles[color][:]:
+            board._set_tile_content(tile, Color.NONE)
+    for tile in white:
+        board._set_tile_content(tile, Color.WHITE)
+    for tile in black:
+        board._set_tile_content(tile, Color.BLACK)
+    board.current_player = current_player
+    return board
+
+def test_threat_in_one():
+    board = _position(["f5", "e4", "a3", "b2"], ["a6", "c6", "d4", "c1"])
+    threats = board.threats(Color.WHITE)
+    assert threats.attackers == ["f5"]
+    assert threats.moves[0].to_tile == "f6"
+    assert sorted(threats.defending_squares) == ["e5", "e6", "f4"]
+    winner, move = forced_result(board, plies=1)
+    assert winner == Color.WHITE and move is not None and move.to_code() == "(f5 f6)"
+    assert order_moves(board)[0].to_code() == threats.moves[0].to_code()
+
+def test_forced_results_are_sound():
+    rng = random.Random(2)
+    found = 0
+    for _ in range(40):
+        board = Board()
+        while board.get_win_reason()[0] == Color.NONE:
+            player = board.current_player
+            winner, move = forced_result(board)
+            if winner == player:
+                found += 1
+                assert move is not None
+                after = board.__copy__()
+                after.move(move)
+                # either the move wins, or every reply allows a win
+                if after.get_win_reason()[0] != player:
+                    for reply in after.get_all_valid_moves(after.current_player):
+                        after.move(reply)
+                        assert winning_move(after) is not None
+                        after.unmake(reply)
+            elif winner == player.opposite():
+                for move in board.get_all_valid_moves(player):
+                    after = board.__copy__()
+                    after.move(move)
+                    assert winning_move(after) is not None
+            board.move(rng.choice(board.get_all_valid_moves(player)))
+    assert found > 0
+
+def test_repetition_breaks_forced_results():
+    rng = random.Random(2)
+    checked = Counter()
+    while checked["win"] < 1 or checked["loss"] < 3:
+        board = Board()
+        while board.get_win_reason()[0] == Color.NONE:
+            player = board.current_player
+            winner, move = forced_result(board)
+            if winner == player and move is not None:
+                after = board.__copy__()
+                after.move(move)
+                if after.get_win_reason()[0] == Color.NONE: # a win in 3, through a position that can repeat
+                    winner, other = forced_result(board, history=Counter({after.to_hash(): 2}))
+                    assert winner != player or (other is not None and other.to_code() != move.to_code())
+                    checked["win"] += 1
+            elif winner == player.opposite():
+                # one escape to a repeated position is a draw, not a loss
+                escape = board.__copy__()
+                escape.move(board.get_all_valid_moves(player)[0])
+                assert forced_result(board, history=Counter({escape.to_hash(): 2}))[0] != player.opposite()
+                checked["loss"] += 1
+            board.move(rng.choice(board.get_all_valid_moves(player)))
+
+def test_graph_ai_plays_forced_win():
+    board = _position(["f5", "e4", "a3", "b2"], ["a6", "c6", "d4", "c1"])
+    graph_ai = GraphAI(SimpleHeuristic(), max_thinking_time=10, verbose=False)
+    graph_ai.set_color(Color.WHITE)
+    assert graph_ai.get_move(board).to_code() == "(f5 f6)"
@@ -0,0 +1,93 @@
+"""Named counters and timers for the hot paths (move generation, board copies, hashes, heuristic evaluations, ...).
+
+Off by default: the decorators then return the function unchanged, so the instrumented code runs exactly as without
+them. Set TOPCAP_INSTRUMENT=1 before topcap is imported to turn them on, it is only read at import.
+
+    @counted("board.copy")
+    def __copy__(self): ...
+
+    before = snapshot()
+    ...
+    print(since(before, games=10).format())
+"""
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+import functools
+import os
+import time
+from typing import Callable, TypeVar
+
+ENABLED: bool = os.environ.get("TOPCAP_INSTRUMENT", "0") == "1"
+
+COUNTS: Counter[str] = Counter() # calls of every counter or timer
+TIMES: defaultdict[str, float] = defaultdict(float) # seconds of every timer
+
+F = TypeVar("F", bound=Callable)
+
+
+def counted(name: str) -> Callable[[F], F]:
+    """Counts the calls of the decorated function under name"""
+    def decorator(function: F) -> F:
+        if not ENABLED:
+            return function
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            COUNTS[name] += 1
+            return function(*args, **kwargs)
+        return wrapper # type: ignore[return-value]
+    return decorator
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Counts the calls of the decorated function and adds up their time under name.
+    Recursive calls add their time again."""
+    def decorator(function: F) -> F:
+        if not ENABLED:
+            return function
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                TIMES[name] += time.perf_counter() - start
+                COUNTS[name] += 1
+        return wrapper # type: ignore[return-value]
+    return decorator
+
+
+@dataclass
+class Report:
+    counts: dict[str, int] = field(default_factory=dict)
+    times: dict[str, float] = field(default_factory=dict)
+    games: int = 0 # for the per game numbers, 0 to leave them out
+
+    def format(self) -> str:
+        if not ENABLED:
+            return "instrumentation disabled, set TOPCAP_INSTRUMENT=1"
+        lines = []
+        for name in sorted(self.counts):
+            count = self.counts[name]
+            line = f"{name:<28} {count:>10}"
+            if self.games:
+                line += f" ({count / self.games:,.1f}/game)"
+            if name in self.times:
+                line += f" {self.times[name]:.3f}s ({self.times[name] / count * 1e6:,.1f}us/call)"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def snapshot() -> Report:
+    return Report(dict(COUNTS), dict(TIMES))
+
+
+def since(before: Report, games: int = 0) -> Report:
+    """What was counted since the snapshot before"""
+    counts = {name: count - before.counts.get(name, 0) for name, count in COUNTS.items() if count != before.counts.get(name, 0)}
+    times = {name: seconds - before.times.get(name, 0.0) for name, seconds in TIMES.items() if name in counts}
+    return Report(counts, times, games)
+
+
+def reset():
+    COUNTS.clear()
+    TIMES.clear()